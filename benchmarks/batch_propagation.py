@@ -0,0 +1,55 @@
+"""
+Scalar `propagate_window_through_face` against the batched `propagate_batch_through_face`, for one
+edge/face pair carrying different numbers of windows.
+
+    python -m benchmarks.batch_propagation
+"""
+import timeit
+
+import numpy as np
+
+from contour_toolpath.importer import build_mesh_from_trimesh
+from contour_toolpath.mesh import EdgeId, FaceId
+from contour_toolpath.testing import icosphere
+from contour_toolpath.window import Window, WindowCircular
+from contour_toolpath.window_batch import propagate_batch_through_face, windows_to_batch
+from contour_toolpath.window_propagation import propagate_window_through_face
+from mathutil.vector import Vec2D
+
+
+def main() -> None:
+    mesh = build_mesh_from_trimesh(icosphere(2))
+    edge = EdgeId(0)
+    face = FaceId(int(mesh.adjacency.faces_of_edge(edge)[0]))
+    length = float(mesh.geometry.edge_lengths[edge])
+    side = -1.0 if mesh.geometry.edge_face_opposite[mesh.adjacency.edge_face_index(edge, face), 1] > 0 else 1.0
+    rng = np.random.default_rng(0)
+
+    for count in (1, 10, 50, 200, 1000):
+        bounds = np.sort(rng.uniform(0.0, 1.0, (count, 2)), axis=1)
+        windows: list[Window] = [
+            WindowCircular(
+                edge_id=edge,
+                start_t=float(a),
+                end_t=float(b),
+                cumulative_distance=0.0,
+                source_point=Vec2D(float(rng.uniform(0.0, length)), side * float(rng.uniform(0.1, 2.0)) * length),
+            )
+            for a, b in bounds
+        ]
+        batch = windows_to_batch(windows)
+
+        def run_scalar() -> None:
+            for w in windows:
+                propagate_window_through_face(w, face, mesh)
+
+        def run_batch() -> None:
+            propagate_batch_through_face(batch, edge, face, mesh)
+
+        scalar = min(timeit.repeat(run_scalar, number=5, repeat=5)) / 5
+        batched = min(timeit.repeat(run_batch, number=5, repeat=5)) / 5
+        print(f"{count:5d} windows: scalar {scalar * 1e6:9.1f} us  batched {batched * 1e6:9.1f} us  ({scalar / batched:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
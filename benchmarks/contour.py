@@ -0,0 +1,37 @@
+"""
+Time to cut a radial distance field on a bumpy heightfield into contours at many levels, split into
+the marching triangles pass and the linking of segments into polylines.
+
+    python -m benchmarks.contour
+"""
+import time
+
+import numpy as np
+
+from benchmarks.fast_marching import make_grid
+from contour_toolpath.contour import link_segments, marching_triangles
+
+
+def main() -> None:
+    print(f"{'faces':>9} {'levels':>7} {'segments':>9} {'march s':>8} {'link s':>8} {'polylines':>10}")
+    for n in (101, 301, 1001):
+        mesh = make_grid(n, 0.1)
+        mesh.distance[:] = np.hypot(mesh.positions[:, 0] - 0.5, mesh.positions[:, 1] - 0.5)
+        for step in (0.05, 0.01):
+            levels = np.arange(step, 0.7, step)
+
+            start = time.perf_counter()
+            segments = marching_triangles(mesh, levels)
+            march_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            polylines = link_segments(segments, len(mesh.edge_vertices))
+            link_time = time.perf_counter() - start
+            print(
+                f"{len(mesh.face_edges):>9} {len(levels):>7} {len(segments.face):>9} "
+                f"{march_time:>8.3f} {link_time:>8.3f} {len(polylines):>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
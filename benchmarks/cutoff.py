@@ -0,0 +1,55 @@
+"""
+Propagation with a `max_distance` cutoff on flat grids of the same edge length and growing extent, from
+a vertex in the middle. The area within the cutoff stays the same, so the time should too, while the
+time of an uncut propagation grows with the mesh.
+
+    python -m benchmarks.cutoff [cutoff in edge lengths]
+"""
+import math
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.meshes import grid
+from contour_toolpath.algorithm import propagate_distance_field
+from contour_toolpath.importer import build_mesh_from_faces
+from contour_toolpath.propagation_stats import PropagationStats
+from contour_toolpath.query import SourceSet, source_windows
+
+
+FACES = (2_000, 8_000, 32_000, 128_000)
+
+FULL_MAX_FACES = 3_000
+""" Larger meshes are only propagated with the cutoff """
+
+
+def main() -> None:
+    cutoff_edges = float(sys.argv[1]) if len(sys.argv) > 1 else 8.0
+    print(f"{'faces':>8} {'reached':>8} {'cutoff s':>9} {'pops':>7} {'full s':>8} {'full pops':>10}")
+    for faces in FACES:
+        positions, face_vertices = grid(faces)
+        cells = int(round(math.sqrt(faces / 2)))
+        # Unit edge length whatever the size
+        mesh = build_mesh_from_faces(positions * cells, face_vertices)
+        mesh.geometry
+        middle = int(np.argmin(np.linalg.norm(mesh.positions - mesh.positions.mean(axis=0), axis=1)))
+        windows = source_windows(SourceSet(vertices=[middle]), mesh)
+
+        stats = PropagationStats()
+        start = time.perf_counter()
+        propagate_distance_field(mesh, windows, stats, max_distance=cutoff_edges)
+        elapsed = time.perf_counter() - start
+        reached = int(np.count_nonzero(~np.isnan(mesh.distance)))
+
+        full = ""
+        if len(face_vertices) <= FULL_MAX_FACES:
+            full_stats = PropagationStats()
+            start = time.perf_counter()
+            propagate_distance_field(mesh, windows, full_stats)
+            full = f"{time.perf_counter() - start:>8.3f} {full_stats.pops:>10}"
+        print(f"{len(face_vertices):>8} {reached:>8} {elapsed:>9.3f} {stats.pops:>7} {full}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Parametric test surfaces for the benchmarks. Each generator takes a target face count and returns
+(N, 3) positions and (F, 3) faces with F close to the target, wound consistently.
+"""
+import math
+from typing import Callable
+
+import numpy as np
+import numpy.typing as npt
+
+
+Surface = tuple[npt.NDArray[np.float64], npt.NDArray[np.int64]]
+
+
+def _grid_faces(rows: int, cols: int, wrap: bool = False) -> npt.NDArray[np.int64]:
+    """ Two triangles per cell of a (rows + 1) x (cols + 1) vertex grid, or (rows + 1) x cols if `wrap` """
+    width = cols if wrap else cols + 1
+    i, j = np.meshgrid(np.arange(rows), np.arange(cols), indexing="ij")
+    a = i * width + j
+    b = a + width
+    c = i * width + (j + 1) % width + width
+    d = i * width + (j + 1) % width
+    return np.concatenate([
+        np.stack([a, b, c], axis=-1).reshape(-1, 3),
+        np.stack([a, c, d], axis=-1).reshape(-1, 3),
+    ])
+
+
+def _unit_grid(faces: int) -> tuple[int, npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    cells = max(int(round(math.sqrt(faces / 2))), 1)
+    xs = np.linspace(0.0, 1.0, cells + 1)
+    x, y = np.meshgrid(xs, xs, indexing="ij")
+    return cells, x.ravel(), y.ravel()
+
+
+def grid(faces: int) -> Surface:
+    """ A flat unit square """
+    cells, x, y = _unit_grid(faces)
+    return np.stack([x, y, np.zeros_like(x)], axis=1), _grid_faces(cells, cells)
+
+
+def terrain(faces: int) -> Surface:
+    """ A unit square heightfield of a few random waves plus fine noise """
+    rng = np.random.default_rng(0)
+    cells, x, y = _unit_grid(faces)
+    z = np.zeros_like(x)
+    for _ in range(6):
+        fx, fy = rng.uniform(1.0, 6.0, 2)
+        z += rng.uniform(0.01, 0.05) * np.sin(2 * np.pi * (fx * x + fy * y) + rng.uniform(0, 2 * np.pi))
+    z += rng.normal(0.0, 0.1 / cells, len(z))
+    return np.stack([x, y, z], axis=1), _grid_faces(cells, cells)
+
+
+def cylinder(faces: int) -> Surface:
+    """ An open tube of radius 1 and height 2, with a boundary loop at each end """
+    around = max(int(round(math.sqrt(faces))), 3)
+    along = max(int(round(faces / (2 * around))), 1)
+    angle, z = np.meshgrid(np.linspace(0.0, 2 * np.pi, around, endpoint=False), np.linspace(0.0, 2.0, along + 1))
+    angle, z = angle.ravel(), z.ravel()
+    positions = np.stack([np.cos(angle), np.sin(angle), z], axis=1)
+    return positions, _grid_faces(along, around, wrap=True)
+
+
+def hemisphere(faces: int) -> Surface:
+    """ The upper half of a unit sphere, open along the equator, with a triangle fan at the pole """
+    rings = max(int(round(math.sqrt(faces / 4))), 1)
+    around = 2 * rings + 2
+    angle, polar = np.meshgrid(
+        np.linspace(0.0, 2 * np.pi, around, endpoint=False),
+        np.linspace(np.pi / 2, 0.0, rings, endpoint=False),
+    )
+    angle, polar = angle.ravel(), polar.ravel()
+    positions = np.vstack([
+        np.stack([np.sin(polar) * np.cos(angle), np.sin(polar) * np.sin(angle), np.cos(polar)], axis=1),
+        [[0.0, 0.0, 1.0]],
+    ])
+    pole = len(positions) - 1
+    last_ring = (rings - 1) * around + np.arange(around)
+    fan = np.stack([last_ring, np.full(around, pole), (last_ring + 1 - (rings - 1) * around) % around + (rings - 1) * around], axis=1)
+    return positions, np.concatenate([_grid_faces(rings - 1, around, wrap=True), fan])
+
+
+def holes(faces: int) -> Surface:
+    """ A flat unit square with round holes on a lattice, about one per 400 faces """
+    cells, x, y = _unit_grid(faces)
+    grid_faces = _grid_faces(cells, cells)
+    per_side = max(cells // 14, 1)
+    pitch = 1.0 / per_side
+    radius = 0.3 * pitch
+    centroid = np.stack([x, y], axis=1)[grid_faces].mean(axis=1)
+    offset = (centroid % pitch) - pitch / 2
+    keep = np.hypot(offset[:, 0], offset[:, 1]) > radius
+    used, compact = np.unique(grid_faces[keep], return_inverse=True)
+    positions = np.stack([x[used], y[used], np.zeros(len(used))], axis=1)
+    return positions, compact.reshape(-1, 3)
+
+
+SHAPES: dict[str, Callable[[int], Surface]] = {
+    "grid": grid,
+    "terrain": terrain,
+    "cylinder": cylinder,
+    "hemisphere": hemisphere,
+    "holes": holes,
+}
@@ -0,0 +1,43 @@
+"""
+Scaling of the parallel window propagation with the number of worker processes, against the serial
+`propagate_distance_field` on the same bumpy heightfield.
+
+    python -m benchmarks.parallel_propagation [grid size]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.fast_marching import make_grid
+from contour_toolpath.algorithm import create_windows_at_boundaries, propagate_distance_field
+from contour_toolpath.parallel import propagate_distance_field_parallel
+
+
+WORKERS = (1, 2, 4, 8, 16, 32)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 41
+    mesh = make_grid(n, 0.1)
+    mesh.geometry
+    print(f"{len(mesh.face_edges)} faces, {os.cpu_count()} cores")
+
+    start = time.perf_counter()
+    propagate_distance_field(mesh, set(create_windows_at_boundaries(mesh)))
+    serial_time = time.perf_counter() - start
+    serial = mesh.distance.copy()
+    print(f"{'workers':>8} {'time s':>9} {'speedup':>8} {'max diff':>9}")
+    print(f"{'serial':>8} {serial_time:>9.3f} {1.0:>7.2f}x {0.0:>9.1e}")
+
+    for workers in WORKERS:
+        start = time.perf_counter()
+        propagate_distance_field_parallel(mesh, set(create_windows_at_boundaries(mesh)), workers)
+        elapsed = time.perf_counter() - start
+        difference = float(np.max(np.abs(mesh.distance - serial)))
+        print(f"{workers:>8} {elapsed:>9.3f} {serial_time / elapsed:>7.2f}x {difference:>9.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark for the per-window math of a propagation step.
+
+Compares the window evaluation done by recomputing edge vectors and lengths from vertex positions on
+every call (how `window.py` worked before `MeshGeometry`) against the cached geometry tables, and
+reports the time of a full `propagate_window` step.
+
+    python -m benchmarks.propagation_step
+"""
+import math
+import timeit
+
+from contour_toolpath.importer import build_mesh_from_trimesh
+from contour_toolpath.mesh import EdgeId, Mesh
+from contour_toolpath.testing import icosphere
+from contour_toolpath.window import Window, WindowCircular, evaluate_distance_field_at_window_end, evaluate_distance_field_at_window_start
+from contour_toolpath.window_propagation import get_start_and_end_angle, propagate_window
+from mathutil.vector import Vec2D
+
+
+def recomputed_edge_length(edge: EdgeId, mesh: Mesh) -> float:
+    edge_obj = mesh.edges[edge]
+    return (mesh.vertices[edge_obj.start].position - mesh.vertices[edge_obj.end].position).length()
+
+
+def recomputed_window_math(window: WindowCircular, mesh: Mesh) -> tuple[float, float, float, float]:
+    edge_length = recomputed_edge_length(window.edge_id, mesh)
+    start = window.cumulative_distance + (Vec2D(window.start_t * edge_length, 0) - window.source_point).length()
+    edge_length = recomputed_edge_length(window.edge_id, mesh)
+    end = window.cumulative_distance + (Vec2D(window.end_t * edge_length, 0) - window.source_point).length()
+    edge_length = recomputed_edge_length(window.edge_id, mesh)
+    dir_start = window.source_point - Vec2D(window.start_t * edge_length, 0)
+    dir_end = window.source_point - Vec2D(window.end_t * edge_length, 0)
+    return start, end, math.atan2(dir_start.y, dir_start.x), math.atan2(dir_end.y, dir_end.x)
+
+
+def table_window_math(window: Window, mesh: Mesh) -> tuple[float, float, float, float]:
+    start = evaluate_distance_field_at_window_start(window, mesh)
+    end = evaluate_distance_field_at_window_end(window, mesh)
+    angle_start, angle_end = get_start_and_end_angle(window, mesh)
+    return start, end, angle_start, angle_end
+
+
+def main() -> None:
+    mesh = build_mesh_from_trimesh(icosphere(4))
+    geometry = mesh.geometry
+    windows = [
+        WindowCircular(
+            edge_id=EdgeId(edge),
+            start_t=0.1,
+            end_t=0.9,
+            cumulative_distance=0.0,
+            source_point=Vec2D(0.5 * length, -length),
+        )
+        for edge, length in enumerate(geometry.edge_lengths.tolist())
+    ]
+
+    def run_recomputed() -> None:
+        for w in windows:
+            recomputed_window_math(w, mesh)
+
+    def run_tables() -> None:
+        for w in windows:
+            table_window_math(w, mesh)
+
+    def run_step() -> None:
+        for w in windows:
+            propagate_window(w, mesh)
+
+    repeats = 5
+    recomputed = min(timeit.repeat(run_recomputed, number=1, repeat=repeats)) / len(windows)
+    tables = min(timeit.repeat(run_tables, number=1, repeat=repeats)) / len(windows)
+    step = min(timeit.repeat(run_step, number=1, repeat=repeats)) / len(windows)
+
+    print(f"{len(windows)} windows")
+    print(f"window math, recomputed from positions: {recomputed * 1e6:8.2f} us/window")
+    print(f"window math, geometry tables:           {tables * 1e6:8.2f} us/window  ({recomputed / tables:.1f}x)")
+    print(f"full propagate_window step:             {step * 1e6:8.2f} us/window")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Point count reduction and runtime of contour simplification, and the retracts removed by spiral linking,
+on a bumpy heightfield with a radial distance field.
+
+    python -m benchmarks.simplify
+"""
+import time
+
+import numpy as np
+
+from benchmarks.fast_marching import make_grid
+from contour_toolpath.simplify import simplify_contours
+from contour_toolpath.toolpath import iter_contours, iter_moves, iter_spiral_moves
+
+
+STEP_OVER = 0.005
+TOLERANCES = (1e-4, 1e-3)
+
+
+def main() -> None:
+    print(
+        f"{'faces':>9} {'tolerance':>9} {'points':>9} {'kept':>8} {'ratio':>6} {'seconds':>8} "
+        f"{'retracts':>8} {'spiral':>7}"
+    )
+    for n in (301, 1001):
+        mesh = make_grid(n, 0.1)
+        mesh.distance[:] = np.hypot(mesh.positions[:, 0] - 0.5, mesh.positions[:, 1] - 0.5)
+        contours = list(iter_contours(mesh, np.arange(STEP_OVER, 0.7, STEP_OVER)))
+        points = sum(len(c.points) for c in contours)
+        for tolerance in TOLERANCES:
+            start = time.perf_counter()
+            simplified = simplify_contours(contours, tolerance)
+            seconds = time.perf_counter() - start
+            kept = sum(len(c.points) for c in simplified)
+
+            retracts = sum(move.rapid for move in iter_moves(simplified, 1.0))
+            spiral_retracts = sum(move.rapid for move in iter_spiral_moves(simplified, 1.0, 2 * STEP_OVER))
+            print(
+                f"{len(mesh.face_edges):>9} {tolerance:>9.0e} {points:>9} {kept:>8} {points / kept:>5.1f}x "
+                f"{seconds:>8.3f} {retracts:>8} {spiral_retracts:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Load time and peak memory of the memory mapped STL importer against the trimesh path, on generated
+binary STL files of the given sizes in MB (default 10 and 100). Each load runs in a fresh process and the
+peak is its resident memory high-water mark above what it held before loading.
+
+    python -m benchmarks.stl_import 10 100 1000
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from multiprocessing.connection import Connection
+from typing import Callable
+
+import numpy as np
+import trimesh
+
+from contour_toolpath.importer import STL_HEADER_BYTES, STL_TRIANGLE, build_mesh_from_stl, build_mesh_from_trimesh
+from contour_toolpath.mesh import Mesh
+
+
+LOADERS: dict[str, Callable[[str], Mesh]] = {
+    "mmap": build_mesh_from_stl,
+    "trimesh": lambda path: build_mesh_from_trimesh(trimesh.load_mesh(path)),  # type: ignore
+}
+
+
+def write_grid_stl(path: str, megabytes: int) -> int:
+    """ A bumpy square grid with about `megabytes` of triangles, written a row at a time """
+    n = int(np.sqrt(megabytes * 1e6 / STL_TRIANGLE.itemsize / 2)) + 1
+    xs = np.linspace(0.0, 100.0, n)
+    with open(path, "wb") as file:
+        file.write(b"\0" * 80 + np.uint32(2 * (n - 1) ** 2).tobytes())
+        for i in range(n - 1):
+            x = np.array([xs[i], xs[i + 1]])[:, None]
+            y = xs[None, :]
+            z = np.sin(x / 7) * np.cos(y / 5)
+            grid = np.stack(np.broadcast_arrays(x, y, z), axis=-1)
+            a, b, c, d = grid[0, :-1], grid[1, :-1], grid[1, 1:], grid[0, 1:]
+            records = np.zeros(2 * (n - 1), dtype=STL_TRIANGLE)
+            records["vertices"][0::2] = np.stack([a, b, c], axis=1)
+            records["vertices"][1::2] = np.stack([a, c, d], axis=1)
+            file.write(records.tobytes())
+    return 2 * (n - 1) ** 2
+
+
+def peak_rss_bytes() -> int:
+    # Kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def measure(connection: Connection, loader: str, path: str) -> None:
+    before = peak_rss_bytes()
+    start = time.perf_counter()
+    mesh = LOADERS[loader](path)
+    seconds = time.perf_counter() - start
+    connection.send((seconds, peak_rss_bytes() - before, len(mesh.positions)))
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 100]
+    context = multiprocessing.get_context("spawn")
+    print(f"{'file MB':>8} {'triangles':>10} {'loader':>8} {'seconds':>8} {'peak MB':>8} {'vertices':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for megabytes in sizes:
+            path = os.path.join(directory, "part.stl")
+            triangles = write_grid_stl(path, megabytes)
+            file_mb = (STL_HEADER_BYTES + triangles * STL_TRIANGLE.itemsize) / 1e6
+            for loader in LOADERS:
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=measure, args=(sender, loader, path))
+                process.start()
+                seconds, peak, vertices = receiver.recv() if receiver.poll(3600) else (float("nan"), 0, 0)
+                process.join()
+                print(f"{file_mb:>8.0f} {triangles:>10} {loader:>8} {seconds:>8.2f} {peak / 1e6:>8.0f} {vertices:>9}")
+
+
+if __name__ == "__main__":
+    main()
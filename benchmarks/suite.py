@@ -0,0 +1,237 @@
+"""
+Times every stage of the pipeline, with its peak memory, on the generated surfaces of `benchmarks.meshes`
+across sizes, and writes the results as JSON for comparing commits.
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --sizes 1000 10000 100000 1000000 10000000 --shapes grid terrain
+    python -m benchmarks.suite --compare before.json after.json
+
+Stages that scale badly only run up to `STAGE_MAX_FACES` unless `--unlimited` is given, and stages that
+need the output of a skipped stage are skipped with it. Peak memory is the growth of the resident set
+during the stage. On Linux the high-water mark is reset before each stage; elsewhere it is the growth of
+the process's lifetime peak, so a stage below an earlier peak shows as zero.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable
+
+import numpy as np
+import trimesh
+
+from benchmarks.meshes import SHAPES
+from contour_toolpath.algorithm import compute_distance_field, create_windows_at_boundaries, propagate_distance_field
+from contour_toolpath.contour import contour_levels, extract_contours
+from contour_toolpath.importer import build_mesh_from_trimesh
+from contour_toolpath.toolpath import write_toolpath
+from contour_toolpath.visualization import mesh_figure
+
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+STAGE_MAX_FACES = {
+    "propagate_distance_field": 2_000,
+    "fast_marching": 1_000_000,
+    "heat": 1_000_000,
+}
+
+CONTOUR_LEVELS = 50
+
+
+class Case:
+    """ What the stages of one surface hand on to each other """
+
+    def __init__(self, positions: np.ndarray, faces: np.ndarray, directory: str):
+        self.trimesh = trimesh.Trimesh(positions, faces, process=False)
+        self.directory = directory
+        self.state: dict[str, Any] = {}
+
+
+def _build_mesh(case: Case) -> None:
+    case.state["mesh"] = build_mesh_from_trimesh(case.trimesh)
+
+
+def _geometry(case: Case) -> None:
+    case.state["mesh"].geometry
+
+
+def _create_windows(case: Case) -> None:
+    case.state["windows"] = create_windows_at_boundaries(case.state["mesh"])
+
+
+def _propagate(case: Case) -> None:
+    propagate_distance_field(case.state["mesh"], set(case.state["windows"]))
+    case.state["distance"] = case.state["mesh"].distance.copy()
+
+
+def _fast_marching(case: Case) -> None:
+    compute_distance_field(case.state["mesh"], "fast_marching")
+    case.state["distance"] = case.state["mesh"].distance.copy()
+
+
+def _heat(case: Case) -> None:
+    compute_distance_field(case.state["mesh"], "heat")
+    case.state["distance"] = case.state["mesh"].distance.copy()
+
+
+def _levels(case: Case) -> np.ndarray:
+    mesh = case.state["mesh"]
+    mesh.distance[:] = case.state["distance"]
+    return contour_levels(mesh, float(np.nanmax(mesh.distance)) / (CONTOUR_LEVELS + 1))
+
+
+def _extract_contours(case: Case) -> None:
+    extract_contours(case.state["mesh"], _levels(case))
+
+
+def _write_toolpath(case: Case) -> None:
+    write_toolpath(case.state["mesh"], _levels(case), os.path.join(case.directory, "part.gcode"), tolerance=1e-4)
+
+
+def _visualize(case: Case) -> None:
+    mesh_figure(case.state["mesh"])
+
+
+STAGES: list[tuple[str, Callable[[Case], None], tuple[str, ...]]] = [
+    # (name, run, state it needs)
+    ("build_mesh_from_trimesh", _build_mesh, ()),
+    ("geometry", _geometry, ("mesh",)),
+    ("create_windows_at_boundaries", _create_windows, ("mesh",)),
+    ("propagate_distance_field", _propagate, ("windows",)),
+    ("fast_marching", _fast_marching, ("mesh",)),
+    ("heat", _heat, ("mesh",)),
+    ("extract_contours", _extract_contours, ("distance",)),
+    ("write_toolpath", _write_toolpath, ("distance",)),
+    ("visualize_mesh", _visualize, ("mesh",)),
+]
+
+
+def _status_kb(field: str) -> int | None:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak() -> int:
+    """ Reset the peak resident set where the OS allows it, and return the current one in bytes """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+    rss = _status_kb("VmRSS")
+    return rss * 1024 if rss is not None else _peak_bytes()
+
+
+def _peak_bytes() -> int:
+    hwm = _status_kb("VmHWM")
+    if hwm is not None:
+        return hwm * 1024
+    # Kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def run_case(shape: str, size: int, unlimited: bool) -> list[dict[str, Any]]:
+    positions, faces = SHAPES[shape](size)
+    results: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as directory:
+        case = Case(positions, faces, directory)
+        for name, run, needs in STAGES:
+            limit = STAGE_MAX_FACES.get(name)
+            if (not unlimited and limit is not None and len(faces) > limit) or any(k not in case.state for k in needs):
+                continue
+            before = _reset_peak()
+            start = time.perf_counter()
+            run(case)
+            seconds = time.perf_counter() - start
+            results.append({
+                "shape": shape,
+                "size": size,
+                "faces": len(faces),
+                "vertices": len(positions),
+                "stage": name,
+                "seconds": seconds,
+                "peak_bytes": max(_peak_bytes() - before, 0),
+            })
+            print(f"{shape:>10} {len(faces):>9} {name:>28} {seconds:>9.3f} {results[-1]['peak_bytes'] / 1e6:>9.1f}", flush=True)
+    return results
+
+
+def environment() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """ Print the time and memory ratio (after / before) of every stage both runs have """
+    with open(before_path) as file:
+        before = json.load(file)
+    with open(after_path) as file:
+        after = json.load(file)
+
+    def key(result: dict[str, Any]) -> tuple[str, int, str]:
+        return result["shape"], result["size"], result["stage"]
+
+    baseline = {key(result): result for result in before["results"]}
+    print(f"{before['environment']['commit']} -> {after['environment']['commit']}")
+    print(f"{'shape':>10} {'faces':>9} {'stage':>28} {'seconds':>9} {'ratio':>7} {'peak MB':>9} {'ratio':>7}")
+    for result in after["results"]:
+        old = baseline.get(key(result))
+        if old is None:
+            continue
+        time_ratio = result["seconds"] / old["seconds"] if old["seconds"] > 0 else float("nan")
+        memory_ratio = result["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] > 0 else float("nan")
+        print(
+            f"{result['shape']:>10} {result['faces']:>9} {result['stage']:>28} {result['seconds']:>9.3f} "
+            f"{time_ratio:>6.2f}x {result['peak_bytes'] / 1e6:>9.1f} {memory_ratio:>6.2f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="target face counts")
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES), default=list(SHAPES))
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--unlimited", action="store_true", help="ignore STAGE_MAX_FACES")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    print(f"{'shape':>10} {'faces':>9} {'stage':>28} {'seconds':>9} {'peak MB':>9}")
+    results: list[dict[str, Any]] = []
+    for size in args.sizes:
+        for shape in args.shapes:
+            results += run_case(shape, size, args.unlimited)
+    with open(args.output, "w") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=1)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
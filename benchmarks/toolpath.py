@@ -0,0 +1,36 @@
+"""
+Throughput of the streaming toolpath writer, from the distance field to a file on disk, on a bumpy
+heightfield with a radial distance field.
+
+    python -m benchmarks.toolpath
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.fast_marching import make_grid
+from contour_toolpath.toolpath import ToolpathFormat, write_toolpath
+
+
+FORMATS: tuple[ToolpathFormat, ...] = ("gcode", "csv")
+
+
+def main() -> None:
+    print(f"{'faces':>9} {'format':>6} {'MB':>7} {'seconds':>8} {'MB/s':>6}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in (301, 1001):
+            mesh = make_grid(n, 0.1)
+            mesh.distance[:] = np.hypot(mesh.positions[:, 0] - 0.5, mesh.positions[:, 1] - 0.5)
+            levels = np.arange(0.002, 0.7, 0.002)
+            for file_format in FORMATS:
+                path = os.path.join(directory, f"part.{file_format}")
+                stats = write_toolpath(mesh, levels, path, file_format)
+                print(
+                    f"{len(mesh.face_edges):>9} {file_format:>6} {stats.bytes_written / 1e6:>7.1f} "
+                    f"{stats.seconds:>8.2f} {stats.mb_per_second:>6.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
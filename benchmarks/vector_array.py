@@ -0,0 +1,52 @@
+"""
+`intersection_from_edge_direction_and_angle` called per vector on `Vec3D`, against its batch version on
+`Vec3DArray`, with and without an `out` buffer.
+
+    python -m benchmarks.vector_array [count]
+"""
+import sys
+import time
+
+import numpy as np
+
+from contour_toolpath.window_propagation import (
+    intersection_from_edge_direction_and_angle, intersections_from_edge_directions_and_angles,
+)
+from mathutil.vector_array import Vec3DArray
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    edges = Vec3DArray(rng.normal(size=(count, 3)))
+    directions = Vec3DArray(rng.normal(size=(count, 3)))
+    angles = rng.uniform(0.1, 1.0, count)
+    edge_list = [edges[i] for i in range(count)]
+    direction_list = [directions[i] for i in range(count)]
+    angle_list = angles.tolist()
+
+    start = time.perf_counter()
+    scalar = [
+        intersection_from_edge_direction_and_angle(edge, direction, angle)
+        for edge, direction, angle in zip(edge_list, direction_list, angle_list)
+    ]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = intersections_from_edge_directions_and_angles(edges, directions, angles)
+    batch_time = time.perf_counter() - start
+
+    out = np.empty(count)
+    start = time.perf_counter()
+    intersections_from_edge_directions_and_angles(edges, directions, angles, out=out)
+    out_time = time.perf_counter() - start
+
+    difference = float(np.max(np.abs(batch - np.array(scalar, dtype=np.float64))))
+    print(f"{count} vectors, max difference {difference:.1e}")
+    print(f"{'Vec3D':>12} {scalar_time:>8.3f} s")
+    print(f"{'Vec3DArray':>12} {batch_time:>8.3f} s {scalar_time / batch_time:>7.0f}x")
+    print(f"{'out=':>12} {out_time:>8.3f} s {scalar_time / out_time:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
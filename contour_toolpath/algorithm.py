@@ -1,79 +1,665 @@
-from collections import defaultdict
 import heapq
 import math
-from typing import Dict, List, Tuple
+import time
+from typing import Dict, Generic, Iterable, List, Literal, NewType, Sequence, Tuple, TypeVar
 
-from contour_toolpath.mesh import EdgeId, Mesh, TriangleId
-from contour_toolpath.window import Window, WindowLinear
-from contour_toolpath.window_propagation import propagate_window
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.fast_marching import fast_marching_distance_field
+from contour_toolpath.mesh import EdgeId, FaceId, IndexArray, Mesh, VertexId
+from contour_toolpath.propagation_stats import PropagationStats
+from contour_toolpath.window import WINDOW_EPSILON, Window, WindowCircular, WindowLinear, evaluate_distance_field, window_min_distance
+from contour_toolpath.window_intervals import DISTANCE_EPSILON, MergeResult, WindowMap
+from contour_toolpath.window_propagation import propagate_window, propagate_window_through_face
+from contour_toolpath.window_store import NO_ORIGIN, WindowHandle, WindowStore
 from mathutil.vector import Vec2D
 
 
 
 def create_windows_at_boundaries(mesh: Mesh) -> set[WindowLinear]:
-    triangles_by_edge_id: Dict[EdgeId, list[TriangleId]] = defaultdict(list)
-    for face_id, face in enumerate(mesh.faces):
-        for edge_id in face.edges:
-            triangles_by_edge_id[edge_id].append(TriangleId(face_id))
+    return create_windows_at_edges(mesh.adjacency.boundary_edges().tolist())
+
 
+def create_windows_at_edges(edges: Iterable[int]) -> set[WindowLinear]:
+    """ Source windows at distance 0 along the given boundary edges """
     windows: set[WindowLinear] = set()
-    for edge_id, _edge in enumerate(mesh.edges):
-        edge_id = EdgeId(edge_id)
-        if len(triangles_by_edge_id[edge_id]) == 1:
-            window = WindowLinear(
-                edge_id=edge_id,
+    for edge_id in edges:
+        window = WindowLinear(
+            edge_id=EdgeId(edge_id),
+            start_t=0.0,
+            end_t=1.0,
+            start_distance=0.0,
+            source_direction=math.pi / 2
+        )
+        windows.add(window)
+    return windows
+
+
+def create_windows_at_vertex(vertex: VertexId, distance: float, mesh: Mesh) -> list[WindowCircular]:
+    """
+    Treat a vertex as a point source (a pseudo-source in the MMP paper) at `distance`, creating a window on
+    the edge opposite the vertex in each of its faces, and on each edge touching the vertex.
+    Windows on the touching edges have their source on the edge itself, so they only carry the distance
+    along the edge and do not propagate.
+    """
+    adjacency = mesh.adjacency
+    windows: list[WindowCircular] = []
+    for face_id in adjacency.faces_of_vertex(vertex).tolist():
+        corner = mesh.face_vertices[face_id].tolist().index(vertex)
+        # The corner opposite edge slot i is corner i + 2
+        edge_id = int(mesh.face_edges[face_id, (corner + 1) % 3])
+        source_x, source_y = mesh.geometry.edge_face_opposite[adjacency.edge_face_index(edge_id, face_id)].tolist()
+        windows.append(WindowCircular(
+            edge_id=EdgeId(edge_id),
+            start_t=0.0,
+            end_t=1.0,
+            cumulative_distance=distance,
+            source_point=Vec2D(source_x, source_y),
+        ))
+    for edge_id in adjacency.edges_of_vertex(vertex).tolist():
+        is_start = int(mesh.edge_vertices[edge_id, 0]) == vertex
+        windows.append(WindowCircular(
+            edge_id=EdgeId(edge_id),
+            start_t=0.0,
+            end_t=1.0,
+            cumulative_distance=distance,
+            source_point=Vec2D(0.0 if is_start else float(mesh.geometry.edge_lengths[edge_id]), 0.0),
+        ))
+    return windows
+
+
+def create_windows_at_point(face: FaceId, weights: Sequence[float], mesh: Mesh) -> list[WindowCircular]:
+    """
+    A point source at distance 0 inside a face, given by barycentric `weights` of the face's corners (in
+    `Mesh.face_vertices` order): a window on each edge of the face. A point on an edge also gets windows
+    in the faces on the other side, and one along the edge itself. A point on a corner is a vertex source.
+    """
+    corners = mesh.face_vertices[face].tolist()
+    on_corner = [vertex for vertex, weight in zip(corners, weights) if weight >= 1.0 - WINDOW_EPSILON]
+    if on_corner:
+        return create_windows_at_vertex(VertexId(on_corner[0]), 0.0, mesh)
+    vertex_weights = {vertex: float(weight) for vertex, weight in zip(corners, weights) if weight > WINDOW_EPSILON}
+
+    adjacency = mesh.adjacency
+    edge_lengths = mesh.geometry.edge_lengths
+    faces = [int(face)]
+    on_edge: int | None = None
+    if len(vertex_weights) == 2:
+        # Edge slot i joins corners i and i + 1, so the edge opposite corner c is in slot c + 1
+        outside = next(i for i, vertex in enumerate(corners) if vertex not in vertex_weights)
+        on_edge = int(mesh.face_edges[face, (outside + 1) % 3])
+        faces = adjacency.faces_of_edge(on_edge).tolist()
+
+    windows: list[WindowCircular] = []
+    for face_id in faces:
+        for edge_id in mesh.face_edges[face_id].tolist():
+            if edge_id == on_edge:
+                continue
+            start, end = mesh.edge_vertices[edge_id].tolist()
+            opposite = next(v for v in mesh.face_vertices[face_id].tolist() if v != start and v != end)
+            opposite_x, opposite_y = mesh.geometry.edge_face_opposite[adjacency.edge_face_index(edge_id, face_id)].tolist()
+            # Barycentric combination of the corners in the edge's frame: start (0, 0), end (length, 0)
+            end_weight = vertex_weights.get(end, 0.0)
+            opposite_weight = vertex_weights.get(opposite, 0.0)
+            windows.append(WindowCircular(
+                edge_id=EdgeId(edge_id),
                 start_t=0.0,
                 end_t=1.0,
-                start_distance=0.0,
-                source_direction=math.pi / 2
-            )
-            windows.add(window)
+                cumulative_distance=0.0,
+                source_point=Vec2D(
+                    end_weight * float(edge_lengths[edge_id]) + opposite_weight * opposite_x,
+                    opposite_weight * opposite_y,
+                ),
+            ))
+    if on_edge is not None:
+        end = int(mesh.edge_vertices[on_edge, 1])
+        windows.append(WindowCircular(
+            edge_id=EdgeId(on_edge),
+            start_t=0.0,
+            end_t=1.0,
+            cumulative_distance=0.0,
+            source_point=Vec2D(vertex_weights[end] * float(edge_lengths[on_edge]), 0.0),
+        ))
     return windows
 
-def refine_mesh(mesh: Mesh, windows: set[Window]):
-    raise NotImplementedError("Refinement not implemented yet")
 
-def merge_windows(new_windows: List[Window], window_set: set[Window]) -> set[Window]:
-    raise NotImplementedError("Merging not implemented yet")
+def pseudo_source_vertices(mesh: Mesh, vertices: IndexArray | None = None) -> npt.NDArray[np.bool_]:
+    """
+    Vertices that shortest paths can bend around: saddle vertices (more than 2 pi of surface around them)
+    and vertices on the boundary. Windows passing these need a new point source at the vertex.
+    Given `vertices`, only those, in order, looking at the edges around them only.
+    """
+    if vertices is None:
+        is_boundary = np.zeros(len(mesh.positions), dtype=bool)
+        is_boundary[mesh.edge_vertices[mesh.adjacency.boundary_edges()].ravel()] = True
+        return is_boundary | (mesh.geometry.vertex_angle_sums > 2 * math.pi * (1 + 1e-9))
+    adjacency = mesh.adjacency
+    starts = adjacency.vertex_edge_offsets[vertices]
+    counts = adjacency.vertex_edge_offsets[vertices + 1] - starts
+    around = adjacency.vertex_edges[np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+    on_boundary = adjacency.edge_face_offsets[around + 1] - adjacency.edge_face_offsets[around] == 1
+    is_boundary = np.zeros(len(vertices), dtype=bool)
+    np.logical_or.at(is_boundary, np.repeat(np.arange(len(vertices)), counts), on_boundary)
+    return is_boundary | (mesh.geometry.vertex_angle_sums[vertices] > 2 * math.pi * (1 + 1e-9))
+
+
+def update_vertex_distances(window: Window, mesh: Mesh) -> list[VertexId]:
+    """
+    Lower the distance of the edge's end vertices if the window reaches them and is closer.
+    Returns the vertices that changed.
+    """
+    changed: list[VertexId] = []
+    start, end = mesh.edge_vertices[window.edge_id].tolist()
+    for vertex, t, covered in (
+        (start, 0.0, window.start_t <= WINDOW_EPSILON),
+        (end, 1.0, window.end_t >= 1.0 - WINDOW_EPSILON),
+    ):
+        if not covered:
+            continue
+        d = evaluate_distance_field(window, t, mesh)
+        current = float(mesh.distance[vertex])
+        if math.isnan(current) or d < current - DISTANCE_EPSILON * max(1.0, abs(current)):
+            mesh.distance[vertex] = d
+            changed.append(VertexId(vertex))
+    return changed
+
+
+def refine_mesh(mesh: Mesh, windows: WindowStore, step_over: float) -> int:
+    """ Split the faces where the distance field is not linear enough for contours `step_over` apart, see `refine.refine_mesh` """
+    from contour_toolpath.refine import refine_mesh as refine
+    return refine(mesh, windows, step_over)
+
+
+def merge_windows(
+    new_windows: Sequence[Window], window_map: WindowMap, origins: Sequence[int] | None = None
+) -> MergeResult:
+    """
+    Merge windows into the per-edge window lists, keeping for every point of every edge only the closest
+    window. Returns the window pieces that were added and the existing windows that were trimmed.
+    `origins`, aligned with `new_windows`, is stored with the kept pieces (see `WindowStore.origin`).
+    """
+    inserted: list[WindowHandle] = []
+    trimmed: list[tuple[WindowHandle, list[WindowHandle]]] = []
+    discarded = 0
+    if origins is None:
+        origins = [NO_ORIGIN] * len(new_windows)
+    for window, origin in zip(new_windows, origins):
+        result = window_map.insert(window, origin)
+        if not result.inserted:
+            discarded += 1
+        inserted.extend(result.inserted)
+        trimmed.extend(result.trimmed)
+    return MergeResult(inserted=inserted, trimmed=trimmed, discarded=discarded)
+
+
+class Propagation:
+    """
+    The state of a window propagation: the windows found so far, and the queue of windows that still
+    have to be propagated. Vertex distances go to `mesh.distance`.
+
+    `patch_faces` limits the propagation to some faces of the mesh: windows are only propagated into those
+    faces, and pseudo-source windows only created on their edges. The parallel mode runs one propagation
+    per patch and passes windows and vertex distances between them, which is what `track_edges` (record
+    the windows reaching these edges) and `track_vertices` (record the vertices whose distance went down)
+    are for.
+
+    Given a `stats` collector, the merge, the queue and propagation through faces go through counting and
+    timing versions instead, chosen once here so that a propagation without one pays nothing.
+
+    Given the `store` of a finished propagation, and its distances in `mesh.distance`, the propagation
+    picks up from there, so that sources can be added and removed (`add_sources`, `remove_sources`).
+
+    Windows that are nowhere closer than `max_distance` are dropped before they are merged, and vertices
+    beyond it spawn no pseudo-source windows, so the propagation stops at the cutoff.
+    """
+
+    def __init__(
+        self,
+        mesh: Mesh,
+        patch_faces: npt.NDArray[np.bool_] | None = None,
+        track_edges: npt.NDArray[np.bool_] | None = None,
+        track_vertices: bool = False,
+        stats: PropagationStats | None = None,
+        store: WindowStore | None = None,
+        max_distance: float = math.inf,
+    ):
+        self.mesh = mesh
+        self.max_distance = max_distance
+        self.spawns_windows = pseudo_source_vertices(mesh)
+        self.store = store if store is not None else WindowStore()
+        self.window_map = WindowMap(mesh, self.store)
+        if store is not None:
+            self.window_map.add_live_windows()
+        self.stats = stats
+        self.queue: PropagationQueue[WindowHandle] = (
+            PropagationQueue(max_distance=max_distance) if stats is None else CountingPropagationQueue(stats, max_distance=max_distance)
+        )
+        self._merge_windows = merge_windows if stats is None else self._merge_windows_counted
+        self._propagate_window = self._propagate if stats is None else self._propagate_timed
+        self.pending: Dict[WindowHandle, QueueHandle] = {}
+        """ Windows in the queue that have not been propagated yet """
+
+        self.patch_faces = patch_faces
+        self.patch_edges: npt.NDArray[np.bool_] | None = None
+        if patch_faces is not None:
+            self.patch_edges = np.zeros(len(mesh.edge_vertices), dtype=bool)
+            self.patch_edges[mesh.face_edges[patch_faces].ravel()] = True
+
+        self.track_edges = track_edges
+        self.tracked_windows: set[WindowHandle] = set()
+        """ Windows inserted on `track_edges`. Trimming one tracks its pieces instead """
+        self.tracked_vertices: list[VertexId] | None = [] if track_vertices else None
+        """ Vertices whose distance went down, when `track_vertices` is set """
+
+    def merge(self, new_windows: Sequence[Window], track: bool = True, origins: List[int] | None = None) -> None:
+        """
+        Merge windows into the window map and queue the parts that were kept. Vertices they reach get their
+        distance lowered, which can create more windows at pseudo-sources.
+        `track` = False leaves the windows out of `tracked_windows`, for windows that came from elsewhere.
+        `origins` is the source of each window (see `WindowStore.origin`), and passes on to the windows
+        created at pseudo-sources.
+        """
+        mesh = self.mesh
+        store = self.store
+        queue = self.queue
+        pending = self.pending
+        if origins is None:
+            origins = [NO_ORIGIN] * len(new_windows)
+        while new_windows:
+            if self.max_distance < math.inf:
+                max_distance = self.max_distance
+                within = [window_min_distance(w, mesh) <= max_distance for w in new_windows]
+                origins = [o for o, keep in zip(origins, within) if keep]
+                new_windows = [w for w, keep in zip(new_windows, within) if keep]
+            if self.patch_edges is not None:
+                patch_edges = self.patch_edges
+                origins = [o for w, o in zip(new_windows, origins) if patch_edges[w.edge_id]]
+                new_windows = [w for w in new_windows if patch_edges[w.edge_id]]
+            result = self._merge_windows(new_windows, self.window_map, origins)
+            new_windows = []
+            origins = []
+            for old, pieces in result.trimmed:
+                if old in self.tracked_windows:
+                    self.tracked_windows.remove(old)
+                    self.tracked_windows.update(pieces)
+                queue_handle = pending.pop(old, None)
+                if queue_handle is not None:
+                    # Not propagated yet: its pieces take its place in the queue
+                    queue.remove(queue_handle)
+                    for piece in pieces:
+                        pending[piece] = queue.push(piece, window_min_distance(store[piece], mesh))
+            for handle in result.inserted:
+                window = store[handle]
+                pending[handle] = queue.push(handle, window_min_distance(window, mesh))
+                if track and self.track_edges is not None and self.track_edges[window.edge_id]:
+                    self.tracked_windows.add(handle)
+                for vertex in update_vertex_distances(window, mesh):
+                    spawned = self._vertex_lowered(vertex)
+                    new_windows.extend(spawned)
+                    origins.extend([store.origin.item(handle)] * len(spawned))
+            track = True
+
+    def lower_vertex_distance(self, vertex: VertexId, distance: float, origin: int = NO_ORIGIN) -> None:
+        """ Take a vertex distance found elsewhere, if it is lower than the one known here """
+        current = float(self.mesh.distance[vertex])
+        if math.isnan(current) or distance < current - DISTANCE_EPSILON * max(1.0, abs(current)):
+            self.mesh.distance[vertex] = distance
+            spawned = self._vertex_lowered(vertex)
+            self.merge(spawned, origins=[origin] * len(spawned))
+
+    def _vertex_lowered(self, vertex: VertexId) -> list[WindowCircular]:
+        if self.tracked_vertices is not None:
+            self.tracked_vertices.append(vertex)
+        if not self.spawns_windows[vertex] or self.mesh.distance[vertex] > self.max_distance:
+            return []
+        return create_windows_at_vertex(vertex, float(self.mesh.distance[vertex]), self.mesh)
+
+    def run(self) -> None:
+        """ Propagate windows until the queue is empty """
+        store = self.store
+        propagate = self._propagate_window
+        start = time.perf_counter()
+        while not self.queue.empty():
+            handle = self.queue.pop()
+            self.pending.pop(handle, None)
+            new_windows = propagate(store[handle])
+            self.merge(new_windows, origins=[store.origin.item(handle)] * len(new_windows))
+        if self.stats is not None:
+            self.stats.run_seconds += time.perf_counter() - start
+
+    def add_sources(self, edges: Iterable[int]) -> None:
+        """ Merge windows for more source edges. Only the parts closer than what is already known are kept """
+        windows = list(create_windows_at_edges(edges))
+        self.merge(windows, origins=[int(w.edge_id) for w in windows])
+
+    def remove_sources(self, edges: Iterable[int]) -> None:
+        """
+        Kill the windows that descend from the given source edges, and prepare the queue to cover the region
+        they leave behind: the distances of the vertices around it are taken again from the windows that
+        remain, their pseudo-source windows are created again, and the remaining windows on the edges of the
+        faces around it are queued to propagate into it once more.
+        """
+        mesh = self.mesh
+        store = self.store
+        edge_arr = np.fromiter(edges, dtype=np.int64)
+        if not len(edge_arr):
+            return
+        handles = store.live_handles()
+        origins = store.origin[handles]
+        if np.any(origins == NO_ORIGIN):
+            raise ValueError("Windows without a recorded origin (from a parallel propagation) can't be traced back to their sources")
+        removed = np.zeros(len(mesh.edge_vertices), dtype=bool)
+        removed[edge_arr] = True
+        dead = handles[removed[origins]]
+        if not len(dead):
+            return
+        for handle in dead.tolist():
+            self.window_map.remove(WindowHandle(handle))
+            queue_handle = self.pending.pop(WindowHandle(handle), None)
+            if queue_handle is not None:
+                self.queue.remove(queue_handle)
 
+        emptied = np.zeros(len(mesh.edge_vertices), dtype=bool)
+        emptied[store.edge_id[dead]] = True
+        faces = np.flatnonzero(emptied[mesh.face_edges].any(axis=1))
+        region_edges = np.unique(mesh.face_edges[faces])
+        vertices = np.unique(mesh.face_vertices[faces])
 
-def propagate_distance_field(mesh: Mesh, initial_windows: set[Window]) -> set[Window]:
-    queue = PropagationQueue()
-    for w in initial_windows:
-        queue.push(w)
+        # Vertex distances from the windows that are left. Windows reaching a vertex lie on its edges
+        mesh.distance[vertices] = np.nan
+        in_region = np.zeros(len(mesh.positions), dtype=bool)
+        in_region[vertices] = True
+        vertex_origin: dict[VertexId, int] = {}
+        for edge in np.flatnonzero(in_region[mesh.edge_vertices].any(axis=1)).tolist():
+            edge_windows = self.window_map.edges.get(EdgeId(edge))
+            if edge_windows is None:
+                continue
+            for handle in edge_windows.handles:
+                for vertex in update_vertex_distances(store[handle], mesh):
+                    vertex_origin[vertex] = store.origin.item(handle)
 
-    window_set = set(initial_windows)
+        for vertex in vertices.tolist():
+            if vertex in vertex_origin and self.spawns_windows[vertex]:
+                spawned = self._vertex_lowered(VertexId(vertex))
+                self.merge(spawned, origins=[vertex_origin[VertexId(vertex)]] * len(spawned))
 
-    while not queue.empty():
-        window = queue.pop()
+        self.queue_edges(region_edges)
 
-        new_windows = propagate_window(window, mesh)
-        new_window_set = merge_windows(new_windows, window_set)
-        changed_windows = new_window_set - window_set
-        for w in changed_windows:
-            queue.push(w)
-        window_set = new_window_set
+    def extend_mesh(self) -> None:
+        """
+        Catch up with vertices and edges appended to the mesh by cutting up faces without moving the surface,
+        as `refine.split_edges` does: the window map takes the new edge lengths, and the new vertices spawn
+        windows if they are pseudo-sources. The windows on edges that changed length have to be moved onto
+        the new edges too, see `refine.split_windows`.
+        """
+        if self.patch_edges is not None or self.track_edges is not None:
+            raise ValueError("A propagation over a patch can't follow a changing mesh")
+        mesh = self.mesh
+        self.window_map.edge_lengths = mesh.geometry.edge_lengths
+        new_vertices = np.arange(len(self.spawns_windows), len(mesh.positions), dtype=np.int32)
+        self.spawns_windows = np.concatenate([self.spawns_windows, pseudo_source_vertices(mesh, new_vertices)])
 
+    def queue_edges(self, edges: Iterable[int]) -> None:
+        """ Queue the windows on the given edges to propagate again, into faces whose windows need redoing """
+        mesh = self.mesh
+        store = self.store
+        for edge in edges:
+            edge_windows = self.window_map.edges.get(EdgeId(edge))
+            if edge_windows is None:
+                continue
+            for handle in edge_windows.handles:
+                if handle not in self.pending:
+                    self.pending[handle] = self.queue.push(handle, window_min_distance(store[handle], mesh))
 
-    return window_set
+    def respawn_vertices(self, vertices: Iterable[int]) -> None:
+        """
+        Create the pseudo-source windows of the given vertices again from their distances, for when the faces
+        around them changed. Each keeps the origin of the closest window reaching it.
+        """
+        mesh = self.mesh
+        store = self.store
+        for vertex in vertices:
+            distance = float(mesh.distance[vertex])
+            if not self.spawns_windows[vertex] or math.isnan(distance):
+                continue
+            closest = math.inf
+            origin = NO_ORIGIN
+            for edge in mesh.adjacency.edges_of_vertex(vertex).tolist():
+                edge_windows = self.window_map.edges.get(EdgeId(edge))
+                if edge_windows is None:
+                    continue
+                t = 0.0 if int(mesh.edge_vertices[edge, 0]) == vertex else 1.0
+                for handle in edge_windows.handles:
+                    window = store[handle]
+                    if window.start_t - WINDOW_EPSILON <= t <= window.end_t + WINDOW_EPSILON:
+                        d = evaluate_distance_field(window, t, mesh)
+                        if d < closest:
+                            closest, origin = d, store.origin.item(handle)
+            spawned = self._vertex_lowered(VertexId(vertex))
+            self.merge(spawned, origins=[origin] * len(spawned))
 
+    def _merge_windows_counted(
+        self, new_windows: Sequence[Window], window_map: WindowMap, origins: Sequence[int] | None = None
+    ) -> MergeResult:
+        stats = self.stats
+        assert stats is not None
+        start = time.perf_counter()
+        result = merge_windows(new_windows, window_map, origins)
+        stats.phase_seconds["merge"] += time.perf_counter() - start
+        stats.windows_created += len(new_windows)
+        stats.windows_inserted += len(result.inserted)
+        stats.windows_trimmed += len(result.trimmed)
+        stats.windows_discarded += result.discarded
+        return result
 
+    def _propagate_timed(self, window: Window) -> list[Window]:
+        stats = self.stats
+        assert stats is not None
+        start = time.perf_counter()
+        new_windows = self._propagate(window)
+        stats.phase_seconds["propagate"] += time.perf_counter() - start
+        return new_windows
 
+    def _propagate(self, window: Window) -> list[Window]:
+        if self.patch_faces is None:
+            return propagate_window(window, self.mesh)
+        new_windows: list[Window] = []
+        for face_id in self.mesh.adjacency.faces_of_edge(window.edge_id).tolist():
+            if self.patch_faces[face_id]:
+                new_windows.extend(propagate_window_through_face(window, FaceId(face_id), self.mesh))
+        return new_windows
 
-class PropagationQueue:
-    def __init__(self):
-        self.heap: List[Tuple[float, Window]] = []
 
-    def push(self, window: Window):
-        min_d = min(window.start_distance, window.end_distance)
-        priority = window.cumulative_distance + min_d
-        heapq.heappush(self.heap, (priority, window))
+def propagate_distance_field(
+    mesh: Mesh, initial_windows: set[Window], stats: PropagationStats | None = None, max_distance: float = math.inf
+) -> WindowStore:
+    """
+    Propagate the windows over the mesh in order of distance, writing the distance of every reached vertex
+    to `mesh.distance`. Returns the store holding the windows, where the live rows are the final windows.
+    `stats` collects counts and timings of the propagation, see `PropagationStats`.
 
-    def pop(self) -> Window:
-        return heapq.heappop(self.heap)[1]
+    With a `max_distance`, only the part of the mesh within it is covered, and the work done scales with
+    that part rather than the whole mesh. Vertices beyond it are left unreached: NaN, like vertices no
+    source connects to. Faces with an unreached corner have no contours, so contour levels should stay
+    about an edge length below the cutoff.
+    """
+    mesh.distance[:] = np.nan
+    propagation = Propagation(mesh, stats=stats, max_distance=max_distance)
+    start = time.perf_counter()
+    windows = list(initial_windows)
+    propagation.merge(windows, origins=[int(w.edge_id) for w in windows])
+    propagation.run()
+    if max_distance < math.inf:
+        # Distances past the cutoff are only upper bounds from windows straddling it
+        mesh.distance[mesh.distance > max_distance] = np.nan
+    if stats is not None:
+        # Include merging the initial windows
+        stats.run_seconds = time.perf_counter() - start
+        stats.finish(propagation.store, len(mesh.edge_vertices))
+    return propagation.store
+
+
+def update_distance_field(
+    mesh: Mesh,
+    store: WindowStore,
+    added_sources: Iterable[int] = (),
+    removed_sources: Iterable[int] = (),
+    stats: PropagationStats | None = None,
+) -> WindowStore:
+    """
+    Update the result of `propagate_distance_field` (its `store`, and the distances left in `mesh.distance`)
+    after the source edges change, giving the same distances as propagating again from the new sources.
+
+    Removed sources take their windows with them, and only the region those windows covered is propagated
+    again, from the windows around it. Windows of added sources are merged against the windows already
+    there, so they only propagate as far as they are closer. A small change of the sources stays a small
+    amount of work.
+
+    The store is updated in place and returned. Windows in it need a known origin, which the parallel
+    propagation does not keep, so removing sources needs a store from the single process propagation.
+    Adding sources works on either.
+    """
+    propagation = Propagation(mesh, stats=stats, store=store)
+    start = time.perf_counter()
+    propagation.remove_sources(removed_sources)
+    propagation.add_sources(added_sources)
+    propagation.run()
+    if stats is not None:
+        stats.run_seconds = time.perf_counter() - start
+        stats.finish(store, len(mesh.edge_vertices))
+    return store
+
+
+DistanceEngine = Literal["exact", "fast_marching", "heat"]
+
+
+def compute_distance_field(
+    mesh: Mesh, engine: DistanceEngine = "exact", workers: int = 1, stats: PropagationStats | None = None
+) -> WindowStore | None:
+    """
+    Write the distance from the boundary of every vertex to `mesh.distance`.
+
+    "exact" propagates windows (`propagate_distance_field`) and returns them, over `workers` processes
+    when it is more than one (`parallel.propagate_distance_field_parallel`). "fast_marching" is first
+    order accurate, so its error shrinks with the edge length, but it is much faster. "heat" is less
+    accurate again, but after the first call on a mesh it only costs two sparse back-substitutions.
+    Neither of those has windows to return.
+
+    `stats` is filled in by the single process exact engine only.
+    """
+    if engine == "exact":
+        initial_windows: set[Window] = set(create_windows_at_boundaries(mesh))
+        if workers > 1:
+            from contour_toolpath.parallel import propagate_distance_field_parallel
+            return propagate_distance_field_parallel(mesh, initial_windows, workers)
+        return propagate_distance_field(mesh, initial_windows, stats)
+    if engine == "fast_marching":
+        fast_marching_distance_field(mesh)
+    else:
+        # scipy.sparse is only imported for this engine
+        from contour_toolpath.heat_method import heat_method_distance_field
+        heat_method_distance_field(mesh)
+    return None
+
+
+
+
+QueueHandle = NewType("QueueHandle", int)
+
+Item = TypeVar("Item")
+
+
+class PropagationQueue(Generic[Item]):
+    """
+    Min-priority queue of windows, or of handles to windows in a `WindowStore`.
+
+    `push` returns a handle that `remove` uses to drop a window that was trimmed or replaced before it was
+    popped. Removal only leaves a tombstone: the heap entry stays until it is popped and skipped, or until
+    tombstones make up more than `compaction_ratio` of the heap and it is rebuilt without them.
+    Equal priorities are popped in push order, so windows themselves are never compared.
+
+    Windows pushed with a priority above `max_distance` are dropped straight away: their handle is
+    already removed.
+    """
+
+    def __init__(self, compaction_ratio: float = 0.5, min_compaction_size: int = 1024, max_distance: float = math.inf):
+        self.max_distance = max_distance
+        self.heap: List[Tuple[float, int]] = []
+        self.live: Dict[int, Item] = {}
+        """ Windows that were pushed and not popped or removed yet, by sequence number """
+        self.next_sequence = 0
+        self.compaction_ratio = compaction_ratio
+        self.min_compaction_size = min_compaction_size
+
+        self.stale_skipped = 0
+        """ Number of removed entries that were skipped when popping """
+        self.compactions = 0
+
+    def push(self, window: Item, priority: float) -> QueueHandle:
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        if priority > self.max_distance:
+            return QueueHandle(sequence)
+        self.live[sequence] = window
+        heapq.heappush(self.heap, (priority, sequence))
+        return QueueHandle(sequence)
+
+    def remove(self, handle: QueueHandle) -> bool:
+        """ Drop a pushed window. Returns False if it was already popped or removed """
+        if self.live.pop(handle, None) is None:
+            return False
+        stale = len(self.heap) - len(self.live)
+        if stale >= self.min_compaction_size and stale > self.compaction_ratio * len(self.heap):
+            self.compact()
+        return True
+
+    def replace(self, handle: QueueHandle, window: Item, priority: float) -> QueueHandle:
+        """ Swap a pushed window for another one, e.g. after it was trimmed """
+        self.remove(handle)
+        return self.push(window, priority)
+
+    def compact(self) -> None:
+        """ Rebuild the heap without tombstones """
+        self.heap = [entry for entry in self.heap if entry[1] in self.live]
+        heapq.heapify(self.heap)
+        self.compactions += 1
+
+    def pop(self) -> Item:
+        while True:
+            _priority, sequence = heapq.heappop(self.heap)
+            window = self.live.pop(sequence, None)
+            if window is not None:
+                return window
+            self.stale_skipped += 1
 
     def empty(self) -> bool:
-        return len(self.heap) == 0
+        return len(self.live) == 0
 
     def __len__(self):
-        return len(self.heap)
\ No newline at end of file
+        return len(self.live)
+
+
+class CountingPropagationQueue(PropagationQueue[Item]):
+    """ A `PropagationQueue` that reports its pushes, pops and size to a `PropagationStats` """
+
+    def __init__(
+        self,
+        stats: PropagationStats,
+        compaction_ratio: float = 0.5,
+        min_compaction_size: int = 1024,
+        max_distance: float = math.inf,
+    ):
+        super().__init__(compaction_ratio, min_compaction_size, max_distance)
+        self.stats = stats
+
+    def push(self, window: Item, priority: float) -> QueueHandle:
+        start = time.perf_counter()
+        handle = super().push(window, priority)
+        self.stats.record_push(len(self.live), time.perf_counter() - start)
+        return handle
+
+    def pop(self) -> Item:
+        window = super().pop()
+        self.stats.record_pop(len(self.live))
+        return window
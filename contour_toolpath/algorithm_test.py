@@ -0,0 +1,166 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+from contour_toolpath.algorithm import (
+    PropagationQueue, create_windows_at_boundaries, create_windows_at_edges, propagate_distance_field, update_distance_field,
+)
+from contour_toolpath.mesh import EdgeId
+from contour_toolpath.propagation_stats import PropagationStats
+from contour_toolpath.testing import distance_to_boundary, make_plate_with_hole
+from contour_toolpath.window import Window, WindowCircular, WindowLinear
+from mathutil.vector import Vec2D
+
+
+def test_propagate_distance_field_on_plate_with_hole():
+    mesh = make_plate_with_hole(11)
+    windows = propagate_distance_field(mesh, set(create_windows_at_boundaries(mesh)))
+
+    assert not np.any(np.isnan(mesh.distance))
+    # On a flat part the geodesic distance to the boundary is the straight-line distance
+    assert np.allclose(mesh.distance, distance_to_boundary(mesh), atol=1e-12)
+    assert all(mesh.vertices[v].d is not None for v in range(len(mesh.vertices)))
+    # Every edge ends up covered by windows
+    assert {w.edge_id for w in windows} == set(range(len(mesh.edges)))
+
+
+def test_propagation_stats():
+    mesh = make_plate_with_hole(11)
+    initial: set[Window] = set(create_windows_at_boundaries(mesh))
+    propagate_distance_field(mesh, initial)
+    expected = mesh.distance.copy()
+
+    reports: list[int] = []
+    stats = PropagationStats(progress=lambda s: reports.append(s.pops), progress_interval=100)
+    windows = propagate_distance_field(mesh, initial, stats)
+    assert np.array_equal(mesh.distance, expected, equal_nan=True)
+
+    assert stats.windows_created >= len(initial)
+    assert 0 < stats.windows_discarded < stats.windows_created
+    assert stats.windows_trimmed > 0
+    # Everything pushed was popped, unless a trim took it out first, and the queue ends empty
+    assert stats.pops <= stats.pushes and stats.queue_size == 0
+    assert 0 < stats.peak_queue_size < stats.pushes
+    assert reports == list(range(100, stats.pops + 1, 100)) + [stats.pops]
+    assert sum(stats.phase_seconds.values()) <= stats.run_seconds
+
+    histogram = stats.edge_window_histogram
+    assert histogram is not None
+    assert histogram.sum() == len(mesh.edge_vertices)
+    assert (np.arange(len(histogram)) * histogram).sum() == len(windows)
+
+
+def test_update_distance_field_matches_full_propagation():
+    mesh = make_plate_with_hole(13)
+    boundary = mesh.adjacency.boundary_edges()
+    middle = mesh.positions[mesh.edge_vertices[boundary], :2].mean(axis=1)
+    hole = boundary[np.abs(middle - 0.5).max(axis=1) < 0.4]
+    outer = np.setdiff1d(boundary, hole)
+
+    def full(sources: np.ndarray) -> tuple[np.ndarray, PropagationStats]:
+        stats = PropagationStats()
+        propagate_distance_field(mesh, set(create_windows_at_edges(sources.tolist())), stats)
+        return mesh.distance.copy(), stats
+
+    without_hole, _ = full(outer)
+    few = outer[:3]
+    without_few, full_stats = full(np.setdiff1d(boundary, few))
+    everything, _ = full(boundary)
+    store = propagate_distance_field(mesh, set(create_windows_at_edges(outer.tolist())))
+
+    update_distance_field(mesh, store, added_sources=hole.tolist())
+    assert np.allclose(mesh.distance, everything, atol=1e-12)
+    # Every live window still knows its source
+    assert set(store.origin[store.live_handles()].tolist()) <= set(boundary.tolist())
+
+    stats = PropagationStats()
+    update_distance_field(mesh, store, removed_sources=few.tolist(), stats=stats)
+    assert np.allclose(mesh.distance, without_few, atol=1e-12)
+    assert stats.pops < full_stats.pops / 5
+
+    update_distance_field(mesh, store, added_sources=few.tolist(), removed_sources=hole.tolist())
+    assert np.allclose(mesh.distance, without_hole, atol=1e-12)
+
+
+def test_max_distance_stops_propagation():
+    mesh = make_plate_with_hole(13)
+    initial: set[Window] = set(create_windows_at_boundaries(mesh))
+    full_stats = PropagationStats()
+    full_windows = propagate_distance_field(mesh, initial, full_stats)
+    expected = mesh.distance.copy()
+
+    stats = PropagationStats()
+    windows = propagate_distance_field(mesh, initial, stats, max_distance=0.08)
+    within = expected <= 0.08
+    assert 0 < within.sum() < len(expected)
+    assert np.allclose(mesh.distance[within], expected[within], atol=1e-12)
+    assert np.all(np.isnan(mesh.distance[~within]))
+    assert stats.pops < full_stats.pops / 2
+    assert len(windows) < len(full_windows) / 2
+
+
+def test_propagation_queue_ties_and_removal():
+    queue = PropagationQueue[Window](min_compaction_size=1)
+    linear = WindowLinear(edge_id=EdgeId(0), start_t=0.0, end_t=1.0, source_direction=0.0, start_distance=0.0)
+    circular = WindowCircular(edge_id=EdgeId(0), start_t=0.0, end_t=1.0, cumulative_distance=0.0, source_point=Vec2D(0.0, -1.0))
+
+    # Equal priorities pop in push order without comparing the windows
+    queue.push(circular, 1.0)
+    queue.push(linear, 1.0)
+    assert queue.pop() == circular
+    assert queue.pop() == linear
+    assert queue.empty()
+
+    first = queue.push(linear, 2.0)
+    second = queue.push(circular, 3.0)
+    replaced = queue.replace(second, circular._replace(end_t=0.5), 1.0)
+    assert queue.remove(first)
+    assert not queue.remove(first)
+    assert len(queue) == 1
+    assert queue.pop() == circular._replace(end_t=0.5)
+    assert queue.empty()
+    assert not queue.remove(replaced)
+    # Two tombstones in a heap of three triggered a compaction, so nothing stale was left to skip
+    assert queue.compactions >= 1
+    assert queue.stale_skipped == 0
+
+
+def test_propagation_queue_skips_stale_entries():
+    queue = PropagationQueue[WindowLinear]()
+    linear = WindowLinear(edge_id=EdgeId(0), start_t=0.0, end_t=1.0, source_direction=0.0, start_distance=0.0)
+    handles = [queue.push(linear._replace(start_distance=float(i)), float(i)) for i in range(10)]
+    for handle in handles[:5]:
+        queue.remove(handle)
+
+    assert queue.pop().start_distance == 5.0
+    assert queue.stale_skipped == 5
+    assert queue.compactions == 0
+
+
+def test_propagation_queue_drops_entries_beyond_max_distance():
+    queue = PropagationQueue[WindowLinear](max_distance=20.0)
+    linear = WindowLinear(edge_id=EdgeId(0), start_t=0.0, end_t=1.0, source_direction=0.0, start_distance=0.0)
+    queue.push(linear, 20.0)
+    # Beyond the cutoff: never queued, so there is nothing to remove
+    assert not queue.remove(queue.push(linear._replace(start_distance=21.0), 21.0))
+    assert len(queue) == 1
+    assert queue.pop().start_distance == 0.0
+    assert queue.empty()
+
+
+IMPORT_SECONDS_BUDGET = 0.25
+""" For importing the propagation, on top of numpy. Worker processes pay it on startup """
+
+
+def test_import_is_headless_and_fast():
+    script = (
+        "import json, sys, time; import numpy; start = time.perf_counter(); import contour_toolpath.algorithm; "
+        "print(json.dumps([time.perf_counter() - start, sorted(m for m in sys.modules if m.split('.')[0] in ('matplotlib', 'plotly'))]))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=root).stdout
+    seconds, plotting_modules = json.loads(output)
+    assert plotting_modules == []
+    assert seconds < IMPORT_SECONDS_BUDGET
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Mapping
+
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.mesh import Mesh, mesh_array_dict, mesh_from_array_dict
+
+
+CACHE_VERSION = 1
+""" Part of every key. Bump it when the layout of anything cached changes """
+
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """ SHA-256 of the contents of a file, read in chunks """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(*parts: object) -> str:
+    """ A key for a content digest and the parameters computed with it. Parts are compared by `repr` """
+    return hashlib.sha256(repr((CACHE_VERSION,) + parts).encode()).hexdigest()[:32]
+
+
+class ArrayCache:
+    """
+    Named groups of arrays on disk, one directory of `.npy` files per key. Loaded arrays are memory mapped
+    copy-on-write, so opening an entry costs nothing up front and writing to it never touches the file.
+
+    Entries are evicted least recently used first once the cache is over `max_bytes`. Use is tracked by
+    the modification time of each entry's directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.isdir(self._path(key))
+
+    def load(self, key: str) -> dict[str, npt.NDArray[Any]] | None:
+        path = self._path(key)
+        try:
+            names = [name for name in os.listdir(path) if name.endswith(".npy")]
+            arrays = {name[:-4]: np.load(os.path.join(path, name), mmap_mode="c") for name in names}
+            os.utime(path)
+        except FileNotFoundError:
+            # Missing, or evicted by another process while it was being read
+            return None
+        return arrays
+
+    def store(self, key: str, arrays: Mapping[str, npt.NDArray[Any]]) -> None:
+        """ Write an entry, then evict old ones. The entry appears whole or not at all """
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.directory)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.asarray(array))
+        try:
+            os.rename(staging, self._path(key))
+        except OSError:
+            # Another process stored the same key first
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict(keep=key)
+
+    def entries(self) -> list[tuple[str, float, int]]:
+        """ (key, last use, bytes) of every entry, least recently used first """
+        entries: list[tuple[str, float, int]] = []
+        for key in os.listdir(self.directory):
+            path = self._path(key)
+            if key.startswith(".") or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                entries.append((key, os.stat(path).st_mtime, size))
+            except FileNotFoundError:
+                continue
+        entries.sort(key=lambda entry: entry[1])
+        return entries
+
+    @property
+    def nbytes(self) -> int:
+        return sum(size for _, _, size in self.entries())
+
+    def evict(self, keep: str | None = None) -> None:
+        """ Remove least recently used entries, except `keep`, until the cache fits in `max_bytes` """
+        entries = self.entries()
+        total = sum(size for _, _, size in entries)
+        for key, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            total -= size
+
+
+def cached_mesh(cache: ArrayCache, key: str, build: Callable[[], Mesh]) -> Mesh:
+    """
+    The mesh stored under `key`, with its adjacency, geometry and distance field, memory mapped from the
+    cache. On a miss `build` makes it, and it is stored for next time.
+    """
+    arrays = cache.load(key)
+    if arrays is not None:
+        return mesh_from_array_dict(arrays)
+    mesh = build()
+    cache.store(key, mesh_array_dict(mesh))
+    return mesh
@@ -0,0 +1,53 @@
+import os
+from pathlib import Path
+
+import numpy as np
+from contour_toolpath.cache import ArrayCache, cache_key, cached_mesh, file_digest
+from contour_toolpath.mesh import Mesh
+from contour_toolpath.testing import distance_to_boundary, make_plate_with_hole
+
+
+def test_cached_mesh_round_trip(tmp_path: Path):
+    cache = ArrayCache(str(tmp_path))
+    builds: list[Mesh] = []
+
+    def build() -> Mesh:
+        mesh = make_plate_with_hole(11)
+        mesh.distance[:] = distance_to_boundary(mesh)
+        builds.append(mesh)
+        return mesh
+
+    key = cache_key("digest", "exact")
+    assert key != cache_key("digest", "heat")
+    first = cached_mesh(cache, key, build)
+    second = cached_mesh(cache, key, build)
+    assert len(builds) == 1
+
+    # The arrays come back memory mapped, copy-on-write, and the derived tables with them
+    assert not second.positions.flags.owndata and second.positions.base is not None
+    assert isinstance(second.positions.base.base, np.memmap)
+    assert np.array_equal(second.face_vertices, first.face_vertices)
+    assert np.array_equal(second.distance, first.distance)
+    assert np.array_equal(second.adjacency.edge_faces, first.adjacency.edge_faces)
+    assert np.array_equal(second.geometry.edge_lengths, first.geometry.edge_lengths)
+    second.positions[0] = 99.0
+    assert not np.any(cached_mesh(cache, key, build).positions == 99.0)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path):
+    part = tmp_path / "part.stl"
+    part.write_bytes(b"solid part")
+    assert file_digest(str(part)) == file_digest(str(part))
+
+    cache = ArrayCache(str(tmp_path / "cache"), max_bytes=3 * 8000 + 500)
+    for i, key in enumerate("abc"):
+        cache.store(key, {"values": np.full(1000, float(i))})
+        # Space the use times apart, whatever the file system's timestamp resolution
+        os.utime(os.path.join(cache.directory, key), (i, i))
+    assert cache.load("a") is not None
+
+    # "b" is now the least recently used
+    cache.store("d", {"values": np.zeros(1000)})
+    assert [key for key, _, _ in cache.entries()] == ["c", "a", "d"]
+    assert "b" not in cache
+    assert cache.nbytes <= cache.max_bytes
@@ -0,0 +1,199 @@
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.mesh import FloatArray, IndexArray, Mesh
+
+
+# Marching triangles cases, indexed by which corners are at or above the level (bit i for corner i).
+# The segment runs between the two edge slots that touch the lone corner, from slot `start` to slot `end`,
+# chosen so that the larger distance is on its left when looking down the face normal
+_START_SLOT = np.array([-1, 0, 1, 1, 2, 0, 2, -1])
+_END_SLOT = np.array([-1, 2, 0, 2, 1, 1, 0, -1])
+
+
+class ContourSegments(NamedTuple):
+    """
+    The pieces of the iso-lines cut through the faces, one row per face crossed by a level. Every segment
+    starts and ends on a mesh edge and has the larger distance on its left, so segments on neighbouring
+    faces with the same winding run head to tail.
+    """
+
+    face: IndexArray
+    """ (S,) """
+
+    level: IndexArray
+    """ (S,) index into the levels """
+
+    start_edge: IndexArray
+    """ (S,) """
+
+    end_edge: IndexArray
+    """ (S,) """
+
+
+class Contour(NamedTuple):
+    level: float
+
+    points: FloatArray
+    """ (K, 3) """
+
+    edges: IndexArray
+    """ (K,) the mesh edge each point lies on """
+
+    closed: bool
+    """ The last point joins back to the first, which is not repeated """
+
+
+def contour_levels(mesh: Mesh, step_over: float, first: float | None = None) -> FloatArray:
+    """ Levels every `step_over` from `first` (by default `step_over`) up to the largest known distance """
+    if first is None:
+        first = step_over
+    known = mesh.distance[~np.isnan(mesh.distance)]
+    if len(known) == 0 or np.max(known) < first:
+        return np.zeros(0, dtype=np.float64)
+    count = int(np.floor((np.max(known) - first) / step_over)) + 1
+    return first + step_over * np.arange(count, dtype=np.float64)
+
+
+def marching_triangles(mesh: Mesh, levels: npt.ArrayLike, faces: IndexArray | None = None) -> ContourSegments:
+    """
+    Cut every face (or just `faces`) by every level it spans in one pass. The levels must be increasing.
+
+    A corner counts as above a level when its distance is at least the level, so a face is crossed by
+    the levels in `(min, max]` of its corners and always on exactly two edges. Faces with an unknown
+    (NaN) corner are skipped.
+    """
+    level_arr = np.asarray(levels, dtype=np.float64).ravel()
+    if np.any(np.diff(level_arr) <= 0):
+        raise ValueError("Contour levels must be strictly increasing")
+
+    if faces is None:
+        faces = np.arange(len(mesh.face_vertices), dtype=np.int32)
+    corner_distance = mesh.distance[mesh.face_vertices[faces]]
+    known = ~np.isnan(corner_distance).any(axis=1)
+    faces, corner_distance = faces[known], corner_distance[known]
+
+    # The levels crossing each face are a contiguous run of the sorted levels
+    lowest: FloatArray = corner_distance.min(axis=1)
+    highest: FloatArray = corner_distance.max(axis=1)
+    first = np.searchsorted(level_arr, lowest, side="right")
+    stop = np.searchsorted(level_arr, highest, side="right")
+    counts = stop - first
+    total = int(counts.sum())
+    run_starts = np.cumsum(counts) - counts
+    pair = np.repeat(np.arange(len(faces)), counts)
+    pair_level = first[pair] + np.arange(total) - run_starts[pair]
+
+    above = corner_distance[pair] >= level_arr[pair_level][:, None]
+    case = above[:, 0] + 2 * above[:, 1] + 4 * above[:, 2]
+    pair_face = faces[pair]
+    face_edges = mesh.face_edges[pair_face]
+    rows = np.arange(total)
+    return ContourSegments(
+        face=pair_face.astype(np.int32),
+        level=pair_level.astype(np.int32),
+        start_edge=face_edges[rows, _START_SLOT[case]],
+        end_edge=face_edges[rows, _END_SLOT[case]],
+    )
+
+
+def link_segments(segments: ContourSegments, num_edges: int) -> list[tuple[int, IndexArray, bool]]:
+    """
+    Join segments into polylines of crossing points, returned as (level index, point ids, closed).
+    A crossing point is keyed by its level and edge, `level * num_edges + edge`, so the ends of segments on
+    neighbouring faces get the same key exactly and the join is a grouping by key, with no search for
+    nearby endpoints. Point ids are those keys.
+
+    Polylines follow the segment direction where the mesh winding is consistent. They are ordered by level,
+    and within a level the open ones (ending on the boundary or at unknown distances) come first.
+    """
+    keys = np.stack([
+        segments.level.astype(np.int64) * num_edges + segments.start_edge,
+        segments.level.astype(np.int64) * num_edges + segments.end_edge,
+    ], axis=1)
+    node_keys, inverse = np.unique(keys, return_inverse=True)
+    seg_nodes = inverse.reshape(-1, 2)
+    num_nodes = len(node_keys)
+
+    # Up to two neighbours per point. More only happen on non-manifold edges, and those extra joins are dropped
+    ends = seg_nodes.ravel()
+    others = seg_nodes[:, ::-1].ravel()
+    order = np.argsort(ends, kind="stable")
+    sorted_ends = ends[order]
+    rank = np.arange(len(sorted_ends)) - np.searchsorted(sorted_ends, sorted_ends, side="left")
+    keep = rank < 2
+    neighbours = np.full((num_nodes, 2), -1, dtype=np.int64)
+    neighbours[sorted_ends[keep], rank[keep]] = others[order][keep]
+    forward = np.full(num_nodes, -1, dtype=np.int64)
+    forward[seg_nodes[:, 0]] = seg_nodes[:, 1]
+
+    degree = np.sum(neighbours >= 0, axis=1)
+    neighbour_list: list[list[int]] = neighbours.tolist()
+    forward_list: list[int] = forward.tolist()
+    visited = bytearray(num_nodes)
+
+    def walk(start: int, step: int) -> tuple[list[int], bool]:
+        chain = [start]
+        visited[start] = 1
+        previous, node = start, step
+        while node >= 0 and not visited[node]:
+            visited[node] = 1
+            chain.append(node)
+            a, b = neighbour_list[node]
+            previous, node = node, (b if a == previous else a)
+        return chain, node == start
+
+    chains: list[tuple[list[int], bool]] = []
+    for start in np.flatnonzero(degree == 1).tolist():
+        if not visited[start]:
+            chain, _ = walk(start, neighbour_list[start][0])
+            if len(chain) > 1 and forward_list[chain[0]] != chain[1]:
+                chain.reverse()
+            chains.append((chain, False))
+    for start in np.flatnonzero(degree == 2).tolist():
+        if not visited[start]:
+            step = forward_list[start] if forward_list[start] >= 0 else neighbour_list[start][0]
+            chains.append(walk(start, step))
+
+    node_levels = node_keys // max(num_edges, 1)
+    linked = [
+        (int(node_levels[chain[0]]), node_keys[np.array(chain)], closed)
+        for chain, closed in chains
+    ]
+    linked.sort(key=lambda polyline: polyline[0])
+    return linked
+
+
+def extract_contours(mesh: Mesh, levels: npt.ArrayLike, faces: IndexArray | None = None) -> list[Contour]:
+    """
+    Iso-lines of `mesh.distance` at each level as polylines, ordered by level. `faces` limits the faces
+    cut, which must include every face the levels cross for the polylines to be whole.
+    Each point is interpolated along its edge, so polylines from neighbouring faces meet exactly.
+    """
+    level_arr = np.asarray(levels, dtype=np.float64).ravel()
+    num_edges = len(mesh.edge_vertices)
+    linked = link_segments(marching_triangles(mesh, level_arr, faces), num_edges)
+    if not linked:
+        return []
+
+    keys = np.concatenate([point_keys for _, point_keys, _ in linked])
+    edges = (keys % num_edges).astype(np.int32)
+    starts, ends = mesh.edge_vertices[edges, 0], mesh.edge_vertices[edges, 1]
+    start_distance, end_distance = mesh.distance[starts], mesh.distance[ends]
+    t = (level_arr[keys // num_edges] - start_distance) / (end_distance - start_distance)
+    points = mesh.positions[starts] + t[:, None] * (mesh.positions[ends] - mesh.positions[starts])
+
+    contours: list[Contour] = []
+    offset = 0
+    for level, point_keys, closed in linked:
+        stop = offset + len(point_keys)
+        contours.append(Contour(
+            level=float(level_arr[level]),
+            points=points[offset:stop],
+            edges=edges[offset:stop],
+            closed=closed,
+        ))
+        offset = stop
+    return contours
@@ -0,0 +1,46 @@
+import numpy as np
+from contour_toolpath.contour import contour_levels, extract_contours, marching_triangles
+from contour_toolpath.testing import distance_to_boundary, make_plate_with_hole
+
+
+def signed_area(points: np.ndarray) -> float:
+    x, y = points[:, 0], points[:, 1]
+    return 0.5 * float(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y))
+
+
+def test_closed_contours_around_plate_with_hole():
+    mesh = make_plate_with_hole(21)
+    mesh.distance[:] = distance_to_boundary(mesh)
+    levels = contour_levels(mesh, 0.05, first=0.04)
+    assert np.allclose(levels, [0.04, 0.09, 0.14])
+
+    # Above about 0.15 the band between the hole and the outside breaks up into islands
+    contours = extract_contours(mesh, levels[:2])
+    assert [c.level for c in contours] == [0.04, 0.04, 0.09, 0.09]
+    for contour in contours:
+        assert contour.closed
+        # Every point lies on its edge at the level, by linear interpolation of the end distances
+        start, end = mesh.edge_vertices[contour.edges].T
+        lo = np.minimum(mesh.distance[start], mesh.distance[end])
+        hi = np.maximum(mesh.distance[start], mesh.distance[end])
+        assert np.all((lo < contour.level) & (contour.level <= hi))
+
+    # Larger distance on the left: counter-clockwise inside the outer boundary, clockwise around the hole
+    areas = sorted(signed_area(c.points) for c in contours[:2])
+    assert areas[0] < 0 < areas[1]
+
+
+def test_open_contours_end_on_the_boundary():
+    mesh = make_plate_with_hole(21)
+    mesh.distance[:] = mesh.positions[:, 0]
+
+    # The hole spans x in [0.3, 0.7], so the line x = 0.5 comes out as two pieces
+    contours = extract_contours(mesh, [0.2, 0.5])
+    assert [(c.level, c.closed) for c in contours] == [(0.2, False), (0.5, False), (0.5, False)]
+    assert np.allclose(contours[0].points[:, 0], 0.2)
+    boundary = set(mesh.adjacency.boundary_edges().tolist())
+    for contour in contours:
+        assert {int(contour.edges[0]), int(contour.edges[-1])} <= boundary
+    # One segment per face crossed, and each polyline uses all of its segments
+    segments = marching_triangles(mesh, [0.2, 0.5])
+    assert sum(len(c.points) - 1 for c in contours) == len(segments.face)
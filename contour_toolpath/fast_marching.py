@@ -0,0 +1,303 @@
+import heapq
+import math
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.mesh import FloatArray, IndexArray, Mesh
+from contour_toolpath.topology import OffsetArray
+
+
+MAX_UNFOLD_STEPS = 16
+""" How many faces to unfold looking for a vertex that splits an obtuse corner before giving up """
+
+
+class MarchingStencils(NamedTuple):
+    """
+    The local updates of first order fast marching: stencil `s` computes the distance of `target[s]` from
+    the distances of its two `supports[s]`, assuming the front is planar across the triangle they form.
+
+    Every corner of every face is a stencil, except obtuse corners. Those can't be updated from their own
+    face without breaking causality, so they are split in two by a vertex found by unfolding the
+    neighbouring faces into the plane (Kimmel and Sethian, 1998), and the two halves are the stencils.
+    """
+
+    target: IndexArray
+    """ (S,) """
+    supports: IndexArray
+    """ (S, 2) """
+    support_lengths: FloatArray
+    """ (S, 2) distance from the target to each support """
+    inverse_gram: FloatArray
+    """ (S, 3) the entries q00, q01, q11 of the inverse Gram matrix of the two target->support vectors """
+
+    update_offsets: OffsetArray
+    """ (N + 1,) CSR offsets into the `update_*` columns, by support vertex """
+    update_target: IndexArray
+    """ The target of each stencil the vertex is a support of """
+    update_other: IndexArray
+    """ The other support of the stencil """
+    update_length: FloatArray
+    """ Distance from the target to the vertex """
+    update_inverse_gram: FloatArray
+    """ (U, 3) `inverse_gram` of the stencil, reordered so that the vertex is support 0 """
+
+
+def _unfold_corner(p: FloatArray, q: FloatArray, length_pr: float, length_qr: float) -> FloatArray:
+    """ Where the third corner `r` of a triangle over the 2D edge p-q lands, on the far side from the origin """
+    edge = q - p
+    length_pq = math.hypot(*edge)
+    along = (length_pr * length_pr - length_qr * length_qr + length_pq * length_pq) / (2 * length_pq)
+    height = math.sqrt(max(length_pr * length_pr - along * along, 0.0))
+    e = edge / length_pq
+    n = np.array([-e[1], e[0]])
+    if n @ p < 0:
+        n = -n
+    return p + along * e + height * n
+
+
+def _split_obtuse_corner(mesh: Mesh, face: int, corner: int) -> list[tuple[int, int, FloatArray, FloatArray]]:
+    """
+    Find a vertex inside the section of an obtuse corner where it makes acute angles with both sides,
+    by unfolding faces across the opposite edge. Returns the two stencils as (support, support, 2D support
+    positions relative to the corner), or nothing if the unfolding runs into the boundary.
+    """
+    adjacency = mesh.adjacency
+    positions = mesh.positions
+    face_vertices = mesh.face_vertices
+    c = int(face_vertices[face, corner])
+    a = int(face_vertices[face, (corner + 1) % 3])
+    b = int(face_vertices[face, (corner + 2) % 3])
+    angle = float(mesh.geometry.corner_angles[face, corner])
+
+    def length(u: int, v: int) -> float:
+        return float(np.linalg.norm(positions[u] - positions[v]))
+
+    point_a = np.array([length(c, a), 0.0])
+    point_b = length(c, b) * np.array([math.cos(angle), math.sin(angle)])
+    # Directions in this range make an acute angle with both CA and CB
+    lowest, highest = angle - math.pi / 2, math.pi / 2
+
+    p, q, point_p, point_q = a, b, point_a, point_b
+    edge = int(mesh.face_edges[face, (corner + 1) % 3])
+    for _ in range(MAX_UNFOLD_STEPS):
+        faces = adjacency.faces_of_edge(edge).tolist()
+        if len(faces) != 2:
+            break
+        k = 1 if faces[0] == face else 0
+        face = faces[k]
+        slot = int(adjacency.face_slots_of_edge(edge)[k])
+        r = int(adjacency.face_opposite_vertex[face, slot])
+        point_r = _unfold_corner(point_p, point_q, length(p, r), length(q, r))
+        direction = math.atan2(point_r[1], point_r[0])
+        if lowest <= direction <= highest:
+            return [(a, r, point_a, point_r), (r, b, point_r, point_b)]
+        if direction < lowest:
+            p, point_p = r, point_r
+        else:
+            q, point_q = r, point_r
+        corners = face_vertices[face].tolist()
+        for i in range(3):
+            if {corners[i], corners[(i + 1) % 3]} == {p, q}:
+                edge = int(mesh.face_edges[face, i])
+    return []
+
+
+def _split_across_opposite_edge(
+    mesh: Mesh, faces: npt.NDArray[np.integer], corners: npt.NDArray[np.integer]
+) -> tuple[IndexArray, IndexArray, FloatArray]:
+    """
+    The first unfolding step of `_split_obtuse_corner` for many corners at once, using the opposite
+    corners that `MeshGeometry` already has in each edge's frame. Returns which corners were split, and
+    for those the three supports (edge start, unfolded vertex, edge end) and their 2D vectors from the corner.
+    """
+    adjacency = mesh.adjacency
+    opposite = mesh.geometry.edge_face_opposite
+    edges = mesh.face_edges[faces, (corners + 1) % 3]
+    first = adjacency.edge_face_offsets[edges]
+    manifold = adjacency.edge_face_counts()[edges] == 2
+    own = np.where(adjacency.edge_faces[first] == faces, first, first + 1)
+    other = np.where(own == first, first + 1, first)
+    other[~manifold] = own[~manifold]
+
+    lengths = mesh.geometry.edge_lengths[edges]
+    corner_point = opposite[own]
+    points = np.stack([
+        -corner_point,
+        opposite[other] - corner_point,
+        np.stack([lengths, np.zeros(len(edges))], axis=1) - corner_point,
+    ], axis=1)
+    # The unfolded vertex has to make an acute angle with both sides of the corner
+    split = manifold & (np.einsum("ki,ki->k", points[:, 1], points[:, 0]) >= 0) & (
+        np.einsum("ki,ki->k", points[:, 1], points[:, 2]) >= 0
+    )
+    supports = np.stack([
+        mesh.edge_vertices[edges, 0],
+        adjacency.face_opposite_vertex[adjacency.edge_faces[other], adjacency.edge_face_slots[other]],
+        mesh.edge_vertices[edges, 1],
+    ], axis=1)
+    return split, supports[split], points[split]
+
+
+def build_marching_stencils(mesh: Mesh) -> MarchingStencils:
+    face_vertices = mesh.face_vertices
+    positions = mesh.positions
+    obtuse = mesh.geometry.corner_angles > math.pi / 2
+
+    # Acute and right corners: the face itself, with the two other corners as supports
+    faces, corners = np.nonzero(~obtuse)
+    target = face_vertices[faces, corners]
+    supports = np.stack([face_vertices[faces, (corners + 1) % 3], face_vertices[faces, (corners + 2) % 3]], axis=1)
+    vectors = positions[supports] - positions[target][:, None, :]
+
+    # Obtuse corners: most are split by the vertex right across the opposite edge
+    faces, corners = np.nonzero(obtuse)
+    split, split_supports, split_points = _split_across_opposite_edge(mesh, faces, corners)
+    split_target = np.repeat(face_vertices[faces[split], corners[split]], 2)
+    split_supports = split_supports[:, [0, 1, 1, 2]].reshape(-1, 2)
+    split_points = split_points[:, [0, 1, 1, 2]].reshape(-1, 2, 2)
+
+    extra_target: list[int] = []
+    extra_supports: list[tuple[int, int]] = []
+    extra_vectors: list[tuple[FloatArray, FloatArray]] = []
+    for face, corner in zip(faces[~split].tolist(), corners[~split].tolist()):
+        c = int(face_vertices[face, corner])
+        split_further = _split_obtuse_corner(mesh, face, corner)
+        if not split_further:
+            # Nothing to split with: keep the face, its update only ever falls back to the edges
+            split_further = [(
+                int(face_vertices[face, (corner + 1) % 3]),
+                int(face_vertices[face, (corner + 2) % 3]),
+                positions[face_vertices[face, (corner + 1) % 3]] - positions[c],
+                positions[face_vertices[face, (corner + 2) % 3]] - positions[c],
+            )]
+        for s0, s1, v0, v1 in split_further:
+            extra_target.append(c)
+            extra_supports.append((s0, s1))
+            extra_vectors.append((v0, v1))
+
+    def gram_of(vectors: FloatArray) -> FloatArray:
+        return np.einsum("sij,skj->sik", vectors, vectors).reshape(-1, 4)[:, [0, 1, 3]]
+
+    # Only dot products are needed, so the 3D face vectors and the 2D unfolded ones mix freely
+    gram = np.concatenate([
+        gram_of(vectors),
+        gram_of(split_points),
+        *(np.array([[v0 @ v0, v0 @ v1, v1 @ v1]]) for v0, v1 in extra_vectors),
+    ])
+    target = np.concatenate([target, split_target, np.array(extra_target, dtype=np.int64)]).astype(np.int32)
+    supports = np.concatenate([
+        supports, split_supports, np.array(extra_supports, dtype=np.int64).reshape(-1, 2)
+    ]).astype(np.int32)
+
+    g00, g01, g11 = gram.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        det = g00 * g11 - g01 * g01
+        inverse_gram = np.stack([g11 / det, -g01 / det, g00 / det], axis=1)
+    # Degenerate triangles never produce a triangle update, only the edge updates
+    inverse_gram[~(np.abs(det) > 1e-12 * g00 * g11)] = np.nan
+
+    support_lengths = np.sqrt(gram[:, [0, 2]])
+
+    # Every stencil once per support, grouped by support, so that accepting a vertex reads one
+    # contiguous block of each column
+    flat_supports = supports.ravel()
+    order = np.argsort(flat_supports, kind="stable")
+    update_offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat_supports, minlength=len(positions)), out=update_offsets[1:])
+    stencil, slot = order // 2, order % 2
+    swapped = inverse_gram[:, [2, 1, 0]]
+
+    return MarchingStencils(
+        target=target,
+        supports=supports,
+        support_lengths=support_lengths,
+        inverse_gram=inverse_gram,
+        update_offsets=update_offsets,
+        update_target=target[stencil],
+        update_other=supports[stencil, 1 - slot],
+        update_length=support_lengths[stencil, slot],
+        update_inverse_gram=np.where(slot[:, None] == 0, inverse_gram[stencil], swapped[stencil]),
+    )
+
+
+def boundary_vertices(mesh: Mesh) -> IndexArray:
+    """ The vertices of the boundary edges, the same edges `create_windows_at_boundaries` starts from """
+    return np.unique(mesh.edge_vertices[mesh.adjacency.boundary_edges()]).astype(np.int32)
+
+
+def fast_marching_distance_field(
+    mesh: Mesh,
+    seed_vertices: IndexArray | None = None,
+    stencils: MarchingStencils | None = None,
+) -> FloatArray:
+    """
+    First order fast marching from the seed vertices (by default the boundary), writing the distance of
+    every reached vertex to `mesh.distance`, which is also returned.
+
+    Vertices are accepted in order of distance from a heap like Dijkstra's algorithm. When a vertex is
+    accepted, every stencil it supports is updated at once with array operations: a triangle update where
+    the other support is accepted too, and an update along the edge from the vertex otherwise.
+    """
+    if stencils is None:
+        stencils = build_marching_stencils(mesh)
+    if seed_vertices is None:
+        seed_vertices = boundary_vertices(mesh)
+
+    num_vertices = len(mesh.positions)
+    distance = np.full(num_vertices, np.inf)
+    accepted = np.zeros(num_vertices, dtype=bool)
+    distance[seed_vertices] = 0.0
+    heap = [(0.0, vertex) for vertex in seed_vertices.tolist()]
+    heapq.heapify(heap)
+
+    offsets = stencils.update_offsets.tolist()
+    q_own, q_mixed, q_other = stencils.update_inverse_gram.T
+    # Per-stencil constants of the quadratic below
+    alpha = q_own + 2 * q_mixed + q_other
+    beta_own = q_own + q_mixed
+    beta_other = q_mixed + q_other
+
+    while heap:
+        d, vertex = heapq.heappop(heap)
+        if accepted[vertex]:
+            continue
+        accepted[vertex] = True
+
+        block = slice(offsets[vertex], offsets[vertex + 1])
+        targets = stencils.update_target[block]
+        others = stencils.update_other[block]
+        other_open = ~accepted[others]
+        # Only read the other support where it is final. Elsewhere the triangle update is discarded anyway
+        u = distance[others]
+        u[other_open] = d
+
+        # |grad d| = 1 across the triangle: a quadratic in the target's distance
+        qo, qm, qx = q_own[block], q_mixed[block], q_other[block]
+        a = alpha[block]
+        b = beta_own[block] * d + beta_other[block] * u
+        c = qo * d * d + 2 * qm * d * u + qx * u * u - 1
+        discriminant = b * b - a * c
+        solution = (b + np.sqrt(np.maximum(discriminant, 0.0))) / a
+        # The front has to arrive from inside the triangle: the gradient, written in terms of the two
+        # target->support vectors, has non-positive coefficients
+        downwind = (
+            other_open
+            | (discriminant < 0)
+            | (qo * (d - solution) + qm * (u - solution) > 0)
+            | (qm * (d - solution) + qx * (u - solution) > 0)
+        )
+        solution[downwind] = np.inf
+        candidate = np.minimum(d + stencils.update_length[block], solution)
+
+        improved = candidate < distance[targets]
+        # A target can be in the block more than once, so the smallest candidate has to win
+        for v, new in zip(targets[improved].tolist(), candidate[improved].tolist()):
+            if new < distance[v] and not accepted[v]:
+                distance[v] = new
+                heapq.heappush(heap, (new, v))
+
+    distance[~accepted] = np.nan
+    mesh.distance[:] = distance
+    return mesh.distance
@@ -0,0 +1,30 @@
+import math
+
+import numpy as np
+from contour_toolpath.algorithm import compute_distance_field
+from contour_toolpath.fast_marching import boundary_vertices, build_marching_stencils
+from contour_toolpath.testing import distance_to_boundary, make_plate_with_hole
+
+
+def test_obtuse_corners_are_split():
+    mesh = make_plate_with_hole(21)
+    stencils = build_marching_stencils(mesh)
+
+    # The jittered grid has plenty of obtuse corners, and each one becomes two stencils
+    num_obtuse = int(np.sum(mesh.geometry.corner_angles > math.pi / 2))
+    assert num_obtuse > 0
+    assert len(stencils.target) == 3 * len(mesh.face_edges) + num_obtuse
+    # Every stencil is acute at its target: the off-diagonal of the inverse Gram matrix is not positive
+    assert np.all(stencils.inverse_gram[:, 1] <= 0)
+
+
+def test_fast_marching_distance_to_boundary():
+    mesh = make_plate_with_hole(21)
+    assert compute_distance_field(mesh, "fast_marching") is None
+
+    assert not np.any(np.isnan(mesh.distance))
+    assert np.all(mesh.distance[boundary_vertices(mesh)] == 0.0)
+    # First order: close to the exact distance, but not to rounding error
+    error = np.abs(mesh.distance - distance_to_boundary(mesh))
+    assert np.max(error) < 0.02
+    assert np.mean(error) < 1e-3
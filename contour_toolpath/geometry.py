@@ -0,0 +1,94 @@
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.mesh import FloatArray, Mesh
+
+
+class MeshGeometry(NamedTuple):
+    """
+    Per-edge and per-triangle geometry of a `Mesh`, built once by `build_geometry` and cached on
+    `Mesh.geometry`.
+
+    Every edge has a local 2D frame: the edge start is at (0, 0) and the edge end at (length, 0). The
+    faces touching the edge are unfolded into that frame. The first face of the edge (in
+    `MeshAdjacency.edge_faces` order) is unfolded to +Y and any others to -Y, so on a manifold edge the
+    two faces lie on opposite sides, and a window whose source is on one side propagates into the face
+    on the other.
+    """
+
+    edge_lengths: FloatArray
+    """ (E,) """
+
+    corner_angles: FloatArray
+    """ (F, 3) interior angle of each face at each of its corners """
+
+    vertex_angle_sums: FloatArray
+    """ (N,) sum of the corner angles around each vertex. Above 2 pi for saddle vertices """
+
+    edge_face_opposite: FloatArray
+    """
+    (K, 2) aligned with `MeshAdjacency.edge_faces`: the corner of the face opposite the edge, in the
+    edge's local frame
+    """
+
+
+def build_geometry(mesh: Mesh) -> MeshGeometry:
+    adjacency = mesh.adjacency
+    positions = mesh.positions
+
+    edge_start = positions[mesh.edge_vertices[:, 0]]
+    edge_vec = positions[mesh.edge_vertices[:, 1]] - edge_start
+    edge_lengths = np.linalg.norm(edge_vec, axis=1)
+
+    corner_angles = corner_angles_of(positions, mesh.face_vertices)
+    vertex_angle_sums = np.asarray(
+        np.bincount(mesh.face_vertices.ravel(), weights=corner_angles.ravel(), minlength=len(positions)),
+        dtype=np.float64,
+    )
+
+    edge_ids = np.repeat(np.arange(len(edge_lengths)), np.diff(adjacency.edge_face_offsets))
+    opposite = adjacency.face_opposite_vertex[adjacency.edge_faces, adjacency.edge_face_slots]
+    is_first_face = np.zeros(len(edge_ids), dtype=bool)
+    is_first_face[adjacency.edge_face_offsets[:-1][np.diff(adjacency.edge_face_offsets) > 0]] = True
+
+    return MeshGeometry(
+        edge_lengths=edge_lengths,
+        corner_angles=corner_angles,
+        vertex_angle_sums=vertex_angle_sums,
+        edge_face_opposite=opposite_in_edge_frame(mesh, edge_ids, opposite, is_first_face),
+    )
+
+
+def corner_angles_of(positions: FloatArray, face_vertices: npt.NDArray[np.integer]) -> FloatArray:
+    """ (F, 3) the angle of each face at each of its corners """
+    corners = positions[face_vertices]
+    to_next = np.roll(corners, -1, axis=1) - corners
+    to_prev = np.roll(corners, 1, axis=1) - corners
+    # atan2 of |cross| and dot is well conditioned for very thin triangles, unlike acos of the dot
+    return np.arctan2(
+        np.linalg.norm(np.cross(to_next, to_prev), axis=2),
+        np.einsum("fij,fij->fi", to_next, to_prev),
+    )
+
+
+def opposite_in_edge_frame(
+    mesh: Mesh,
+    edge_ids: npt.NDArray[np.integer],
+    opposite: npt.NDArray[np.integer],
+    is_first_face: npt.NDArray[np.bool_],
+) -> FloatArray:
+    """
+    (K, 2) the vertices `opposite` in the frames of the edges `edge_ids`: x along the edge from its start,
+    y away from it, positive in the first face of the edge and negative in the others
+    """
+    positions = mesh.positions
+    edge_start = positions[mesh.edge_vertices[edge_ids, 0]]
+    edge_vec = positions[mesh.edge_vertices[edge_ids, 1]] - edge_start
+    rel = positions[opposite] - edge_start
+    with np.errstate(invalid="ignore", divide="ignore"):
+        direction = edge_vec / np.linalg.norm(edge_vec, axis=1)[:, None]
+    x: FloatArray = np.einsum("ki,ki->k", rel, direction)
+    y: FloatArray = np.linalg.norm(np.cross(direction, rel), axis=1)
+    return np.stack([x, np.where(is_first_face, y, -y)], axis=1)
@@ -0,0 +1,32 @@
+import math
+
+import numpy as np
+from contour_toolpath.importer import build_mesh_from_trimesh
+from contour_toolpath.testing import icosphere
+
+
+def test_geometry_tables():
+    mesh = build_mesh_from_trimesh(icosphere(1))
+    geometry = mesh.geometry
+    adjacency = mesh.adjacency
+
+    for edge_id, (start, end) in enumerate(mesh.edge_vertices.tolist()):
+        expected = np.linalg.norm(mesh.positions[end] - mesh.positions[start])
+        assert math.isclose(geometry.edge_lengths[edge_id], expected)
+
+    assert np.allclose(geometry.corner_angles.sum(axis=1), math.pi)
+    # A closed convex surface has positive curvature everywhere: no saddle vertices
+    assert np.all(geometry.vertex_angle_sums < 2 * math.pi)
+
+    # Unfolded opposite corners keep their distances to both ends of the edge
+    for edge_id, (start, end) in enumerate(mesh.edge_vertices.tolist()):
+        length = geometry.edge_lengths[edge_id]
+        first, last = adjacency.edge_face_offsets[edge_id], adjacency.edge_face_offsets[edge_id + 1]
+        for k in range(first, last):
+            face, slot = adjacency.edge_faces[k], adjacency.edge_face_slots[k]
+            opposite = mesh.positions[adjacency.face_opposite_vertex[face, slot]]
+            x, y = geometry.edge_face_opposite[k]
+            assert math.isclose(math.hypot(x, y), np.linalg.norm(opposite - mesh.positions[start]))
+            assert math.isclose(math.hypot(x - length, y), np.linalg.norm(opposite - mesh.positions[end]))
+            # The first face is unfolded to +Y and the second to -Y
+            assert (y > 0) == (k == first)
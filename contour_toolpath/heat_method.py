@@ -0,0 +1,132 @@
+from typing import NamedTuple, Protocol
+
+import numpy as np
+import numpy.typing as npt
+import scipy.sparse as sp  # type: ignore
+import scipy.sparse.linalg as spla  # type: ignore
+
+from contour_toolpath.fast_marching import boundary_vertices
+from contour_toolpath.mesh import FloatArray, IndexArray, Mesh
+
+
+POISSON_REGULARIZATION = 1e-10
+""" Multiple of the mass matrix added to the Laplacian, which is singular, so that it can be factored """
+
+
+class SparseSolver(Protocol):
+    """ A factored sparse system, `scipy.sparse.linalg.SuperLU` """
+
+    def solve(self, rhs: FloatArray) -> FloatArray: ...
+
+
+class HeatMethod(NamedTuple):
+    """
+    The operators of the heat method (Crane, Weischedel and Wardetzky, 2013), built once by
+    `build_heat_method` and cached on `Mesh.heat_method`. Both sparse systems are factored up front, so a
+    distance query is two back-substitutions and a few array operations.
+    """
+
+    time_step: float
+    """ The diffusion time: the squared mean edge length """
+
+    heat_solver: SparseSolver
+    """ (M - t L), solved for the heat diffused from the sources """
+
+    poisson_solver: SparseSolver
+    """ (-L + eps M), solved for the distance whose gradient best matches the normalized heat flow """
+
+    face_areas: FloatArray
+    """ (F,) """
+
+    corner_gradients: FloatArray
+    """ (F, 3, 3) the gradient over each face of the hat function of each of its corners """
+
+
+def build_heat_method(mesh: Mesh) -> HeatMethod:
+    face_vertices = mesh.face_vertices
+    num_vertices = len(mesh.positions)
+    corners = mesh.positions[face_vertices]
+
+    # Edge vectors opposite each corner, in winding order
+    opposite = np.roll(corners, -1, axis=1) - np.roll(corners, 1, axis=1)
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    double_areas = np.linalg.norm(normals, axis=1)
+    face_areas = 0.5 * double_areas
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unit_normals = normals / double_areas[:, None]
+        # The gradient of a hat function points across its face, from the opposite edge to its corner
+        corner_gradients = np.cross(unit_normals[:, None, :], opposite) / double_areas[:, None, None]
+    degenerate = ~(double_areas > 0)
+    corner_gradients[degenerate] = 0.0
+    face_areas[degenerate] = 0.0
+
+    # Cotangent Laplacian: -L_ij is the sum of the face area times the dot product of the hat gradients
+    stiffness = np.einsum("fik,fjk->fij", corner_gradients, corner_gradients) * face_areas[:, None, None]
+    rows = np.repeat(face_vertices, 3, axis=1).ravel()
+    cols = np.tile(face_vertices, (1, 3)).ravel()
+
+    # Lumped mass: a third of the area of every face around the vertex
+    lumped = np.asarray(
+        np.bincount(face_vertices.ravel(), weights=np.repeat(face_areas / 3, 3), minlength=num_vertices), dtype=np.float64
+    )
+
+    time_step = float(np.mean(mesh.geometry.edge_lengths)) ** 2
+    return HeatMethod(
+        time_step=time_step,
+        heat_solver=_factor(lumped, 1.0, stiffness.ravel(), time_step, rows, cols),
+        poisson_solver=_factor(lumped, POISSON_REGULARIZATION, stiffness.ravel(), 1.0, rows, cols),
+        face_areas=face_areas,
+        corner_gradients=corner_gradients,
+    )
+
+
+def _factor(
+    lumped_mass: FloatArray,
+    mass_weight: float,
+    stiffness: FloatArray,
+    stiffness_weight: float,
+    rows: npt.NDArray[np.integer],
+    cols: npt.NDArray[np.integer],
+) -> SparseSolver:
+    """
+    LU factors of (mass_weight M - stiffness_weight L), with M the lumped mass matrix and L the cotangent
+    Laplacian, whose negated entries are `stiffness` at (`rows`, `cols`). scipy has no type stubs, so its
+    calls are kept to here.
+    """
+    size = len(lumped_mass)
+    negative_laplacian = sp.csc_matrix((stiffness, (rows, cols)), shape=(size, size))  # type: ignore
+    mass = sp.diags(lumped_mass, format="csc")  # type: ignore
+    return spla.splu((mass_weight * mass + stiffness_weight * negative_laplacian).tocsc())  # type: ignore
+
+
+def heat_method_distance_field(mesh: Mesh, seed_vertices: IndexArray | None = None) -> FloatArray:
+    """
+    Distance from the seed vertices (by default the boundary) by the heat method, written to
+    `mesh.distance` and returned. The first call on a mesh factors the two systems, later calls reuse them.
+    """
+    heat_method = mesh.heat_method
+    if seed_vertices is None:
+        seed_vertices = boundary_vertices(mesh)
+    face_vertices = mesh.face_vertices
+
+    source = np.zeros(len(mesh.positions))
+    source[seed_vertices] = 1.0
+    heat = heat_method.heat_solver.solve(source)
+
+    # Unit vectors pointing away from the sources, down the heat gradient
+    gradients = np.einsum("fi,fik->fk", heat[face_vertices], heat_method.corner_gradients)
+    lengths = np.linalg.norm(gradients, axis=1)
+    flow = -gradients / np.where(lengths > 0, lengths, 1.0)[:, None]
+
+    # Integrated divergence of the flow at each vertex
+    # bincount with weights gives floats, which the stubs don't know
+    divergence = np.asarray(np.bincount(
+        face_vertices.ravel(),
+        weights=-(np.einsum("fik,fk->fi", heat_method.corner_gradients, flow) * heat_method.face_areas[:, None]).ravel(),
+        minlength=len(mesh.positions),
+    ), dtype=np.float64)
+    distance = heat_method.poisson_solver.solve(-divergence)
+    # The Poisson solution is only known up to a constant. The seeds don't come out at exactly the same
+    # value, so put them at zero on average
+    mesh.distance[:] = distance - np.mean(distance[seed_vertices])
+    return mesh.distance
@@ -0,0 +1,31 @@
+import numpy as np
+from contour_toolpath.algorithm import compute_distance_field
+from contour_toolpath.fast_marching import boundary_vertices
+from contour_toolpath.heat_method import heat_method_distance_field
+from contour_toolpath.testing import distance_to_boundary, make_plate_with_hole
+
+
+def test_heat_method_distance_to_boundary():
+    mesh = make_plate_with_hole(41)
+    assert compute_distance_field(mesh, "heat") is None
+
+    error = np.abs(mesh.distance - distance_to_boundary(mesh))
+    assert np.mean(error) < 0.01
+    assert np.max(error) < 0.06
+
+
+def test_heat_method_reuses_factorization():
+    mesh = make_plate_with_hole(21)
+    boundary = heat_method_distance_field(mesh).copy()
+    heat_method = mesh.heat_method
+
+    # A different source set only needs new back-substitutions
+    corner = np.flatnonzero(np.all(mesh.positions == 0.0, axis=1)).astype(np.int32)
+    from_corner = heat_method_distance_field(mesh, corner).copy()
+    assert mesh.heat_method is heat_method
+    assert from_corner[corner] == 0.0
+    # Vertices on the two sides along the axes from the corner are in plain sight of it
+    on_axes = np.flatnonzero((mesh.positions[:, 0] == 0.0) | (mesh.positions[:, 1] == 0.0))
+    assert np.allclose(from_corner[on_axes], np.linalg.norm(mesh.positions[on_axes], axis=1), atol=0.06)
+
+    assert np.array_equal(heat_method_distance_field(mesh, boundary_vertices(mesh)), boundary)
@@ -1,35 +1,146 @@
-from typing import DefaultDict
+import os
+
+import numpy as np
+import numpy.typing as npt
 import trimesh
-from contour_toolpath.mesh import EdgeId, FaceId, Mesh, Vec3D, Vertex, Edge, Triangle, VertexId
-from collections import defaultdict
+from contour_toolpath.mesh import FloatArray, IndexArray, Mesh
+from contour_toolpath.topology import build_adjacency, build_edge_topology
+
+
+STL_HEADER_BYTES = 84
+""" 80 bytes of free text, then the triangle count as a little-endian uint32 """
+
+STL_TRIANGLE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attributes", "<u2"),
+])
+""" One 50 byte binary STL triangle record, unpadded """
+
+WELD_TOLERANCE = 1e-6
+""" Default size of the grid STL corners are snapped to when merged into vertices, relative to the part size """
+
+WELD_CHUNK = 1 << 16
+""" Triangles quantized at a time while welding, which bounds the temporaries """
+
+
+def build_mesh_from_faces(positions: npt.ArrayLike, faces: npt.ArrayLike) -> Mesh:
+    """
+    Build a mesh from a (N, 3) vertex array and a (F, 3) face->vertex array.
+    See `build_edge_topology` for how edge ids are assigned.
+    """
+    positions_arr = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    faces_arr = np.asarray(faces, dtype=np.int32).reshape(-1, 3)
+    topology = build_edge_topology(faces_arr, num_vertices=len(positions_arr))
+
+    mesh = Mesh.from_arrays(
+        positions=positions_arr,
+        edge_vertices=topology.edge_vertices,
+        face_edges=topology.face_edges,
+        face_vertices=faces_arr,
+    )
+    mesh.adjacency = build_adjacency(mesh, topology)
+    return mesh
+
 
 def build_mesh_from_trimesh(tm: trimesh.Trimesh) -> Mesh:
-    vertex_objs = [Vertex(position=Vec3D(x=v[0], y=v[1], z=v[2]), d=None) for v in tm.vertices]
+    return build_mesh_from_faces(tm.vertices, tm.faces)
+
+
+def is_binary_stl(path: str) -> bool:
+    """ The file size matches the triangle count in the header. ASCII STL files essentially never do """
+    size = os.path.getsize(path)
+    if size < STL_HEADER_BYTES:
+        return False
+    with open(path, "rb") as file:
+        file.seek(80)
+        count = int(np.frombuffer(file.read(4), dtype="<u4")[0])
+    return size == STL_HEADER_BYTES + count * STL_TRIANGLE.itemsize
+
+
+def read_binary_stl(path: str) -> npt.NDArray[np.void]:
+    """
+    The triangle records of a binary STL, memory mapped read-only as a structured array with the
+    `STL_TRIANGLE` layout. Nothing is read until the records are used. A file with no triangles has
+    nothing to map and gives an empty array.
+    """
+    if not is_binary_stl(path):
+        raise ValueError(f"{path} is not a binary STL file")
+    count = (os.path.getsize(path) - STL_HEADER_BYTES) // STL_TRIANGLE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=STL_TRIANGLE)
+    return np.memmap(path, dtype=STL_TRIANGLE, mode="r", offset=STL_HEADER_BYTES, shape=(count,))
+
+
+def weld_triangles(triangles: npt.NDArray[np.floating], tolerance: float | None = None) -> tuple[FloatArray, IndexArray]:
+    """
+    Merge the corners of (T, 3, 3) triangles into shared vertices, returning the vertex positions and the
+    (T, 3) face->vertex array. Corners are snapped to a grid of `tolerance` (by default `WELD_TOLERANCE`
+    times the bounding box diagonal) and those landing in the same cell merge, taking the position of the
+    first of them. Two corners closer than `tolerance` but either side of a cell boundary stay apart.
+
+    Each cell is packed into one integer key, so merging is a single sort of the corner keys. Grids too
+    fine to number in 64 bits fall back to sorting the three cell coordinates. The corners are read a chunk
+    at a time, so `triangles` can be a strided view of a memory map larger than memory.
+    """
+    num_triangles = len(triangles)
+    if num_triangles == 0:
+        return np.zeros((0, 3), dtype=np.float64), np.zeros((0, 3), dtype=np.int32)
+
+    def chunks():
+        for start in range(0, num_triangles, WELD_CHUNK):
+            yield start, np.asarray(triangles[start:start + WELD_CHUNK], dtype=np.float64).reshape(-1, 3)
 
-    edge_map: dict[tuple[VertexId, VertexId], EdgeId] = {}  # (min_idx, max_idx) -> edge_id
-    edge_list: list[Edge] = []
-    edge_faces: DefaultDict[EdgeId, list[FaceId]] = defaultdict(list)
+    lo = np.full(3, np.inf)
+    hi = np.full(3, -np.inf)
+    for _, corners in chunks():
+        lo = np.minimum(lo, corners.min(axis=0))
+        hi = np.maximum(hi, corners.max(axis=0))
+    if tolerance is None:
+        tolerance = WELD_TOLERANCE * max(float(np.linalg.norm(hi - lo)), np.finfo(np.float64).tiny)
+    origin = np.floor(lo / tolerance + 0.5)
+    cells = (np.floor(hi / tolerance + 0.5) - origin + 1).astype(np.int64)
+    packed = float(np.prod(cells.astype(np.float64))) < 2.0**63
 
-    triangles: list[Triangle] = []
+    keys = np.empty(3 * num_triangles if packed else (3 * num_triangles, 3), dtype=np.int64)
+    for start, corners in chunks():
+        q = (np.floor(corners / tolerance + 0.5) - origin).astype(np.int64)
+        if packed:
+            keys[3 * start:3 * start + len(corners)] = (q[:, 0] * cells[1] + q[:, 1]) * cells[2] + q[:, 2]
+        else:
+            keys[3 * start:3 * start + len(corners)] = q
+    if not packed:
+        # One opaque 24 byte key per corner, only compared for equality
+        keys = keys.view(np.dtype((np.void, 24))).ravel()
 
-    for face_id, face in enumerate(tm.faces):
-        face_id = FaceId(face_id)
-        tri_edges: list[EdgeId] = []
-        for i in range(3):
-            a, b = VertexId(face[i]), VertexId(face[(i + 1) % 3])
-            key = (a, b) if a < b else (b, a)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    del keys
+    first_in_order = np.sort(first)
+    positions = np.asarray(triangles[first_in_order // 3, first_in_order % 3], dtype=np.float64)
+    # Number vertices by first appearance rather than by key, so the order follows the file
+    renumber = np.empty(len(first), dtype=np.int32)
+    renumber[np.argsort(first, kind="stable")] = np.arange(len(first), dtype=np.int32)
+    return positions, renumber[inverse.ravel()].reshape(-1, 3)
 
-            if key not in edge_map:
-                edge_id = EdgeId(len(edge_list))
-                edge_map[key] = edge_id
-                edge_list.append(Edge(start=key[0], end=key[1]))
 
-            edge_id = edge_map[key]
-            edge_faces[edge_id].append(face_id)
-            tri_edges.append(edge_id)
+def build_mesh_from_stl(path: str, tolerance: float | None = None) -> Mesh:
+    """
+    Read a binary STL without a trimesh round trip: the records are memory mapped, the corners welded
+    (see `weld_triangles`) and fed to the topology builder. Triangles that collapse when welded are dropped,
+    along with the vertices only they used.
+    """
+    positions, faces = weld_triangles(read_binary_stl(path)["vertices"], tolerance)
+    proper = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])
+    faces = faces[proper]
+    used = np.zeros(len(positions), dtype=bool)
+    used[faces] = True
+    # Renumbering in order keeps the vertices in file order
+    renumber = np.cumsum(used, dtype=np.int32) - 1
+    return build_mesh_from_faces(positions[used], renumber[faces])
 
-        assert len(tri_edges) == 3
-        edges = (tri_edges[0], tri_edges[1], tri_edges[2])
-        triangles.append(Triangle(edges=edges))
 
-    return Mesh(vertices=vertex_objs, edges=edge_list, faces=triangles)
\ No newline at end of file
+def build_mesh_from_file(path: str, tolerance: float | None = None) -> Mesh:
+    """ Binary STL goes through `build_mesh_from_stl`, anything else through trimesh """
+    if is_binary_stl(path):
+        return build_mesh_from_stl(path, tolerance)
+    return build_mesh_from_trimesh(trimesh.load_mesh(path))  # type: ignore
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+from contour_toolpath.importer import STL_TRIANGLE, build_mesh_from_file, is_binary_stl, read_binary_stl, weld_triangles
+from contour_toolpath.testing import icosphere
+
+
+def write_stl(path: Path, triangles: np.ndarray) -> None:
+    records = np.zeros(len(triangles), dtype=STL_TRIANGLE)
+    records["vertices"] = triangles
+    with open(path, "wb") as file:
+        file.write(b"\0" * 80 + np.uint32(len(triangles)).tobytes() + records.tobytes())
+
+
+def write_ascii_stl(path: Path, triangles: npt.NDArray[np.float64]) -> None:
+    lines = ["solid test"]
+    for triangle in triangles.tolist():
+        lines += ["facet normal 0 0 0", "outer loop"]
+        lines += [f"vertex {x!r} {y!r} {z!r}" for x, y, z in triangle]
+        lines += ["endloop", "endfacet"]
+    path.write_text("\n".join(lines + ["endsolid test", ""]))
+
+
+def test_binary_stl_is_memory_mapped_and_welded(tmp_path: Path):
+    # A square as two triangles, with the shared corners a rounding error apart, a sliver on one of its
+    # corners and a stray sliver on its own, both of which collapse when welded
+    triangles = np.array([
+        [[0, 0, 0], [1, 0, 0], [1, 1, 0]],
+        [[1e-9, 0, 0], [1, 1 + 1e-9, 0], [0, 1, 0]],
+        [[0, 1, 0], [1e-9, 1, 0], [0, 1 + 1e-9, 0]],
+        [[2, 2, 0], [2, 2, 1e-9], [2 + 1e-9, 2, 0]],
+    ], dtype=np.float32)
+    path = tmp_path / "square.stl"
+    write_stl(path, triangles)
+
+    assert is_binary_stl(str(path))
+    records = read_binary_stl(str(path))
+    assert isinstance(records, np.memmap) and np.shares_memory(records, records["vertices"])
+
+    positions, faces = weld_triangles(records["vertices"])
+    assert np.array_equal(positions, [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [2, 2, 0]])
+    assert faces.tolist() == [[0, 1, 2], [0, 2, 3], [3, 3, 3], [4, 4, 4]]
+
+    mesh = build_mesh_from_file(str(path))
+    # The stray sliver leaves no isolated vertex behind
+    assert np.array_equal(mesh.positions, positions[:4])
+    assert mesh.face_vertices.tolist() == [[0, 1, 2], [0, 2, 3]]
+    assert len(mesh.edge_vertices) == 5
+
+
+def test_empty_binary_stl(tmp_path: Path):
+    path = tmp_path / "empty.stl"
+    write_stl(path, np.zeros((0, 3, 3), dtype=np.float32))
+
+    assert is_binary_stl(str(path))
+    records = read_binary_stl(str(path))
+    assert records.dtype == STL_TRIANGLE and len(records) == 0
+    positions, faces = weld_triangles(records["vertices"])
+    assert positions.shape == (0, 3) and faces.shape == (0, 3)
+
+
+def test_matches_trimesh(tmp_path: Path):
+    sphere = icosphere(2)
+    triangles: npt.NDArray[np.float64] = sphere.triangles
+    binary = tmp_path / "sphere.stl"
+    write_stl(binary, triangles.astype(np.float32))
+    ascii_path = tmp_path / "sphere_ascii.stl"
+    write_ascii_stl(ascii_path, triangles)
+    assert not is_binary_stl(str(ascii_path))
+
+    # The ASCII file is read by trimesh, which must weld the same vertices in the same order
+    reference = build_mesh_from_file(str(ascii_path))
+    mesh = build_mesh_from_file(str(binary))
+    assert len(mesh.positions) == len(reference.positions) == len(sphere.vertices)
+    assert np.array_equal(mesh.face_vertices, reference.face_vertices)
+    for built in (mesh, reference):
+        assert np.allclose(built.positions[built.face_vertices], triangles, atol=1e-6)
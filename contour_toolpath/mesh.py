@@ -1,12 +1,25 @@
-from typing import NamedTuple, NewType
+import sys
+from typing import TYPE_CHECKING, Any, Iterator, Mapping, NamedTuple, NewType, Sequence, overload
+
+import numpy as np
+import numpy.typing as npt
+
 from mathutil.vector import Vec3D
 
+if TYPE_CHECKING:
+    from contour_toolpath.geometry import MeshGeometry
+    from contour_toolpath.heat_method import HeatMethod
+    from contour_toolpath.topology import MeshAdjacency
+
 
 EdgeId = NewType("EdgeId", int)
 FaceId = NewType("FaceId", int)
 VertexId = NewType("VertexId", int)
 TriangleId = NewType("TriangleId", int)
 
+FloatArray = npt.NDArray[np.float64]
+IndexArray = npt.NDArray[np.int32]
+
 
 class Vertex(NamedTuple):
     """A class representing a vertex in 3D space."""
@@ -25,19 +38,329 @@ class Triangle(NamedTuple):
     edges: tuple[EdgeId, EdgeId, EdgeId]
 
 
-class Mesh(NamedTuple):
-    """A class representing a 3D mesh."""
-    vertices: list[Vertex]
-    edges: list[Edge]
-    faces: list[Triangle]
+class Mesh:
+    """
+    A triangle mesh stored as contiguous NumPy arrays (struct-of-arrays).
+
+    Edge `face_edges[f, i]` joins the corners `face_vertices[f, i]` and `face_vertices[f, (i + 1) % 3]`,
+    so the corner opposite edge slot `i` is always `face_vertices[f, (i + 2) % 3]`.
+
+    The `vertices`, `edges` and `faces` properties are read-only views that build `Vertex`, `Edge`
+    and `Triangle` tuples on access, for code that works on one element at a time.
+    """
+
+    positions: FloatArray
+    """ (N, 3) vertex positions """
+
+    edge_vertices: IndexArray
+    """ (E, 2) start and end vertex of each edge """
+
+    face_edges: IndexArray
+    """ (F, 3) the edges of each face """
+
+    face_vertices: IndexArray
+    """ (F, 3) the corners of each face, in winding order """
+
+    distance: FloatArray
+    """ (N,) distance from boundary. NaN where it is not known yet """
+
+    def __init__(self, vertices: Sequence[Vertex], edges: Sequence[Edge], faces: Sequence[Triangle]):
+        positions = np.array([tuple(v.position) for v in vertices], dtype=np.float64).reshape(-1, 3)
+        distance = np.array([np.nan if v.d is None else v.d for v in vertices], dtype=np.float64)
+        edge_vertices = np.array([tuple(e) for e in edges], dtype=np.int32).reshape(-1, 2)
+        face_edges = np.array([f.edges for f in faces], dtype=np.int32).reshape(-1, 3)
+        self._assign(
+            positions,
+            edge_vertices,
+            face_edges,
+            face_vertices_from_edges(edge_vertices, face_edges),
+            distance,
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        positions: npt.ArrayLike,
+        edge_vertices: npt.ArrayLike,
+        face_edges: npt.ArrayLike,
+        face_vertices: npt.ArrayLike | None = None,
+        distance: npt.ArrayLike | None = None,
+    ) -> "Mesh":
+        """
+        Build a mesh directly from its arrays without going through `Vertex`/`Edge`/`Triangle` objects.
+        `face_vertices` is derived from the edge tables when not given.
+        """
+        mesh = cls.__new__(cls)
+        positions_arr = np.ascontiguousarray(positions, dtype=np.float64).reshape(-1, 3)
+        edge_arr = np.ascontiguousarray(edge_vertices, dtype=np.int32).reshape(-1, 2)
+        face_edge_arr = np.ascontiguousarray(face_edges, dtype=np.int32).reshape(-1, 3)
+        if face_vertices is None:
+            face_vertex_arr = face_vertices_from_edges(edge_arr, face_edge_arr)
+        else:
+            face_vertex_arr = np.ascontiguousarray(face_vertices, dtype=np.int32).reshape(-1, 3)
+        if distance is None:
+            distance_arr = np.full(len(positions_arr), np.nan, dtype=np.float64)
+        else:
+            distance_arr = np.ascontiguousarray(distance, dtype=np.float64).copy()
+        mesh._assign(positions_arr, edge_arr, face_edge_arr, face_vertex_arr, distance_arr)
+        return mesh
+
+    def _assign(
+        self,
+        positions: FloatArray,
+        edge_vertices: IndexArray,
+        face_edges: IndexArray,
+        face_vertices: IndexArray,
+        distance: FloatArray,
+    ) -> None:
+        self.positions = positions
+        self.edge_vertices = edge_vertices
+        self.face_edges = face_edges
+        self.face_vertices = face_vertices
+        self.distance = distance
+        self._adjacency: "MeshAdjacency | None" = None
+        self._geometry: "MeshGeometry | None" = None
+        self._heat_method: "HeatMethod | None" = None
+
+    def replace(
+        self,
+        positions: FloatArray,
+        edge_vertices: IndexArray,
+        face_edges: IndexArray,
+        face_vertices: IndexArray,
+        distance: FloatArray,
+        adjacency: "MeshAdjacency | None" = None,
+        geometry: "MeshGeometry | None" = None,
+    ) -> None:
+        """
+        Swap in new arrays, for edits that change the mesh in place (`refine.refine_mesh`). The cached
+        indexes are dropped, or replaced by `adjacency` and `geometry` when the edit kept them up to date.
+        """
+        self._assign(positions, edge_vertices, face_edges, face_vertices, distance)
+        self._adjacency = adjacency
+        self._geometry = geometry
+
+    @property
+    def vertices(self) -> "VertexView":
+        return VertexView(self)
+
+    @property
+    def edges(self) -> "EdgeView":
+        return EdgeView(self)
+
+    @property
+    def faces(self) -> "TriangleView":
+        return TriangleView(self)
+
+    @property
+    def adjacency(self) -> "MeshAdjacency":
+        """ The adjacency index of the mesh. Built on first use and cached """
+        if self._adjacency is None:
+            from contour_toolpath.topology import build_adjacency
+            self._adjacency = build_adjacency(self)
+        return self._adjacency
+
+    @adjacency.setter
+    def adjacency(self, adjacency: "MeshAdjacency") -> None:
+        self._adjacency = adjacency
+
+    @property
+    def geometry(self) -> "MeshGeometry":
+        """ Edge lengths, corner angles and unfolded faces. Built on first use and cached """
+        if self._geometry is None:
+            from contour_toolpath.geometry import build_geometry
+            self._geometry = build_geometry(self)
+        return self._geometry
+
+    @geometry.setter
+    def geometry(self, geometry: "MeshGeometry") -> None:
+        self._geometry = geometry
+
+    @property
+    def heat_method(self) -> "HeatMethod":
+        """ Factored heat method operators. Built on first use and cached """
+        if self._heat_method is None:
+            from contour_toolpath.heat_method import build_heat_method
+            self._heat_method = build_heat_method(self)
+        return self._heat_method
+
+    @property
+    def nbytes(self) -> int:
+        """ Bytes held by the mesh arrays """
+        return (
+            self.positions.nbytes
+            + self.edge_vertices.nbytes
+            + self.face_edges.nbytes
+            + self.face_vertices.nbytes
+            + self.distance.nbytes
+        )
+
+
+class VertexView(Sequence[Vertex]):
+    """ Read-only `Vertex` view over the arrays of a `Mesh` """
+
+    def __init__(self, mesh: Mesh):
+        self._mesh = mesh
+
+    def __len__(self) -> int:
+        return len(self._mesh.positions)
+
+    @overload
+    def __getitem__(self, index: int) -> Vertex: ...
+    @overload
+    def __getitem__(self, index: slice) -> list[Vertex]: ...
+    def __getitem__(self, index: int | slice) -> Vertex | list[Vertex]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        x, y, z = self._mesh.positions[index].tolist()
+        d = float(self._mesh.distance[index])
+        return Vertex(position=Vec3D(x, y, z), d=None if np.isnan(d) else d)
+
+    def __iter__(self) -> Iterator[Vertex]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class EdgeView(Sequence[Edge]):
+    """ Read-only `Edge` view over the arrays of a `Mesh` """
+
+    def __init__(self, mesh: Mesh):
+        self._mesh = mesh
+
+    def __len__(self) -> int:
+        return len(self._mesh.edge_vertices)
+
+    @overload
+    def __getitem__(self, index: int) -> Edge: ...
+    @overload
+    def __getitem__(self, index: slice) -> list[Edge]: ...
+    def __getitem__(self, index: int | slice) -> Edge | list[Edge]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, end = self._mesh.edge_vertices[index].tolist()
+        return Edge(start=VertexId(start), end=VertexId(end))
+
+    def __iter__(self) -> Iterator[Edge]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class TriangleView(Sequence[Triangle]):
+    """ Read-only `Triangle` view over the arrays of a `Mesh` """
+
+    def __init__(self, mesh: Mesh):
+        self._mesh = mesh
+
+    def __len__(self) -> int:
+        return len(self._mesh.face_edges)
+
+    @overload
+    def __getitem__(self, index: int) -> Triangle: ...
+    @overload
+    def __getitem__(self, index: slice) -> list[Triangle]: ...
+    def __getitem__(self, index: int | slice) -> Triangle | list[Triangle]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        e0, e1, e2 = self._mesh.face_edges[index].tolist()
+        return Triangle(edges=(EdgeId(e0), EdgeId(e1), EdgeId(e2)))
+
+    def __iter__(self) -> Iterator[Triangle]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+def face_vertices_from_edges(edge_vertices: IndexArray, face_edges: IndexArray) -> IndexArray:
+    """
+    Recover the corners of each face from its edges, so that edge slot `i` joins corner `i` and
+    corner `i + 1`. The winding follows the order the edges are listed in.
+    """
+    if len(face_edges) == 0:
+        return np.zeros((0, 3), dtype=np.int32)
+    e0 = edge_vertices[face_edges[:, 0]]
+    e1 = edge_vertices[face_edges[:, 1]]
+    # Corner 1 is the vertex shared by the first two edges
+    shared_is_end = (e0[:, 1] == e1[:, 0]) | (e0[:, 1] == e1[:, 1])
+    c0 = np.where(shared_is_end, e0[:, 0], e0[:, 1])
+    c1 = np.where(shared_is_end, e0[:, 1], e0[:, 0])
+    c2 = np.where(e1[:, 0] == c1, e1[:, 1], e1[:, 0])
+    return np.stack([c0, c1, c2], axis=1).astype(np.int32)
+
+
+def mesh_array_dict(mesh: Mesh) -> dict[str, npt.NDArray[Any]]:
+    """
+    Every array of `mesh`, including its adjacency and geometry (built if needed) under the `adjacency.`
+    and `geometry.` prefixes, for writing to disk or shared memory. `mesh_from_array_dict` reverses it.
+    """
+    arrays: dict[str, npt.NDArray[Any]] = {
+        "positions": mesh.positions,
+        "edge_vertices": mesh.edge_vertices,
+        "face_edges": mesh.face_edges,
+        "face_vertices": mesh.face_vertices,
+        "distance": mesh.distance,
+    }
+    arrays.update({f"adjacency.{k}": v for k, v in mesh.adjacency._asdict().items()})
+    arrays.update({f"geometry.{k}": v for k, v in mesh.geometry._asdict().items()})
+    return arrays
+
+
+def mesh_from_array_dict(arrays: Mapping[str, npt.NDArray[Any]]) -> Mesh:
+    """ A mesh over the arrays of `mesh_array_dict`, without copying any but the distance """
+    from contour_toolpath.geometry import MeshGeometry
+    from contour_toolpath.topology import MeshAdjacency
+
+    mesh = Mesh.from_arrays(
+        arrays["positions"],
+        arrays["edge_vertices"],
+        arrays["face_edges"],
+        arrays["face_vertices"],
+        arrays.get("distance"),
+    )
+    mesh.adjacency = MeshAdjacency(**{k: arrays[f"adjacency.{k}"] for k in MeshAdjacency._fields})
+    mesh.geometry = MeshGeometry(**{k: arrays[f"geometry.{k}"] for k in MeshGeometry._fields})
+    return mesh
+
+
+class MemoryReport(NamedTuple):
+    array_bytes: int
+    """ Bytes used by the `Mesh` arrays """
+
+    object_bytes: int
+    """ Estimated bytes for the same mesh as lists of `Vertex`/`Edge`/`Triangle` tuples """
+
+
+def estimate_object_mesh_nbytes(num_vertices: int, num_edges: int, num_faces: int) -> int:
+    """
+    Estimate the memory used by a mesh stored as lists of `Vertex`, `Edge` and `Triangle` tuples,
+    counting the tuples, the floats and ints they hold, and the list slots pointing at them.
+    Small ints are cached by the interpreter, so ids are counted as full ints to stay an upper bound
+    on large meshes.
+    """
+    pointer = 8
+    float_size = sys.getsizeof(1.5)
+    int_size = sys.getsizeof(2**40)
+
+    vertex = Vertex(position=Vec3D(0.5, 0.5, 0.5), d=0.5)
+    per_vertex = sys.getsizeof(vertex) + sys.getsizeof(vertex.position) + 4 * float_size + pointer
+
+    edge = Edge(start=VertexId(0), end=VertexId(1))
+    per_edge = sys.getsizeof(edge) + 2 * int_size + pointer
+
+    triangle = Triangle(edges=(EdgeId(0), EdgeId(1), EdgeId(2)))
+    per_face = sys.getsizeof(triangle) + sys.getsizeof(triangle.edges) + 3 * int_size + pointer
+
+    return num_vertices * per_vertex + num_edges * per_edge + num_faces * per_face
+
 
+def memory_report(mesh: Mesh) -> MemoryReport:
+    """ Compare the array storage of `mesh` against the list-of-tuples representation """
+    return MemoryReport(
+        array_bytes=mesh.nbytes,
+        object_bytes=estimate_object_mesh_nbytes(len(mesh.positions), len(mesh.edge_vertices), len(mesh.face_edges)),
+    )
 
 
 def get_edge_length(edge: EdgeId, mesh: Mesh) -> float:
     """
     Get the length of an edge
     """
-    edge_obj = mesh.edges[edge]
-    v1 = mesh.vertices[edge_obj.start]
-    v2 = mesh.vertices[edge_obj.end]
-    return (v1.position - v2.position).length()
+    return float(mesh.geometry.edge_lengths[edge])
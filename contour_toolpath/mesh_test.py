@@ -0,0 +1,73 @@
+import numpy as np
+from contour_toolpath.mesh import Edge, EdgeId, Mesh, Triangle, Vertex, VertexId, get_edge_length, memory_report
+from mathutil.vector import Vec3D
+
+
+def make_two_triangle_mesh() -> Mesh:
+    #  3 --- 2
+    #  |   / |
+    #  |  /  |
+    #  0 --- 1
+    return Mesh(
+        vertices=[
+            Vertex(position=Vec3D(0.0, 0.0, 0.0), d=0.0),
+            Vertex(position=Vec3D(1.0, 0.0, 0.0), d=None),
+            Vertex(position=Vec3D(1.0, 1.0, 0.0), d=None),
+            Vertex(position=Vec3D(0.0, 1.0, 0.0), d=2.5),
+        ],
+        edges=[
+            Edge(start=VertexId(0), end=VertexId(1)),
+            Edge(start=VertexId(1), end=VertexId(2)),
+            Edge(start=VertexId(0), end=VertexId(2)),
+            Edge(start=VertexId(2), end=VertexId(3)),
+            Edge(start=VertexId(0), end=VertexId(3)),
+        ],
+        faces=[
+            Triangle(edges=(EdgeId(0), EdgeId(1), EdgeId(2))),
+            Triangle(edges=(EdgeId(2), EdgeId(3), EdgeId(4))),
+        ],
+    )
+
+
+def test_mesh_views_round_trip():
+    mesh = make_two_triangle_mesh()
+
+    assert mesh.positions.shape == (4, 3)
+    assert mesh.edge_vertices.dtype == np.int32
+    assert len(mesh.vertices) == 4
+    assert len(mesh.edges) == 5
+    assert len(mesh.faces) == 2
+
+    assert mesh.vertices[1] == Vertex(position=Vec3D(1.0, 0.0, 0.0), d=None)
+    assert mesh.vertices[3].d == 2.5
+    assert mesh.edges[3] == Edge(start=VertexId(2), end=VertexId(3))
+    assert mesh.faces[1] == Triangle(edges=(EdgeId(2), EdgeId(3), EdgeId(4)))
+    assert list(mesh.edges)[:2] == mesh.edges[:2]
+
+    mesh.distance[1] = 1.0
+    assert mesh.vertices[1].d == 1.0
+
+
+def test_face_vertices_follow_edge_order():
+    mesh = make_two_triangle_mesh()
+
+    # Edge slot i joins corner i and corner i + 1
+    assert mesh.face_vertices.tolist() == [[0, 1, 2], [0, 2, 3]]
+    for f in range(len(mesh.faces)):
+        for i in range(3):
+            edge = set(mesh.edge_vertices[mesh.face_edges[f, i]].tolist())
+            assert edge == {int(mesh.face_vertices[f, i]), int(mesh.face_vertices[f, (i + 1) % 3])}
+
+
+def test_from_arrays_matches_constructor():
+    mesh = make_two_triangle_mesh()
+    copy = Mesh.from_arrays(mesh.positions, mesh.edge_vertices, mesh.face_edges, distance=mesh.distance)
+
+    assert np.array_equal(copy.face_vertices, mesh.face_vertices)
+    assert list(copy.vertices) == list(mesh.vertices)
+    assert get_edge_length(EdgeId(2), copy) == 2**0.5
+
+
+def test_memory_report_favours_arrays():
+    report = memory_report(make_two_triangle_mesh())
+    assert report.array_bytes < report.object_bytes
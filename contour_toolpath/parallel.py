@@ -0,0 +1,310 @@
+import multiprocessing
+import sys
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from multiprocessing.shared_memory import SharedMemory
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+import scipy.sparse as sp  # type: ignore
+from scipy.sparse.csgraph import breadth_first_order  # type: ignore
+
+from contour_toolpath.algorithm import Propagation
+from contour_toolpath.mesh import FloatArray, IndexArray, Mesh, VertexId, mesh_array_dict, mesh_from_array_dict
+from contour_toolpath.topology import OffsetArray
+from contour_toolpath.window import Window
+from contour_toolpath.window_batch import WindowBatch, batch_to_windows, concatenate_batches, take_batch, windows_to_batch
+from contour_toolpath.window_store import WindowStore
+
+
+def face_adjacency_graph(mesh: Mesh) -> sp.csr_matrix:
+    """ Faces as nodes, joined when they share an edge. Faces around a non-manifold edge are chained """
+    adjacency = mesh.adjacency
+    counts = adjacency.edge_face_counts()
+    # Every face of an edge but the last, paired with the next one
+    has_next = np.ones(len(adjacency.edge_faces), dtype=bool)
+    has_next[adjacency.edge_face_offsets[1:][counts > 0] - 1] = False
+    a = adjacency.edge_faces[:-1][has_next[:-1]]
+    b = adjacency.edge_faces[1:][has_next[:-1]]
+    num_faces = len(mesh.face_edges)
+    graph = sp.coo_matrix((np.ones(len(a), dtype=np.int8), (a, b)), shape=(num_faces, num_faces))
+    return (graph + graph.T).tocsr()  # type: ignore
+
+
+def _bfs_order(graph: sp.csr_matrix) -> npt.NDArray[np.int64]:
+    """
+    All nodes in breadth first order from a pseudo-peripheral node, so that cutting the order anywhere
+    splits the graph into two compact pieces. Disconnected pieces follow each other.
+    """
+    num_nodes = int(graph.shape[0])  # type: ignore
+    visited = np.zeros(num_nodes, dtype=bool)
+    orders: list[npt.NDArray[np.int64]] = []
+    while not visited.all():
+        start = int(np.argmin(visited))
+        # The node found last from anywhere is far from everything: start again from there
+        start = int(_breadth_first_order(graph, start)[-1])
+        order = _breadth_first_order(graph, start)
+        visited[order] = True
+        orders.append(order)
+    return np.concatenate(orders)
+
+
+def _breadth_first_order(graph: sp.csr_matrix, start: int) -> npt.NDArray[np.int64]:
+    """ The nodes reachable from `start`, in breadth first order. Typed, as scipy has no stubs """
+    return breadth_first_order(graph, start, directed=False, return_predecessors=False)  # type: ignore
+
+
+def _subgraph(graph: sp.csr_matrix, nodes: npt.NDArray[np.int64]) -> sp.csr_matrix:
+    """ The graph between `nodes`, renumbered in their order """
+    return graph[nodes][:, nodes]  # type: ignore
+
+
+def partition_faces(mesh: Mesh, num_patches: int) -> IndexArray:
+    """
+    Split the faces into `num_patches` patches of about the same size by recursive bisection of the face
+    adjacency graph. Returns the patch of each face.
+    """
+    graph = face_adjacency_graph(mesh)
+    patches = np.zeros(len(mesh.face_edges), dtype=np.int32)
+
+    def bisect(faces: npt.NDArray[np.int64], first_patch: int, count: int) -> None:
+        if count == 1 or len(faces) == 0:
+            patches[faces] = first_patch
+            return
+        order = faces[_bfs_order(_subgraph(graph, faces))]
+        left_count = count // 2
+        split = len(faces) * left_count // count
+        bisect(order[:split], first_patch, left_count)
+        bisect(order[split:], first_patch + left_count, count - left_count)
+
+    bisect(np.arange(len(mesh.face_edges)), 0, num_patches)
+    return patches
+
+
+def _group_patches(items: npt.NDArray[np.int64], item_patches: IndexArray, num_items: int) -> tuple[OffsetArray, IndexArray]:
+    """ The distinct patches of each item, as CSR, from (item, patch) pairs """
+    base = int(item_patches.max(initial=0)) + 1
+    keys = np.unique(items.astype(np.int64) * base + item_patches)
+    offsets = np.zeros(num_items + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // base, minlength=num_items), out=offsets[1:])
+    return offsets, (keys % base).astype(np.int32)
+
+
+class PatchLayout(NamedTuple):
+    """ Which patches each edge and vertex belongs to, for routing windows and distances between them """
+
+    face_patches: IndexArray
+    """ (F,) """
+    edge_patch_offsets: OffsetArray
+    """ (E + 1,) """
+    edge_patches: IndexArray
+    vertex_patch_offsets: OffsetArray
+    """ (N + 1,) """
+    vertex_patches: IndexArray
+    interface_edges: npt.NDArray[np.bool_]
+    """ (E,) edges with faces in more than one patch """
+    edge_owner: IndexArray
+    """ (E,) the lowest patch of each edge, which reports its final windows """
+
+
+def build_patch_layout(mesh: Mesh, face_patches: IndexArray) -> PatchLayout:
+    adjacency = mesh.adjacency
+    edge_ids = np.repeat(np.arange(len(mesh.edge_vertices)), adjacency.edge_face_counts())
+    edge_patch_offsets, edge_patches = _group_patches(edge_ids, face_patches[adjacency.edge_faces], len(mesh.edge_vertices))
+    vertex_ids = np.repeat(np.arange(len(mesh.positions)), np.diff(adjacency.vertex_face_offsets))
+    vertex_patch_offsets, vertex_patches = _group_patches(vertex_ids, face_patches[adjacency.vertex_faces], len(mesh.positions))
+
+    counts = np.diff(edge_patch_offsets)
+    edge_owner = np.full(len(mesh.edge_vertices), -1, dtype=np.int32)
+    edge_owner[counts > 0] = edge_patches[edge_patch_offsets[:-1][counts > 0]]
+    return PatchLayout(
+        face_patches=face_patches,
+        edge_patch_offsets=edge_patch_offsets,
+        edge_patches=edge_patches,
+        vertex_patch_offsets=vertex_patch_offsets,
+        vertex_patches=vertex_patches,
+        interface_edges=counts > 1,
+        edge_owner=edge_owner,
+    )
+
+
+SharedArraySpec = dict[str, tuple[str, tuple[int, ...], str]]
+""" Array name -> (shared memory block name, shape, dtype) """
+
+
+def share_arrays(arrays: dict[str, np.ndarray]) -> tuple[list[SharedMemory], SharedArraySpec]:
+    """ Copy arrays into shared memory blocks, which the caller has to close and unlink when done """
+    blocks: list[SharedMemory] = []
+    spec: SharedArraySpec = {}
+    for name, array in arrays.items():
+        block = SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        spec[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, spec
+
+
+def attach_arrays(spec: SharedArraySpec) -> tuple[list[SharedMemory], dict[str, np.ndarray]]:
+    """ Map the arrays shared by `share_arrays`, without copying. Keep the blocks alive while using them """
+    blocks: list[SharedMemory] = []
+    arrays: dict[str, np.ndarray] = {}
+    for name, (block_name, shape, dtype) in spec.items():
+        if sys.version_info >= (3, 13):
+            # The process that created the block unlinks it, not this one
+            block = SharedMemory(name=block_name, track=False)
+        else:
+            block = SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+def _mesh_arrays(mesh: Mesh, layout: PatchLayout) -> dict[str, np.ndarray]:
+    arrays = mesh_array_dict(mesh)
+    arrays.update({
+        "face_patches": layout.face_patches,
+        "interface_edges": layout.interface_edges,
+        "edge_owner": layout.edge_owner,
+    })
+    return arrays
+
+
+class PatchResult(NamedTuple):
+    windows: WindowBatch
+    """ Windows that reached edges shared with other patches """
+    vertices: IndexArray
+    """ Vertices whose distance went down """
+    distances: FloatArray
+
+
+def _patch_worker(connection: Connection, spec: SharedArraySpec, patch: int) -> None:
+    """
+    Runs one patch: receives windows and vertex distances found by other patches, propagates them over
+    the patch, and sends back what reached the other patches. Sends its final windows when told to stop.
+    """
+    blocks, arrays = attach_arrays(spec)
+    mesh = mesh_from_array_dict(arrays)
+    propagation = Propagation(
+        mesh,
+        patch_faces=arrays["face_patches"] == patch,
+        track_edges=arrays["interface_edges"],
+        track_vertices=True,
+    )
+    store = propagation.store
+
+    while True:
+        message: tuple[WindowBatch, IndexArray, FloatArray] | None = connection.recv()
+        if message is None:
+            break
+        batch, vertices, distances = message
+        for vertex, distance in zip(vertices.tolist(), distances.tolist()):
+            propagation.lower_vertex_distance(VertexId(vertex), distance)
+        propagation.merge(batch_to_windows(batch), track=False)
+        propagation.run()
+
+        reached = np.array(sorted(propagation.tracked_windows), dtype=np.int32)
+        assert propagation.tracked_vertices is not None
+        changed = np.unique(np.array(propagation.tracked_vertices, dtype=np.int32))
+        propagation.tracked_windows.clear()
+        propagation.tracked_vertices.clear()
+        connection.send(PatchResult(windows=store.gather(reached), vertices=changed, distances=mesh.distance[changed]))
+
+    live = store.live_handles()
+    owned = live[arrays["edge_owner"][store.edge_id[live]] == patch]
+    connection.send(store.gather(owned))
+    connection.close()
+    del mesh, propagation, arrays
+    for block in blocks:
+        block.close()
+
+
+def _route_windows(batch: WindowBatch, layout: PatchLayout, sender: int, inboxes: list[list[WindowBatch]]) -> None:
+    """ Add every window to the inbox of every patch touching its edge, except the one it came from """
+    offsets = layout.edge_patch_offsets
+    counts = offsets[batch.edge_id + 1] - offsets[batch.edge_id]
+    rows = np.repeat(np.arange(len(batch.edge_id)), counts)
+    patches = layout.edge_patches[np.repeat(offsets[batch.edge_id], counts) + _ranges(counts)]
+    keep = patches != sender
+    rows, patches = rows[keep], patches[keep]
+    receivers: list[int] = np.unique(patches).tolist()
+    for patch in receivers:
+        selected = rows[patches == patch]
+        inboxes[patch].append(take_batch(batch, selected))
+
+
+def _ranges(counts: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    """ 0, 1, .., counts[0] - 1, 0, 1, .., counts[1] - 1, ... """
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.arange(int(counts.sum())) - starts
+
+
+def propagate_distance_field_parallel(mesh: Mesh, initial_windows: set[Window], workers: int) -> WindowStore:
+    """
+    `propagate_distance_field` split over `workers` processes. The mesh is partitioned into one patch per
+    worker and each worker propagates windows over its patch, with the mesh arrays in shared memory.
+    Between rounds, windows that reached edges shared with other patches and lowered vertex distances are
+    passed on to the patches they concern, until no patch has anything left to do.
+    """
+    mesh.distance[:] = np.nan
+    layout = build_patch_layout(mesh, partition_faces(mesh, workers))
+    blocks, spec = share_arrays(_mesh_arrays(mesh, layout))
+
+    context = multiprocessing.get_context()
+    connections: list[Connection] = []
+    processes: list[BaseProcess] = []
+    try:
+        for patch in range(workers):
+            parent_end, child_end = context.Pipe()
+            process = context.Process(target=_patch_worker, args=(child_end, spec, patch), daemon=True)
+            process.start()
+            child_end.close()
+            connections.append(parent_end)
+            processes.append(process)
+
+        window_inboxes: list[list[WindowBatch]] = [[] for _ in range(workers)]
+        vertex_inboxes: list[dict[int, float]] = [{} for _ in range(workers)]
+        _route_windows(windows_to_batch(list(initial_windows)), layout, -1, window_inboxes)
+
+        while any(window_inboxes) or any(vertex_inboxes):
+            active = [patch for patch in range(workers) if window_inboxes[patch] or vertex_inboxes[patch]]
+            for patch in active:
+                vertices = vertex_inboxes[patch]
+                connections[patch].send((
+                    concatenate_batches(window_inboxes[patch]),
+                    np.array(list(vertices.keys()), dtype=np.int32),
+                    np.array(list(vertices.values()), dtype=np.float64),
+                ))
+                window_inboxes[patch] = []
+                vertex_inboxes[patch] = {}
+
+            for patch in active:
+                result: PatchResult = connections[patch].recv()
+                _route_windows(result.windows, layout, patch, window_inboxes)
+
+                current = mesh.distance[result.vertices]
+                lower = np.isnan(current) | (result.distances < current)
+                for vertex, distance in zip(result.vertices[lower].tolist(), result.distances[lower].tolist()):
+                    mesh.distance[vertex] = distance
+                    start, end = layout.vertex_patch_offsets[vertex], layout.vertex_patch_offsets[vertex + 1]
+                    for other in layout.vertex_patches[start:end].tolist():
+                        if other != patch:
+                            vertex_inboxes[other][vertex] = distance
+
+        store = WindowStore()
+        for connection in connections:
+            connection.send(None)
+        for connection in connections:
+            store.add_batch(connection.recv())
+        return store
+    finally:
+        for connection in connections:
+            connection.close()
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
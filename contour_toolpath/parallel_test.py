@@ -0,0 +1,49 @@
+import numpy as np
+from contour_toolpath.algorithm import (
+    compute_distance_field, create_windows_at_edges, propagate_distance_field, update_distance_field,
+)
+from contour_toolpath.parallel import build_patch_layout, partition_faces, propagate_distance_field_parallel
+from contour_toolpath.testing import make_plate_with_hole
+
+
+def test_partition_faces():
+    mesh = make_plate_with_hole(21)
+    patches = partition_faces(mesh, 5)
+
+    sizes = np.bincount(patches)
+    assert len(sizes) == 5
+    assert sizes.max() - sizes.min() <= 1
+
+    layout = build_patch_layout(mesh, patches)
+    # Interface edges have faces in two patches, all other edges in one
+    counts = np.diff(layout.edge_patch_offsets)
+    assert np.array_equal(layout.interface_edges, counts == 2)
+    assert 0 < np.sum(layout.interface_edges) < len(mesh.edge_vertices) // 4
+    assert np.all(layout.edge_owner == [layout.edge_patches[layout.edge_patch_offsets[e]] for e in range(len(counts))])
+
+
+def test_parallel_matches_serial():
+    mesh = make_plate_with_hole(15)
+    serial_windows = compute_distance_field(mesh, "exact")
+    serial = mesh.distance.copy()
+
+    parallel_windows = compute_distance_field(mesh, "exact", workers=3)
+    assert serial_windows is not None and parallel_windows is not None
+    assert np.allclose(mesh.distance, serial, rtol=0.0, atol=1e-12)
+    # The patches owning the edges report windows on all of them
+    assert {w.edge_id for w in parallel_windows} == {w.edge_id for w in serial_windows}
+
+
+def test_adding_sources_to_parallel_windows():
+    mesh = make_plate_with_hole(13)
+    boundary = mesh.adjacency.boundary_edges()
+    middle = mesh.positions[mesh.edge_vertices[boundary], :2].mean(axis=1)
+    hole = boundary[np.abs(middle - 0.5).max(axis=1) < 0.4]
+    outer = np.setdiff1d(boundary, hole)
+    propagate_distance_field(mesh, set(create_windows_at_edges(boundary.tolist())))
+    everything = mesh.distance.copy()
+
+    # Parallel windows don't know their origin, which only matters when removing sources
+    store = propagate_distance_field_parallel(mesh, set(create_windows_at_edges(outer.tolist())), workers=2)
+    update_distance_field(mesh, store, added_sources=hole.tolist())
+    assert np.allclose(mesh.distance, everything, atol=1e-12)
@@ -0,0 +1,163 @@
+from typing import NamedTuple
+
+import matplotlib.pyplot as plt
+
+from contour_toolpath.mesh import Mesh, Triangle
+from contour_toolpath.window import Window
+from contour_toolpath.window_propagation import calculate_intersection_on_triangle, flip_edges, get_start_and_end_angle
+from mathutil.vector import Vec3D
+
+
+class Intercept(NamedTuple):
+    distance_t: float
+    angle: float
+    
+
+
+def plot_window_in_triangle(window: Window, triangle: Triangle, mesh: Mesh) -> None:
+    ax = plt.figure().add_subplot(projection='3d')
+    edge_obj = mesh.edges[window.edge_id]
+    start_vertex = mesh.vertices[edge_obj.start]
+    end_vertex = mesh.vertices[edge_obj.end]
+    edge_vec = end_vertex.position - start_vertex.position
+
+    verts: set[Vec3D] = set()
+
+    # plot all edges in the triangle
+    positions: list[Vec3D] = []
+    directions: list[Vec3D] = []
+    for edge_id in triangle.edges:
+        edge_obj2 = mesh.edges[edge_id]
+        start = mesh.vertices[edge_obj2.start].position
+        end = mesh.vertices[edge_obj2.end].position
+        other_edge_vec = end - start
+
+        verts.add(start)
+        verts.add(end)
+        positions.append(start)
+        directions.append(other_edge_vec)
+
+    xs = [v.x for v in verts]
+    ys = [v.y for v in verts]
+    zs = [v.z for v in verts]
+    ax.scatter(xs, ys, zs, color='black')  # Plot the vertices of the triangle
+
+    ps = [p.x for p in positions]
+    qs = [p.y for p in positions]
+    rs = [p.z for p in positions]
+
+    us = [d.x for d in directions]
+    vs = [d.y for d in directions]
+    ws = [d.z for d in directions]
+    ax.quiver(
+        ps, qs, rs,  # Starting points of the arrows
+        us, vs, ws,  # Direction vectors of the arrows
+        color='blue',  # Color of the arrows
+        arrow_length_ratio=0.03  # Ratio of arrow head length to arrow length
+    )
+    assert len(verts) == 3, "Triangle must have exactly 3 vertices"
+
+    # Plot the window
+    start_t = window.start_t
+    end_t = window.end_t
+    start_position = start_vertex.position + edge_vec * start_t
+    end_position = start_vertex.position + edge_vec * end_t
+    plt.plot(
+        [start_position.x, end_position.x],
+        [start_position.y, end_position.y],
+        [start_position.z, end_position.z],
+        color='red',
+        linewidth=5
+    )
+
+    angle_start, angle_end = get_start_and_end_angle(window, mesh)
+
+
+    windows: list[Window] = []
+
+
+    for other_edge in triangle.edges:
+        intercepts: list[Intercept] = []
+        for angle, window_edge_t in [(angle_start, start_t), (angle_end, end_t)]:
+            if other_edge == window.edge_id:
+                continue
+
+            common_edge1, common_edge2, distance_along_edge1, angle_corrected = flip_edges(
+                edge_obj,
+                mesh.edges[other_edge],
+                window_edge_t,
+                angle,
+            )
+            vcorner = mesh.vertices[common_edge1.start].position
+            vfree = mesh.vertices[common_edge2.end].position
+            vedge = mesh.vertices[common_edge1.end].position
+
+            dist = (vcorner - vedge).length() * distance_along_edge1
+            intersect_dist_1 = calculate_intersection_on_triangle(
+                vcorner=vcorner,
+                vfree=vfree,
+                vedge=vedge,
+                angle=angle_corrected,
+                dist=dist
+            )
+            assert intersect_dist_1 is not None, "Intersection distance should not be None"
+
+            intersect_position = vcorner + (vfree - vcorner).normalized() * intersect_dist_1
+
+
+            origin_position = start_vertex.position + edge_vec * window_edge_t
+
+            # Plot a line from start_position to intersect_position
+            plt.plot(
+                [origin_position.x, intersect_position.x],
+                [origin_position.y, intersect_position.y],
+                [origin_position.z, intersect_position.z],
+                color='green',
+                linewidth=2
+            )
+            # Plot a dot at each intercept
+            ax.scatter(intersect_position.x, intersect_position.y, intersect_position.z, color='black', marker='x')  # Plot the vertices of the triangle
+
+
+
+            intercepts.append(Intercept(
+                distance_t=intersect_dist_1, # TODO: divide by edge length to get in edge-space
+                angle=angle_corrected  # TODO: adjust for edge flipping I think
+            ))
+
+        # From 0 -> first intercept = circular window from window start angle
+        # From first intercept to second intercept = propagate linear/circular window
+        # From second intercept -> infinity = circular window from windw end angle
+        # windows_untrimmed = [
+        #     WindowCircular(
+        #         edge_id=other_edge,
+        #         start_t=0,
+        #         end_t=intercepts[0].distance_t,
+        #         cumulative_distance=window.cumulative_distance, # TODO: Sum this somehow
+        #         source_point=Vec2D(0,0)  # TODO: start point in `other_edge`` space
+        #     ),
+        #     WindowCircular(
+        #         edge_id=other_edge,
+        #         start_t=intercepts[0].distance_t,
+        #         end_t=intercepts[1].distance_t,
+        #     ) if isinstance(window, WindowCircular) else WindowLinear(
+        #         edge_id=other_edge,
+        #         start_t=intercepts[0].distance_t,
+        #         end_t=intercepts[1].distance_t,
+
+        #     ),
+        #     WindowCircular(
+        #         edge_id=other_edge,
+        #         start_t = intercepts[1].distance_t,
+        #         end_t=float('inf'),
+        #         cumulative_distance=window.cumulative_distance, # TODO: Sum this somehow
+        #         source_point=Vec2D(0,0)  # TODO: end point in `other_edge` space
+        #     )
+        # ]
+
+
+        
+        
+
+    # plot the window
+    plt.show()
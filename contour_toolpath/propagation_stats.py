@@ -0,0 +1,89 @@
+from typing import Callable
+
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.window_store import WindowStore
+
+
+PHASES = ("propagate", "merge", "push")
+
+PROGRESS_INTERVAL = 10_000
+""" Default number of pops between calls to `PropagationStats.progress` """
+
+
+class PropagationStats:
+    """
+    Counters and timings filled in by a window propagation that was given this object. Nothing is measured
+    when no collector is given, so the propagation runs the same code as before.
+
+    `progress` is called with the collector every `progress_interval` pops, and once more at the end.
+    """
+
+    def __init__(
+        self,
+        progress: Callable[["PropagationStats"], None] | None = None,
+        progress_interval: int = PROGRESS_INTERVAL,
+    ):
+        self.progress = progress
+        self.progress_interval = progress_interval
+
+        self.windows_created = 0
+        """ Windows handed to the merge: the initial ones, propagated ones and those from pseudo-sources """
+        self.windows_inserted = 0
+        """ Window pieces the merge kept """
+        self.windows_trimmed = 0
+        """ Existing windows cut back by closer new ones """
+        self.windows_discarded = 0
+        """ New windows the merge kept nothing of """
+
+        self.pushes = 0
+        self.pops = 0
+        self.queue_size = 0
+        self.peak_queue_size = 0
+
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        """ Time spent propagating windows through faces, merging them into the edges and queueing them """
+        self.run_seconds = 0.0
+        """ Wall time of the whole propagation, phases and everything between them """
+
+        self.edge_window_histogram: npt.NDArray[np.int64] | None = None
+        """ `histogram[k]` is the number of edges that ended up with `k` windows. Set when the propagation ends """
+
+    @property
+    def pops_per_second(self) -> float:
+        return self.pops / self.run_seconds if self.run_seconds > 0 else 0.0
+
+    @property
+    def merge_keep_ratio(self) -> float:
+        """ Fraction of the new windows of which the merge kept something """
+        return 1.0 - self.windows_discarded / self.windows_created if self.windows_created else 0.0
+
+    def record_pop(self, queue_size: int) -> None:
+        self.pops += 1
+        self.queue_size = queue_size
+        if self.progress is not None and self.pops % self.progress_interval == 0:
+            self.progress(self)
+
+    def record_push(self, queue_size: int, seconds: float) -> None:
+        self.pushes += 1
+        self.queue_size = queue_size
+        if queue_size > self.peak_queue_size:
+            self.peak_queue_size = queue_size
+        self.phase_seconds["push"] += seconds
+
+    def finish(self, store: WindowStore, num_edges: int) -> None:
+        """ Record the final windows per edge and report the end to `progress` """
+        edges = store.edge_id[store.live_handles()]
+        self.edge_window_histogram = np.bincount(np.bincount(edges, minlength=num_edges))
+        if self.progress is not None:
+            self.progress(self)
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in self.phase_seconds.items())
+        return (
+            f"{self.windows_created} windows created, {self.windows_inserted} pieces kept, "
+            f"{self.windows_trimmed} trimmed, {self.windows_discarded} discarded; "
+            f"{self.pops} pops at {self.pops_per_second:.0f}/s, peak queue {self.peak_queue_size}; "
+            f"{phases} of {self.run_seconds:.3f}s"
+        )
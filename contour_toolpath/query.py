@@ -0,0 +1,100 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+from contour_toolpath.algorithm import (
+    create_windows_at_edges, create_windows_at_point, create_windows_at_vertex, propagate_distance_field,
+)
+from contour_toolpath.mesh import FaceId, FloatArray, IndexArray, Mesh, VertexId, mesh_array_dict, mesh_from_array_dict
+from contour_toolpath.parallel import SharedArraySpec, attach_arrays, share_arrays
+from contour_toolpath.window import Window
+
+
+class SurfacePoint(NamedTuple):
+    face: FaceId
+    weights: tuple[float, float, float]
+    """ Barycentric weights of the corners of the face, in `Mesh.face_vertices` order """
+
+
+class SourceSet(NamedTuple):
+    """ What one query measures the distance from. Everything in it is at distance 0 """
+
+    edges: Sequence[int] = ()
+    """ Boundary edges, as `create_windows_at_boundaries` uses """
+    vertices: Sequence[int] = ()
+    """ Single vertices, such as drill points snapped to the mesh """
+    points: Sequence[SurfacePoint] = ()
+    """ Points anywhere on the surface """
+
+
+def source_windows(sources: SourceSet, mesh: Mesh) -> set[Window]:
+    """ The initial windows of a propagation from `sources` """
+    windows: set[Window] = set(create_windows_at_edges(sources.edges))
+    for vertex in sources.vertices:
+        windows.update(create_windows_at_vertex(VertexId(vertex), 0.0, mesh))
+    for point in sources.points:
+        windows.update(create_windows_at_point(point.face, point.weights, mesh))
+    return windows
+
+
+def query_distance(mesh: Mesh, sources: SourceSet) -> FloatArray:
+    """ The distance field from `sources`, which is also left in `mesh.distance` """
+    propagate_distance_field(mesh, source_windows(sources, mesh))
+    return mesh.distance.copy()
+
+
+_worker_mesh: Mesh | None = None
+_worker_blocks: list[SharedMemory] = []
+
+
+def _attach_worker(spec: SharedArraySpec) -> None:
+    global _worker_mesh, _worker_blocks
+    _worker_blocks, arrays = attach_arrays(spec)
+    # Topology and geometry are mapped from the parent, only the distance is copied
+    _worker_mesh = mesh_from_array_dict(arrays)
+
+
+def _query_worker(sources: SourceSet, targets: IndexArray | None) -> FloatArray:
+    assert _worker_mesh is not None
+    distance = query_distance(_worker_mesh, sources)
+    return distance if targets is None else distance[targets]
+
+
+def query_distances(
+    mesh: Mesh, queries: Sequence[SourceSet], targets: IndexArray | None = None, workers: int = 1
+) -> FloatArray:
+    """
+    The distance from each source set, as a (Q, N) array with a distance field per query, or (Q, T) at
+    the `targets` vertices only. The adjacency and geometry of the mesh are built once for all queries.
+
+    With `workers` above one, queries run concurrently in that many processes, which map the mesh arrays
+    from shared memory instead of building or copying them. `mesh.distance` is left as it was.
+    """
+    num_columns = len(mesh.positions) if targets is None else len(targets)
+    result = np.empty((len(queries), num_columns))
+    if workers <= 1 or len(queries) <= 1:
+        previous = mesh.distance.copy()
+        for i, sources in enumerate(queries):
+            distance = query_distance(mesh, sources)
+            result[i] = distance if targets is None else distance[targets]
+        mesh.distance[:] = previous
+        return result
+
+    blocks, spec = share_arrays(mesh_array_dict(mesh))
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(queries)),
+            mp_context=multiprocessing.get_context(),
+            initializer=_attach_worker,
+            initargs=(spec,),
+        ) as executor:
+            for i, distance in enumerate(executor.map(_query_worker, queries, [targets] * len(queries))):
+                result[i] = distance
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return result
@@ -0,0 +1,42 @@
+import numpy as np
+
+from contour_toolpath.mesh import FaceId
+from contour_toolpath.query import SourceSet, SurfacePoint, query_distances
+from contour_toolpath.testing import make_jittered_square
+
+
+def test_point_and_vertex_sources():
+    mesh = make_jittered_square(9)
+    inside = SurfacePoint(FaceId(40), (0.2, 0.3, 0.5))
+    # On the edge between corners 0 and 1 of face 57
+    on_edge = SurfacePoint(FaceId(57), (0.4, 0.6, 0.0))
+    queries = [
+        SourceSet(vertices=[30]),
+        SourceSet(points=[inside]),
+        SourceSet(points=[on_edge]),
+        SourceSet(vertices=[0], points=[inside]),
+    ]
+    distances = query_distances(mesh, queries)
+
+    def planar_distance(point: np.ndarray) -> np.ndarray:
+        return np.linalg.norm(mesh.positions - point, axis=1)
+
+    def position(point: SurfacePoint) -> np.ndarray:
+        return np.array(point.weights) @ mesh.positions[mesh.face_vertices[point.face]]
+
+    # A convex flat part: geodesics are straight lines
+    assert np.allclose(distances[0], planar_distance(mesh.positions[30]), atol=1e-12)
+    assert np.allclose(distances[1], planar_distance(position(inside)), atol=1e-12)
+    assert np.allclose(distances[2], planar_distance(position(on_edge)), atol=1e-12)
+    assert np.allclose(distances[3], np.minimum(planar_distance(mesh.positions[0]), distances[1]), atol=1e-12)
+    assert np.all(np.isnan(mesh.distance))
+
+
+def test_query_distances_in_parallel():
+    mesh = make_jittered_square(7)
+    queries = [SourceSet(edges=mesh.adjacency.boundary_edges()[:4].tolist()), SourceSet(vertices=[10]), SourceSet(vertices=[3, 40])]
+    targets = np.array([0, 5, 24, 48])
+
+    fields = query_distances(mesh, queries)
+    assert fields.shape == (3, len(mesh.positions))
+    assert np.array_equal(query_distances(mesh, queries, targets, workers=2), fields[:, targets])
@@ -0,0 +1,462 @@
+import math
+from typing import NamedTuple, Sequence, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.algorithm import Propagation
+from contour_toolpath.geometry import MeshGeometry, corner_angles_of, opposite_in_edge_frame
+from contour_toolpath.mesh import EdgeId, FloatArray, IndexArray, Mesh
+from contour_toolpath.topology import MeshAdjacency, OffsetArray
+from contour_toolpath.window import WINDOW_EPSILON
+from contour_toolpath.window_batch import KIND_CIRCULAR, WindowBatch
+from contour_toolpath.window_intervals import WindowMap
+from contour_toolpath.window_store import WindowHandle, WindowStore
+
+
+ERROR_TOLERANCE = 0.05
+"""
+Edges are split where the distance field at their midpoint is further than this many step-overs from the
+average of the distances at their ends, as contours are cut from that linear interpolation
+"""
+
+LENGTH_TOLERANCE = 2.0
+""" Edges longer than this many step-overs are split whatever the field does """
+
+MIN_LENGTH = 0.02
+""" Edges shorter than this many step-overs are never split. The field has kinks where fronts meet, which no amount of splitting makes linear """
+
+MAX_ROUNDS = 8
+
+
+class EdgeSplit(NamedTuple):
+    """ What `split_edges` changed. New vertices, edges and faces are appended after the old ones """
+
+    midpoints: IndexArray
+    """ The new vertex in the middle of each split edge """
+    second_halves: IndexArray
+    """ The new edge from the midpoint to the end of each split edge. The split edge keeps its first half """
+    faces: IndexArray
+    """ The faces that replaced the split ones, including those that kept the id of the face they came from """
+
+
+def edge_midpoint_distances(mesh: Mesh, store: WindowStore) -> FloatArray:
+    """ (E,) the distance field at the middle of every edge, from the windows on it. NaN where none reaches """
+    handles = store.live_handles()
+    handles = handles[(store.start_t[handles] <= 0.5) & (store.end_t[handles] >= 0.5)]
+    edges = store.edge_id[handles]
+    x = 0.5 * mesh.geometry.edge_lengths[edges]
+    source_x = store.source_x[handles]
+    d = store.distance[handles] + np.where(
+        store.kind[handles] == KIND_CIRCULAR, np.hypot(x - source_x, store.source_y[handles]), x * source_x
+    )
+    midpoint_distance = np.full(len(mesh.edge_vertices), np.inf)
+    np.minimum.at(midpoint_distance, edges, d)
+    midpoint_distance[np.isinf(midpoint_distance)] = np.nan
+    return midpoint_distance
+
+
+def edges_to_split(
+    mesh: Mesh,
+    midpoint_distance: FloatArray,
+    step_over: float,
+    error_tolerance: float = ERROR_TOLERANCE,
+    length_tolerance: float = LENGTH_TOLERANCE,
+) -> IndexArray:
+    """
+    The edges where the distance field strays from linear by more than `error_tolerance` step-overs, or
+    that are longer than `length_tolerance` step-overs
+    """
+    lengths = mesh.geometry.edge_lengths
+    with np.errstate(invalid="ignore"):
+        # NaN, for edges the field doesn't reach, compares false
+        bends = np.abs(midpoint_distance - mesh.distance[mesh.edge_vertices].mean(axis=1)) > error_tolerance * step_over
+    split = (bends | (lengths > length_tolerance * step_over)) & (lengths > MIN_LENGTH * step_over)
+    return np.flatnonzero(split).astype(np.int32)
+
+
+def _splice_rows(
+    offsets: OffsetArray, rows: npt.NDArray[np.integer], row_lengths: Sequence[int], num_rows: int
+) -> tuple[OffsetArray, npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """
+    Lay out a CSR with `rows` replaced by rows of `row_lengths` and empty rows added up to `num_rows`.
+    Returns the new offsets, where the items of the other rows go and come from, and where the items of
+    the replaced rows go (row after row), so that every array aligned with the items can be moved over
+    with one gather.
+    """
+    old_lengths = np.diff(offsets)
+    lengths = np.zeros(num_rows, dtype=np.int64)
+    lengths[:len(old_lengths)] = old_lengths
+    lengths[rows] = row_lengths
+    new_offsets = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+
+    kept_rows = np.ones(len(old_lengths), dtype=bool)
+    kept_rows[rows[rows < len(old_lengths)]] = False
+    row_of_item = np.repeat(np.arange(len(old_lengths)), old_lengths)
+    kept_from = np.flatnonzero(kept_rows[row_of_item])
+    kept_rows_of_items = row_of_item[kept_from]
+    kept_to = kept_from + (new_offsets[kept_rows_of_items] - offsets[kept_rows_of_items])
+
+    replaced_lengths = lengths[rows]
+    replaced_to = np.repeat(new_offsets[rows] - np.cumsum(replaced_lengths) + replaced_lengths, replaced_lengths)
+    replaced_to += np.arange(len(replaced_to))
+    return new_offsets, kept_to, kept_from, replaced_to
+
+
+ScalarT = TypeVar("ScalarT", bound=np.generic)
+
+
+def _spliced(
+    items: npt.NDArray[ScalarT],
+    size: int,
+    kept_to: npt.NDArray[np.int64],
+    kept_from: npt.NDArray[np.int64],
+    replaced_to: npt.NDArray[np.int64],
+    replaced: npt.ArrayLike,
+) -> npt.NDArray[ScalarT]:
+    """ `items` moved to the layout of `_splice_rows`, with `replaced` in the replaced rows """
+    result = np.empty((size,) + items.shape[1:], dtype=items.dtype)
+    result[kept_to] = items[kept_from]
+    result[replaced_to] = replaced
+    return result
+
+
+def split_edges(mesh: Mesh, edges: IndexArray, midpoint_distance: FloatArray) -> EdgeSplit:
+    """
+    Split `edges` at their middles, and each face with split edges into 2, 3 or 4 faces so the mesh stays
+    conforming: a new edge from the midpoint to the opposite corner for one split edge, the midpoints joined
+    and the rest of the face cut along its shorter diagonal for two, and four corner-and-middle faces for
+    three. `midpoint_distance` (aligned with `edges`) is the distance of the new vertices.
+
+    The surface is not moved, only cut up, so the distances and windows found on it stay right.
+    The adjacency and geometry of `mesh` are patched rather than built again: only the rows of the split
+    faces, and of the edges and vertices around them, are computed. The arrays are still copied to make
+    room for the new elements, but that is a memory copy, not per-element work.
+    """
+    adjacency = mesh.adjacency
+    geometry = mesh.geometry
+    positions = mesh.positions
+    edge_vertices = mesh.edge_vertices
+    face_edges = mesh.face_edges
+    face_vertices = mesh.face_vertices
+    num_vertices = len(positions)
+    num_edges = len(edge_vertices)
+    num_faces = len(face_edges)
+    count = len(edges)
+
+    midpoints = np.arange(num_vertices, num_vertices + count, dtype=np.int32)
+    second_halves = np.arange(num_edges, num_edges + count, dtype=np.int32)
+    midpoint_of = np.full(num_edges, -1, dtype=np.int64)
+    midpoint_of[edges] = midpoints
+    second_half_of = np.full(num_edges, -1, dtype=np.int64)
+    second_half_of[edges] = second_halves
+    new_positions = np.concatenate([positions, 0.5 * (positions[edge_vertices[edges, 0]] + positions[edge_vertices[edges, 1]])])
+
+    def half(edge: int, vertex: int) -> int:
+        """ The half of a split edge that touches one of its ends """
+        return edge if edge_vertices.item(edge, 0) == vertex else second_half_of.item(edge)
+
+    def length(a: int, b: int) -> float:
+        return math.dist(new_positions[a].tolist(), new_positions[b].tolist())
+
+    inner_edges: list[tuple[int, int]] = []
+    inner_edge_parents: list[int] = []
+
+    def inner_edge(a: int, b: int, parent: int) -> int:
+        inner_edges.append((a, b))
+        inner_edge_parents.append(parent)
+        return num_edges + count + len(inner_edges) - 1
+
+    refined = np.flatnonzero((midpoint_of[face_edges] >= 0).any(axis=1))
+    children: dict[int, list[tuple[list[int], list[int]]]] = {}
+    """ The corners and edges of the faces each refined face is cut into """
+    for face in refined.tolist():
+        corners = face_vertices[face].tolist()
+        sides = face_edges[face].tolist()
+        split_slots = [i for i in range(3) if midpoint_of.item(sides[i]) >= 0]
+        if len(split_slots) == 1:
+            i = split_slots[0]
+            a, b, c = corners[i], corners[(i + 1) % 3], corners[(i + 2) % 3]
+            ab, bc, ca = sides[i], sides[(i + 1) % 3], sides[(i + 2) % 3]
+            m = midpoint_of.item(ab)
+            x = inner_edge(m, c, face)
+            children[face] = [([a, m, c], [half(ab, a), x, ca]), ([m, b, c], [half(ab, b), bc, x])]
+        elif len(split_slots) == 2:
+            # Slot j is whole: its start is c, so that the split ones are a -> b and b -> c
+            j = next(i for i in range(3) if i not in split_slots)
+            c, a, b = corners[j], corners[(j + 1) % 3], corners[(j + 2) % 3]
+            ca, ab, bc = sides[j], sides[(j + 1) % 3], sides[(j + 2) % 3]
+            m_ab, m_bc = midpoint_of.item(ab), midpoint_of.item(bc)
+            y = inner_edge(m_ab, m_bc, face)
+            top = ([m_ab, b, m_bc], [half(ab, b), half(bc, b), y])
+            # The rest is the quad a, m_ab, m_bc, c
+            if length(a, m_bc) <= length(m_ab, c):
+                x = inner_edge(a, m_bc, face)
+                children[face] = [
+                    top, ([a, m_ab, m_bc], [half(ab, a), y, x]), ([a, m_bc, c], [x, half(bc, c), ca]),
+                ]
+            else:
+                x = inner_edge(m_ab, c, face)
+                children[face] = [
+                    top, ([a, m_ab, c], [half(ab, a), x, ca]), ([m_ab, m_bc, c], [y, half(bc, c), x]),
+                ]
+        else:
+            a, b, c = corners
+            ab, bc, ca = sides
+            m_ab, m_bc, m_ca = midpoint_of.item(ab), midpoint_of.item(bc), midpoint_of.item(ca)
+            x_b = inner_edge(m_ab, m_bc, face)
+            x_c = inner_edge(m_bc, m_ca, face)
+            x_a = inner_edge(m_ca, m_ab, face)
+            children[face] = [
+                ([a, m_ab, m_ca], [half(ab, a), x_a, half(ca, a)]),
+                ([m_ab, b, m_bc], [half(ab, b), half(bc, b), x_b]),
+                ([m_ca, m_bc, c], [x_c, half(bc, c), half(ca, c)]),
+                ([m_ab, m_bc, m_ca], [x_b, x_c, x_a]),
+            ]
+
+    # The first child of a face keeps its id, the others are appended
+    child_ids: dict[int, list[int]] = {}
+    appended_vertices: list[list[int]] = []
+    appended_edges: list[list[int]] = []
+    changed_faces: list[int] = []
+    changed_vertices: list[list[int]] = []
+    changed_edges: list[list[int]] = []
+    for face, pieces in children.items():
+        ids = [face]
+        for corners, sides in pieces[1:]:
+            ids.append(num_faces + len(appended_vertices))
+            appended_vertices.append(corners)
+            appended_edges.append(sides)
+        child_ids[face] = ids
+        changed_faces.extend(ids)
+        changed_vertices.extend(corners for corners, _ in pieces)
+        changed_edges.extend(sides for _, sides in pieces)
+
+    new_edge_vertices = np.concatenate([
+        edge_vertices,
+        np.stack([midpoints, edge_vertices[edges, 1]], axis=1),
+        np.array(inner_edges, dtype=np.int32).reshape(-1, 2),
+    ])
+    new_edge_vertices[edges, 1] = midpoints
+    new_face_vertices = np.concatenate([face_vertices, np.array(appended_vertices, dtype=np.int32).reshape(-1, 3)])
+    new_face_edges = np.concatenate([face_edges, np.array(appended_edges, dtype=np.int32).reshape(-1, 3)])
+    faces = np.array(changed_faces, dtype=np.int32)
+    new_face_vertices[faces] = np.array(changed_vertices, dtype=np.int32).reshape(-1, 3)
+    new_face_edges[faces] = np.array(changed_edges, dtype=np.int32).reshape(-1, 3)
+    new_num_edges = len(new_edge_vertices)
+    new_num_faces = len(new_face_edges)
+    new_num_vertices = len(new_positions)
+
+    # Edge -> face rows. Faces keep their order, with each split face replaced by its child along the edge,
+    # so the first face of an edge stays on the same side and the sign of window sources holds
+    face_edge_rows = dict(zip(changed_faces, changed_edges))
+
+    def child_along(face: int, edge: int) -> int:
+        if face not in child_ids:
+            return face
+        return next(child for child in child_ids[face] if edge in face_edge_rows[child])
+
+    touched_edges = np.unique(new_face_edges[faces])
+    touched_edge_ids: list[int] = touched_edges.tolist()
+    edge_rows: list[list[int]] = []
+    for edge in touched_edge_ids:
+        if edge < num_edges:
+            row = [child_along(face, edge) for face in adjacency.faces_of_edge(edge).tolist()]
+        elif edge < num_edges + count:
+            split_edge = edges.item(edge - num_edges)
+            row = [child_along(face, edge) for face in adjacency.faces_of_edge(split_edge).tolist()]
+        else:
+            parent = inner_edge_parents[edge - num_edges - count]
+            row = [child for child in child_ids[parent] if edge in face_edge_rows[child]]
+        edge_rows.append(row)
+    edge_face_offsets, kept_to, kept_from, replaced_to = _splice_rows(
+        adjacency.edge_face_offsets, touched_edges, [len(row) for row in edge_rows], new_num_edges
+    )
+    replaced_faces = np.array([face for row in edge_rows for face in row], dtype=np.int32)
+    replaced_edges = np.repeat(touched_edges, [len(row) for row in edge_rows])
+    replaced_slots = np.argmax(new_face_edges[replaced_faces] == replaced_edges[:, None], axis=1).astype(np.int32)
+    edge_faces = _spliced(adjacency.edge_faces, len(kept_to) + len(replaced_to), kept_to, kept_from, replaced_to, replaced_faces)
+    edge_face_slots = _spliced(adjacency.edge_face_slots, len(edge_faces), kept_to, kept_from, replaced_to, replaced_slots)
+
+    # Vertex rows: the old faces and edges that still touch the vertex, and the new ones that do
+    refined_mask = np.zeros(num_faces, dtype=bool)
+    refined_mask[refined] = True
+    touched_vertices = np.unique(new_face_vertices[faces])
+    faces_at: dict[int, list[int]] = {}
+    for face, corners in zip(changed_faces, changed_vertices):
+        for vertex in corners:
+            faces_at.setdefault(vertex, []).append(face)
+    edges_at: dict[int, list[int]] = {}
+    for edge in range(num_edges, new_num_edges):
+        for vertex in new_edge_vertices[edge].tolist():
+            edges_at.setdefault(vertex, []).append(edge)
+    for edge, midpoint in zip(edges.tolist(), midpoints.tolist()):
+        edges_at.setdefault(midpoint, []).append(edge)
+    vertex_face_rows: list[list[int]] = []
+    vertex_edge_rows: list[list[int]] = []
+    for vertex in touched_vertices.tolist():
+        old_faces: list[int] = []
+        old_edges: list[int] = []
+        if vertex < num_vertices:
+            old_faces = [face for face in adjacency.faces_of_vertex(vertex).tolist() if not refined_mask[face]]
+            old_edges = [edge for edge in adjacency.edges_of_vertex(vertex).tolist() if vertex in new_edge_vertices[edge].tolist()]
+        vertex_face_rows.append(old_faces + faces_at.get(vertex, []))
+        vertex_edge_rows.append(old_edges + edges_at.get(vertex, []))
+    vertex_face_offsets, to, source, replaced = _splice_rows(
+        adjacency.vertex_face_offsets, touched_vertices, [len(row) for row in vertex_face_rows], new_num_vertices
+    )
+    vertex_faces = _spliced(
+        adjacency.vertex_faces, int(vertex_face_offsets[-1]), to, source, replaced,
+        [face for row in vertex_face_rows for face in row],
+    )
+    vertex_edge_offsets, to, source, replaced = _splice_rows(
+        adjacency.vertex_edge_offsets, touched_vertices, [len(row) for row in vertex_edge_rows], new_num_vertices
+    )
+    vertex_edges = _spliced(
+        adjacency.vertex_edges, int(vertex_edge_offsets[-1]), to, source, replaced,
+        [edge for row in vertex_edge_rows for edge in row],
+    )
+
+    face_opposite_vertex = np.concatenate([adjacency.face_opposite_vertex, new_face_vertices[num_faces:, [2, 0, 1]]])
+    face_opposite_vertex[faces] = new_face_vertices[faces][:, [2, 0, 1]]
+    new_distance = np.concatenate([mesh.distance, midpoint_distance])
+
+    # Geometry, for the split faces and the edges and vertices around them
+    old_corner_angles = geometry.corner_angles[refined]
+    mesh.replace(
+        new_positions,
+        new_edge_vertices,
+        new_face_edges,
+        new_face_vertices,
+        new_distance,
+        adjacency=MeshAdjacency(
+            edge_face_offsets=edge_face_offsets,
+            edge_faces=edge_faces,
+            edge_face_slots=edge_face_slots,
+            vertex_edge_offsets=vertex_edge_offsets,
+            vertex_edges=vertex_edges,
+            vertex_face_offsets=vertex_face_offsets,
+            vertex_faces=vertex_faces,
+            face_vertices=new_face_vertices,
+            face_opposite_vertex=face_opposite_vertex,
+        ),
+    )
+    changed_edge_ids = np.concatenate([edges, np.arange(num_edges, new_num_edges)])
+    edge_lengths = np.concatenate([geometry.edge_lengths, np.empty(new_num_edges - num_edges)])
+    edge_lengths[changed_edge_ids] = np.linalg.norm(
+        new_positions[new_edge_vertices[changed_edge_ids, 1]] - new_positions[new_edge_vertices[changed_edge_ids, 0]], axis=1
+    )
+    corner_angles = np.concatenate([geometry.corner_angles, np.empty((new_num_faces - num_faces, 3))])
+    corner_angles[faces] = corner_angles_of(new_positions, new_face_vertices[faces])
+    vertex_angle_sums = np.concatenate([geometry.vertex_angle_sums, np.zeros(count)])
+    np.subtract.at(vertex_angle_sums, face_vertices[refined], old_corner_angles)
+    np.add.at(vertex_angle_sums, new_face_vertices[faces], corner_angles[faces])
+    is_first_face = np.zeros(len(replaced_to), dtype=bool)
+    is_first_face[np.isin(replaced_to, edge_face_offsets[touched_edges])] = True
+    mesh.geometry = MeshGeometry(
+        edge_lengths=edge_lengths,
+        corner_angles=corner_angles,
+        vertex_angle_sums=vertex_angle_sums,
+        edge_face_opposite=_spliced(
+            geometry.edge_face_opposite, len(edge_faces), kept_to, kept_from, replaced_to,
+            opposite_in_edge_frame(
+                mesh, replaced_edges, face_opposite_vertex[replaced_faces, replaced_slots], is_first_face
+            ),
+        ),
+    )
+    return EdgeSplit(midpoints=midpoints, second_halves=second_halves, faces=faces)
+
+
+def split_windows(window_map: WindowMap, edges: IndexArray, second_halves: IndexArray, lengths: FloatArray) -> None:
+    """
+    Move the windows on `edges` onto the halves the edges were split into by `split_edges`, in the store and
+    on the edges of `window_map`, which must already have the edge lengths after the split. `lengths` are
+    the lengths of the edges before the split. The pieces keep the origin of the window they came from.
+    Only the windows on `edges` are looked at.
+    """
+    store = window_map.store
+    moved: list[WindowHandle] = []
+    moved_index: list[int] = []
+    for i, edge in enumerate(edges.tolist()):
+        # Dropped rather than emptied, as the list has the length of the whole edge
+        edge_windows = window_map.edges.pop(EdgeId(edge), None)
+        if edge_windows is not None:
+            moved.extend(edge_windows.handles)
+            moved_index.extend([i] * len(edge_windows.handles))
+    handles = np.array(moved, dtype=np.int32)
+    index = np.array(moved_index, dtype=np.int64)
+    window = store.gather(handles)
+    origin = store.origin[handles]
+    for handle in moved:
+        store.kill(handle)
+
+    # The first half has the same frame, at twice the scale
+    first_end = 2 * np.minimum(window.end_t, 0.5)
+    first = first_end - 2 * window.start_t > WINDOW_EPSILON
+    first_handles = store.add_batch(WindowBatch(
+        edge_id=window.edge_id[first],
+        start_t=2 * window.start_t[first],
+        end_t=first_end[first],
+        kind=window.kind[first],
+        distance=window.distance[first],
+        source_x=window.source_x[first],
+        source_y=window.source_y[first],
+    ), origin[first])
+
+    # The second half starts half an edge further along
+    second_start = 2 * np.maximum(window.start_t, 0.5) - 1
+    second = 2 * window.end_t - 1 - second_start > WINDOW_EPSILON
+    shift = 0.5 * lengths[index[second]]
+    circular = window.kind[second] == KIND_CIRCULAR
+    source_x = window.source_x[second]
+    second_handles = store.add_batch(WindowBatch(
+        edge_id=second_halves[index[second]],
+        start_t=second_start[second],
+        end_t=2 * window.end_t[second] - 1,
+        kind=window.kind[second],
+        # A linear window's distance is at the start of its edge
+        distance=window.distance[second] + np.where(circular, 0.0, shift * source_x),
+        source_x=np.where(circular, source_x - shift, source_x),
+        source_y=window.source_y[second],
+    ), origin[second])
+    window_map.add_handles(np.concatenate([first_handles, second_handles]))
+
+
+def refine_mesh(
+    mesh: Mesh,
+    windows: WindowStore,
+    step_over: float,
+    error_tolerance: float = ERROR_TOLERANCE,
+    length_tolerance: float = LENGTH_TOLERANCE,
+    max_rounds: int = MAX_ROUNDS,
+) -> int:
+    """
+    Split the faces of `mesh` where contours `step_over` apart would come out wrong: where the distance
+    field strays from linear over an edge by more than `error_tolerance` step-overs, or edges are longer than
+    `length_tolerance` step-overs. `windows` is the store of the propagation that found the distances.
+
+    Each round splits the edges found (`split_edges`), moves their windows onto the halves, and propagates
+    again from the windows on the edges of the split faces only, which gives the new edges inside them
+    windows and so the next round something to measure. Faces elsewhere are not touched. Stops when no edge
+    needs splitting, or after `max_rounds`. Returns the number of edges split.
+    """
+    split_count = 0
+    # One propagation for every round, which follows the mesh as it is split
+    propagation = Propagation(mesh, store=windows)
+    for _ in range(max_rounds):
+        midpoint_distance = edge_midpoint_distances(mesh, windows)
+        edges = edges_to_split(mesh, midpoint_distance, step_over, error_tolerance, length_tolerance)
+        if not len(edges):
+            break
+        lengths = mesh.geometry.edge_lengths[edges]
+        split = split_edges(mesh, edges, midpoint_distance[edges])
+        propagation.extend_mesh()
+        split_windows(propagation.window_map, edges, split.second_halves, lengths)
+
+        # Windows from the corners of the split faces onto the new edges opposite them
+        propagation.respawn_vertices(np.unique(mesh.face_vertices[split.faces]).tolist())
+        propagation.queue_edges(np.unique(mesh.face_edges[split.faces]).tolist())
+        propagation.run()
+        split_count += len(edges)
+    return split_count
@@ -0,0 +1,83 @@
+import numpy as np
+
+from contour_toolpath.algorithm import (
+    Propagation, create_windows_at_boundaries, propagate_distance_field, pseudo_source_vertices,
+)
+from contour_toolpath.geometry import build_geometry
+from contour_toolpath.mesh import Mesh
+from contour_toolpath.refine import edge_midpoint_distances, refine_mesh, split_edges, split_windows
+from contour_toolpath.testing import distance_to_boundary, make_plate_with_hole
+from contour_toolpath.topology import build_adjacency
+from contour_toolpath.window_intervals import WindowMap
+
+
+def test_split_edges_patches_adjacency_and_geometry():
+    mesh = make_plate_with_hole(9)
+    windows = propagate_distance_field(mesh, set(create_windows_at_boundaries(mesh)))
+    rng = np.random.default_rng(0)
+    # Random edges, so faces get one, two and three split edges
+    edges = np.sort(rng.choice(len(mesh.edge_vertices), 60, replace=False)).astype(np.int32)
+    split = split_edges(mesh, edges, edge_midpoint_distances(mesh, windows)[edges])
+    # Split edges keep their first half
+    assert np.array_equal(mesh.edge_vertices[edges, 1], split.midpoints)
+    assert np.array_equal(mesh.edge_vertices[split.second_halves, 0], split.midpoints)
+    ends = np.stack([mesh.edge_vertices[edges, 0], mesh.edge_vertices[split.second_halves, 1]], axis=1)
+    assert np.allclose(mesh.positions[split.midpoints], mesh.positions[ends].mean(axis=1))
+
+    patched = mesh.adjacency
+    built = build_adjacency(mesh)
+    for offsets, items in (("edge_face_offsets", "edge_faces"), ("vertex_edge_offsets", "vertex_edges"), ("vertex_face_offsets", "vertex_faces")):
+        assert np.array_equal(getattr(patched, offsets), getattr(built, offsets))
+        a, b = getattr(patched, items), getattr(built, items)
+        bounds = getattr(built, offsets)
+        # The order within a row may differ
+        assert all(sorted(a[start:end]) == sorted(b[start:end]) for start, end in zip(bounds[:-1], bounds[1:]))
+    assert np.array_equal(patched.face_opposite_vertex, built.face_opposite_vertex)
+
+    # Built from the patched adjacency, so the per-(edge, face) rows line up
+    geometry = build_geometry(mesh)
+    for field in geometry._fields:
+        assert np.allclose(getattr(mesh.geometry, field), getattr(geometry, field), atol=1e-12)
+
+
+def test_propagation_follows_split():
+    mesh = make_plate_with_hole(9)
+    windows = propagate_distance_field(mesh, set(create_windows_at_boundaries(mesh)))
+    propagation = Propagation(mesh, store=windows)
+    # Boundary edges among them, so some midpoints are pseudo-sources
+    edges = np.arange(0, len(mesh.edge_vertices), 3, dtype=np.int32)
+    lengths = mesh.geometry.edge_lengths[edges]
+    split = split_edges(mesh, edges, edge_midpoint_distances(mesh, windows)[edges])
+    propagation.extend_mesh()
+    split_windows(propagation.window_map, edges, split.second_halves, lengths)
+
+    assert np.array_equal(propagation.spawns_windows, pseudo_source_vertices(mesh))
+    assert propagation.spawns_windows[split.midpoints].any()
+    rebuilt = WindowMap(mesh, windows)
+    rebuilt.add_live_windows()
+    assert propagation.window_map.edges.keys() == rebuilt.edges.keys()
+    for edge, edge_windows in rebuilt.edges.items():
+        assert propagation.window_map.edges[edge].handles == edge_windows.handles
+        assert propagation.window_map.edges[edge].edge_length == edge_windows.edge_length
+
+
+def test_refine_mesh_matches_full_propagation():
+    mesh = make_plate_with_hole(9)
+    windows = propagate_distance_field(mesh, set(create_windows_at_boundaries(mesh)))
+    face_vertices = mesh.face_vertices.copy()
+
+    assert refine_mesh(mesh, windows, step_over=0.1) > 0
+    assert len(mesh.face_edges) > len(face_vertices)
+    # Faces where the field is already linear are left alone
+    assert np.any(np.all(mesh.face_vertices[:len(face_vertices)] == face_vertices, axis=1))
+    assert np.allclose(mesh.distance, distance_to_boundary(mesh), atol=1e-12)
+
+    fresh = Mesh.from_arrays(mesh.positions, mesh.edge_vertices, mesh.face_edges, mesh.face_vertices)
+    fresh_windows = propagate_distance_field(fresh, set(create_windows_at_boundaries(fresh)))
+    assert np.allclose(mesh.distance, fresh.distance, atol=1e-12)
+    # The windows carry the same field, so the next refinement starts from the right place
+    midpoints = edge_midpoint_distances(mesh, windows)
+    fresh_midpoints = edge_midpoint_distances(fresh, fresh_windows)
+    both = ~np.isnan(fresh_midpoints)
+    assert not np.any(np.isnan(midpoints))
+    assert np.allclose(midpoints[both], fresh_midpoints[both], atol=1e-12)
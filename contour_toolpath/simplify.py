@@ -0,0 +1,86 @@
+from typing import Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.contour import Contour
+from contour_toolpath.mesh import FloatArray
+
+
+BoolArray = npt.NDArray[np.bool_]
+OffsetArray = npt.NDArray[np.int64]
+
+
+def _distance_to_segment(points: FloatArray, a: FloatArray, b: FloatArray) -> FloatArray:
+    """ Row-wise distance from `points` to the segments `a`-`b`, which may have zero length """
+    ab = b - a
+    length_sq = np.einsum("ij,ij->i", ab, ab)
+    t = np.einsum("ij,ij->i", points - a, ab) / np.where(length_sq > 0, length_sq, 1.0)
+    closest = a + np.clip(t, 0.0, 1.0)[:, None] * ab
+    return np.linalg.norm(points - closest, axis=1)
+
+
+def simplify_polylines(points: FloatArray, offsets: OffsetArray, tolerance: float) -> BoolArray:
+    """
+    Ramer-Douglas-Peucker over many polylines at once. Polyline `i` is `points[offsets[i]:offsets[i + 1]]`.
+    Returns which points to keep: every dropped point is within `tolerance` of the simplified polyline.
+
+    Each round measures the points of every unresolved span, across all polylines, in one array pass and
+    splits the spans whose farthest point is out of tolerance, so the number of rounds is the depth of the
+    recursion rather than the number of spans.
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    span_start = offsets[:-1]
+    span_end = offsets[1:] - 1
+    nonempty = span_end >= span_start
+    span_start, span_end = span_start[nonempty], span_end[nonempty]
+    keep[span_start] = True
+    keep[span_end] = True
+
+    while True:
+        open_span = span_end - span_start > 1
+        span_start, span_end = span_start[open_span], span_end[open_span]
+        if len(span_start) == 0:
+            return keep
+
+        # The interior points of every span, laid out span after span
+        counts = span_end - span_start - 1
+        first = np.cumsum(counts) - counts
+        span_of = np.repeat(np.arange(len(counts)), counts)
+        inner = span_start[span_of] + 1 + np.arange(int(counts.sum())) - first[span_of]
+        distance = _distance_to_segment(points[inner], points[span_start[span_of]], points[span_end[span_of]])
+
+        # The first point at each span's maximum
+        span_max = np.maximum.reduceat(distance, first)
+        hits = np.flatnonzero(distance == span_max[span_of])
+        first_hit = hits[np.r_[True, span_of[hits[1:]] != span_of[hits[:-1]]]]
+        split = inner[first_hit]
+
+        far = span_max > tolerance
+        keep[split[far]] = True
+        span_start, span_end = np.concatenate([span_start[far], split[far]]), np.concatenate([split[far], span_end[far]])
+
+
+def simplify_contours(contours: Sequence[Contour], tolerance: float) -> list[Contour]:
+    """
+    `simplify_polylines` over a batch of contours. A closed contour is simplified as a path from its first
+    point around and back to it, so its first point is always kept.
+    """
+    if not contours:
+        return []
+    # Closed contours get their first point repeated at the end, dropped again afterwards
+    paths = [
+        np.vstack([c.points, c.points[:1]]) if c.closed and len(c.points) else c.points
+        for c in contours
+    ]
+    lengths = np.array([len(path) for path in paths], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    keep = simplify_polylines(np.vstack(paths), offsets, tolerance)
+
+    simplified: list[Contour] = []
+    for contour, start, stop in zip(contours, offsets[:-1].tolist(), offsets[1:].tolist()):
+        kept = np.flatnonzero(keep[start:stop])
+        if contour.closed:
+            kept = kept[:-1]
+        simplified.append(contour._replace(points=contour.points[kept], edges=contour.edges[kept]))
+    return simplified
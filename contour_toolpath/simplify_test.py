@@ -0,0 +1,47 @@
+import numpy as np
+from contour_toolpath.contour import extract_contours
+from contour_toolpath.simplify import simplify_contours, simplify_polylines
+from contour_toolpath.testing import distance_to_boundary, make_plate_with_hole
+
+
+def rdp(points: np.ndarray, tolerance: float) -> list[int]:
+    """ The textbook recursion, keeping the first farthest point """
+    if len(points) < 3:
+        return list(range(len(points)))
+    a, b = points[0], points[-1]
+    ab = b - a
+    t = np.clip((points[1:-1] - a) @ ab / max(ab @ ab, 1e-300), 0.0, 1.0)
+    distance = np.linalg.norm(points[1:-1] - (a + t[:, None] * ab), axis=1)
+    split = int(np.argmax(distance)) + 1
+    if distance[split - 1] <= tolerance:
+        return [0, len(points) - 1]
+    return rdp(points[:split + 1], tolerance)[:-1] + [split + i for i in rdp(points[split:], tolerance)]
+
+
+def test_batched_rdp_matches_recursion():
+    rng = np.random.default_rng(0)
+    lengths = [0, 1, 2, 3, 50, 400]
+    polylines = [np.cumsum(rng.normal(size=(n, 3)), axis=0) for n in lengths]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    keep = simplify_polylines(np.vstack(polylines), offsets, 1.5)
+    for polyline, start, stop in zip(polylines, offsets[:-1], offsets[1:]):
+        assert np.flatnonzero(keep[start:stop]).tolist() == rdp(polyline, 1.5)
+
+
+def test_simplified_contours_stay_within_tolerance():
+    mesh = make_plate_with_hole(41)
+    mesh.distance[:] = distance_to_boundary(mesh)
+    contours = extract_contours(mesh, [0.03, 0.07])
+    simplified = simplify_contours(contours, 0.005)
+
+    for contour, simple in zip(contours, simplified):
+        assert simple.closed and len(simple.points) < len(contour.points) / 2
+        assert np.array_equal(simple.points[0], contour.points[0])
+        # Every original point is close to some segment of the simplified loop
+        a = simple.points
+        b = np.roll(simple.points, -1, axis=0)
+        ab = b - a
+        t = np.clip(np.einsum("pij,ij->pi", contour.points[:, None] - a, ab) / np.sum(ab * ab, axis=1), 0, 1)
+        gaps = np.linalg.norm(contour.points[:, None] - (a + t[..., None] * ab), axis=2)
+        assert np.max(np.min(gaps, axis=1)) <= 0.005
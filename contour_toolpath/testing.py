@@ -0,0 +1,65 @@
+import numpy as np
+import trimesh
+
+from contour_toolpath.importer import build_mesh_from_faces
+from contour_toolpath.mesh import Mesh
+
+
+def icosphere(subdivisions: int) -> trimesh.Trimesh:
+    """ A unit icosphere. trimesh leaves its creation functions unannotated """
+    return trimesh.creation.icosphere(subdivisions=subdivisions)  # type: ignore
+
+
+def box() -> trimesh.Trimesh:
+    """ A unit cube centered on the origin, two triangles per side """
+    return trimesh.creation.box()  # type: ignore
+
+
+def make_plate_with_hole(n: int) -> Mesh:
+    """ A jittered unit square grid with the cells around the middle removed """
+    rng = np.random.default_rng(0)
+    xs = np.linspace(0.0, 1.0, n)
+    x, y = np.meshgrid(xs, xs, indexing="ij")
+    positions = np.stack([x.ravel(), y.ravel(), np.zeros(n * n)], axis=1)
+    interior = (x.ravel() > 0) & (x.ravel() < 1) & (y.ravel() > 0) & (y.ravel() < 1)
+    positions[interior, :2] += rng.uniform(-0.3, 0.3, (int(interior.sum()), 2)) / n
+
+    faces: list[list[int]] = []
+    for i in range(n - 1):
+        for j in range(n - 1):
+            if abs((i + 0.5) / (n - 1) - 0.5) < 0.2 and abs((j + 0.5) / (n - 1) - 0.5) < 0.2:
+                continue
+            v = i * n + j
+            faces += [[v, v + n, v + n + 1], [v, v + n + 1, v + 1]]
+
+    # Drop the vertices inside the hole
+    used, compact_faces = np.unique(np.array(faces), return_inverse=True)
+    return build_mesh_from_faces(positions[used], compact_faces.reshape(-1, 3))
+
+
+def distance_to_boundary(mesh: Mesh) -> np.ndarray:
+    """ Planar distance from every vertex to the nearest boundary edge """
+    points = mesh.positions[:, :2]
+    distances: list[np.ndarray] = []
+    for start, end in mesh.edge_vertices[mesh.adjacency.boundary_edges()].tolist():
+        a, b = mesh.positions[start, :2], mesh.positions[end, :2]
+        t = np.clip((points - a) @ (b - a) / ((b - a) @ (b - a)), 0.0, 1.0)
+        distances.append(np.linalg.norm(points - (a + t[:, None] * (b - a)), axis=1))
+    return np.min(distances, axis=0)
+
+
+def make_jittered_square(n: int) -> Mesh:
+    """ A flat unit square grid with its interior vertices moved about, so no geodesic is along an edge """
+    rng = np.random.default_rng(1)
+    xs = np.linspace(0.0, 1.0, n)
+    x, y = np.meshgrid(xs, xs, indexing="ij")
+    positions = np.stack([x.ravel(), y.ravel(), np.zeros(n * n)], axis=1)
+    interior = (x.ravel() > 0) & (x.ravel() < 1) & (y.ravel() > 0) & (y.ravel() < 1)
+    positions[interior, :2] += rng.uniform(-0.3, 0.3, (int(interior.sum()), 2)) / n
+    faces = [
+        face
+        for i in range(n - 1)
+        for j in range(n - 1)
+        for face in ([i * n + j, (i + 1) * n + j + 1, i * n + j + 1], [i * n + j, (i + 1) * n + j, (i + 1) * n + j + 1])
+    ]
+    return build_mesh_from_faces(positions, np.array(faces))
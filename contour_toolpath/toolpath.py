@@ -0,0 +1,288 @@
+import math
+import time
+from typing import Generator, Iterable, Iterator, Literal, NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.contour import Contour, extract_contours
+from contour_toolpath.mesh import FloatArray, Mesh
+from contour_toolpath.simplify import simplify_contours
+
+
+ToolpathFormat = Literal["gcode", "csv"]
+
+LEVELS_PER_BATCH = 16
+""" Levels cut at once by `iter_contours`. Bounds the segments held in memory """
+
+POINTS_PER_BATCH = 1 << 16
+""" Points gathered by `iter_simplified` before simplifying them together """
+
+
+class Move(NamedTuple):
+    rapid: bool
+    """ Move at full speed without cutting (G0) rather than at the feed rate (G1) """
+
+    points: FloatArray
+    """ (K, 3) the positions visited, in order. A NaN coordinate leaves that axis where it is """
+
+
+class WriteStats(NamedTuple):
+    bytes_written: int
+    seconds: float
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes_written / 1e6 / self.seconds if self.seconds > 0 else float("inf")
+
+
+def iter_contours(mesh: Mesh, levels: npt.ArrayLike, levels_per_batch: int = LEVELS_PER_BATCH) -> Iterator[Contour]:
+    """
+    The contours of `extract_contours`, in the same order, cut a few levels at a time so only one batch of
+    segments and polylines is alive at once. Each batch only cuts the faces whose range it overlaps.
+    """
+    level_arr = np.asarray(levels, dtype=np.float64).ravel()
+    corner_distance = mesh.distance[mesh.face_vertices]
+    lowest, highest = corner_distance.min(axis=1), corner_distance.max(axis=1)
+    del corner_distance
+    for start in range(0, len(level_arr), levels_per_batch):
+        batch = level_arr[start:start + levels_per_batch]
+        # A face is crossed by the levels in (lowest, highest]. NaN compares false, so unknown faces drop out
+        faces = np.flatnonzero((lowest < batch[-1]) & (highest >= batch[0])).astype(np.int32)
+        yield from extract_contours(mesh, batch, faces)
+
+
+def iter_simplified(
+    contours: Iterable[Contour], tolerance: float, points_per_batch: int = POINTS_PER_BATCH
+) -> Iterator[Contour]:
+    """ The contours with points within `tolerance` of the rest dropped, simplified in batches """
+    batch: list[Contour] = []
+    batch_points = 0
+    for contour in contours:
+        batch.append(contour)
+        batch_points += len(contour.points)
+        if batch_points >= points_per_batch:
+            yield from simplify_contours(batch, tolerance)
+            batch, batch_points = [], 0
+    yield from simplify_contours(batch, tolerance)
+
+
+def _cut(points: FloatArray, safe_z: float) -> Iterator[Move]:
+    """ Lift straight up to `safe_z`, travel over the first point at that height, then plunge and cut """
+    first = points[0]
+    yield Move(rapid=True, points=np.array([[np.nan, np.nan, safe_z]]))
+    yield Move(rapid=True, points=np.array([[first[0], first[1], safe_z]]))
+    yield Move(rapid=False, points=points)
+
+
+def iter_moves(contours: Iterable[Contour], safe_z: float) -> Iterator[Move]:
+    """
+    Cut each contour in turn: lift to `safe_z`, travel over its first point, plunge and follow it.
+    Closed contours end back at their first point.
+    """
+    for contour in contours:
+        points = contour.points
+        if len(points) < 2:
+            continue
+        if contour.closed:
+            points = np.vstack([points, points[:1]])
+        yield from _cut(points, safe_z)
+
+
+class _Spiral(NamedTuple):
+    loops: list[FloatArray]
+    """ Closed loops linked on but not cut yet, each starting and ending where it joins the loop before """
+
+    end: FloatArray
+    """ (3,) """
+
+
+def _nearest_on_loop(loop: FloatArray, target: FloatArray) -> tuple[int, FloatArray, float]:
+    """ The segment of a closed loop nearest `target` (segment `i` starts at point `i`), that point and its distance """
+    ab = np.roll(loop, -1, axis=0) - loop
+    length_sq = np.einsum("ij,ij->i", ab, ab)
+    t = np.einsum("ij,ij->i", target - loop, ab) / np.where(length_sq > 0, length_sq, 1.0)
+    closest = loop + np.clip(t, 0.0, 1.0)[:, None] * ab
+    distance = np.linalg.norm(closest - target, axis=1)
+    segment = int(np.argmin(distance))
+    return segment, closest[segment], float(distance[segment])
+
+
+def _link_level(
+    ends: list[FloatArray], loops: list[FloatArray], max_link: float
+) -> tuple[dict[int, FloatArray], list[FloatArray]]:
+    """
+    Link the spirals ending at `ends` to the loops of the next level, nearest links first. Returns the loop
+    each linked spiral carries on with, by spiral, and the unlinked loops closed on themselves
+    """
+    links: list[tuple[float, int, int, int, FloatArray]] = []
+    if loops:
+        lows: FloatArray = np.array([loop.min(axis=0) for loop in loops])
+        highs: FloatArray = np.array([loop.max(axis=0) for loop in loops])
+        # Sorted by their lowest x, only a prefix of the loops can be within reach of an end
+        order = np.argsort(lows[:, 0], kind="stable")
+        sorted_low_x: FloatArray = lows[order, 0]
+        for s, end in enumerate(ends):
+            near = order[:np.searchsorted(sorted_low_x, end[0] + max_link, side="right")]
+            # Skip loops whose bounding box is already too far away
+            gap = np.maximum(np.maximum(lows[near] - end, end - highs[near]), 0.0)
+            reachable: list[int] = near[np.linalg.norm(gap, axis=1) <= max_link].tolist()
+            for l in reachable:
+                segment, point, distance = _nearest_on_loop(loops[l], end)
+                if distance <= max_link:
+                    links.append((distance, s, l, segment, point))
+    links.sort(key=lambda link: link[:3])
+
+    continued: dict[int, FloatArray] = {}
+    linked_loops: set[int] = set()
+    for _, s, l, segment, point in links:
+        if s in continued or l in linked_loops:
+            continue
+        linked_loops.add(l)
+        # Start and end the loop at the linking point, which splits its segment in two
+        continued[s] = np.vstack([point, np.roll(loops[l], -(segment + 1), axis=0), point])
+    started = [np.vstack([loop, loop[:1]]) for l, loop in enumerate(loops) if l not in linked_loops]
+    return continued, started
+
+
+def _cut_level(
+    spirals: list[_Spiral], cutting: int | None, loops: list[FloatArray], max_link: float, safe_z: float
+) -> Generator[Move, None, tuple[list[_Spiral], int | None]]:
+    """
+    Link the loops of the next level onto `spirals`. The loop joining the spiral the tool is on (`cutting`)
+    is cut straight away, the others are held, and spirals that end are cut. Returns the spirals carried on
+    and the one the tool is on
+    """
+    continued, started = _link_level([spiral.end for spiral in spirals], loops, max_link)
+    carried: list[_Spiral] = []
+    on: int | None = None
+    for s, loop in sorted(continued.items()):
+        if s == cutting:
+            # The tool is at the end of the spiral, which is where the loop starts
+            yield Move(rapid=False, points=loop)
+            on = len(carried)
+            carried.append(_Spiral(loops=[], end=loop[-1]))
+        else:
+            carried.append(_Spiral(loops=spirals[s].loops + [loop], end=loop[-1]))
+    carried.extend(_Spiral(loops=[loop], end=loop[-1]) for loop in started)
+    for s, spiral in enumerate(spirals):
+        if s not in continued and spiral.loops:
+            # Cutting a spiral that ended takes the tool away from the one it was on
+            yield from _cut(np.vstack(spiral.loops), safe_z)
+            on = None
+    if on is None:
+        # Move to the spiral holding the most loops and keep cutting it as it grows
+        waiting = [c for c, spiral in enumerate(carried) if spiral.loops]
+        if waiting:
+            on = max(waiting, key=lambda c: len(carried[c].loops))
+            yield from _cut(np.vstack(carried[on].loops), safe_z)
+            carried[on] = carried[on]._replace(loops=[])
+    return carried, on
+
+
+def iter_spiral_moves(contours: Iterable[Contour], safe_z: float, max_link: float) -> Iterator[Move]:
+    """
+    Like `iter_moves`, but each closed contour steps straight over to the closed contour of the next level
+    that passes within `max_link`, starting at its nearest point, instead of lifting and travelling. Open
+    contours are cut on their own.
+
+    The spiral the tool is on is cut a loop at a time as each level is linked. The loops of other spirals are
+    held until the tool moves over to them, which happens when the spiral it is on ends, or when a spiral
+    ends and is cut, which costs the spiral in progress one retract. With one spiral at a time, memory is
+    bounded by a level of contours whatever the part size.
+    """
+    spirals: list[_Spiral] = []
+    cutting: int | None = None
+    loops: list[FloatArray] = []
+    level: float | None = None
+    for contour in contours:
+        if len(contour.points) < 2:
+            continue
+        if not contour.closed:
+            yield from iter_moves([contour], safe_z)
+            # The tool is no longer at the end of the spiral
+            cutting = None
+            continue
+        if contour.level != level:
+            spirals, cutting = yield from _cut_level(spirals, cutting, loops, max_link, safe_z)
+            loops, level = [], contour.level
+        loops.append(contour.points)
+    spirals, _ = yield from _cut_level(spirals, cutting, loops, max_link, safe_z)
+    for spiral in spirals:
+        if spiral.loops:
+            yield from _cut(np.vstack(spiral.loops), safe_z)
+
+
+def safe_height(mesh: Mesh, clearance: float) -> float:
+    """ `clearance` above the highest point of the mesh """
+    return float(np.max(mesh.positions[:, 2])) + clearance
+
+
+def gcode_chunks(moves: Iterable[Move], feed_rate: float, precision: int = 4) -> Iterator[str]:
+    """ Millimetre, absolute G-code with one chunk of text per move """
+    rapid_line = f"G0 X%.{precision}f Y%.{precision}f Z%.{precision}f\n"
+    feed_line = f"G1 X%.{precision}f Y%.{precision}f Z%.{precision}f\n"
+    yield f"G21\nG90\nG1 F{feed_rate:g}\n"
+    for move in moves:
+        points = move.points
+        if np.isnan(points).any():
+            # Axes that stay put are left out, as in the `G0 Z` lift before each cut
+            code = "G0" if move.rapid else "G1"
+            yield "".join(
+                " ".join([code] + [f"{axis}{value:.{precision}f}" for axis, value in zip("XYZ", point) if not math.isnan(value)]) + "\n"
+                for point in points.tolist()
+            )
+            continue
+        # One %-format over the whole move is several times faster than formatting point by point
+        line = rapid_line if move.rapid else feed_line
+        yield (line * len(points)) % tuple(points.ravel().tolist())
+    yield "M2\n"
+
+
+def csv_chunks(moves: Iterable[Move], precision: int = 4) -> Iterator[str]:
+    """ One `rapid,x,y,z` row per point, with `rapid` as 0 or 1 and `nan` for axes that stay put """
+    rapid_line = f"1,%.{precision}f,%.{precision}f,%.{precision}f\n"
+    feed_line = f"0,%.{precision}f,%.{precision}f,%.{precision}f\n"
+    yield "rapid,x,y,z\n"
+    for move in moves:
+        line = rapid_line if move.rapid else feed_line
+        yield (line * len(move.points)) % tuple(move.points.ravel().tolist())
+
+
+def write_chunks(chunks: Iterable[str], path: str, buffer_size: int = 1 << 20) -> WriteStats:
+    """ Write text chunks as they are produced, through a `buffer_size` byte buffer """
+    bytes_written = 0
+    start = time.perf_counter()
+    with open(path, "w", encoding="ascii", buffering=buffer_size) as file:
+        for chunk in chunks:
+            # The output is ASCII, so characters and bytes agree
+            bytes_written += file.write(chunk)
+    return WriteStats(bytes_written=bytes_written, seconds=time.perf_counter() - start)
+
+
+def write_toolpath(
+    mesh: Mesh,
+    levels: npt.ArrayLike,
+    path: str,
+    file_format: ToolpathFormat = "gcode",
+    feed_rate: float = 1000.0,
+    clearance: float = 5.0,
+    tolerance: float = 0.0,
+    max_link: float = 0.0,
+) -> WriteStats:
+    """
+    Stream the contours of `mesh.distance` at `levels` to `path` as toolpath moves. Contours, moves and
+    text are all produced lazily, so memory stays bounded by one batch of levels whatever the part size.
+    The time includes contour extraction.
+
+    A `tolerance` above zero simplifies the contours, and a `max_link` above zero joins closed contours on
+    consecutive levels into spirals, see `iter_spiral_moves`.
+    """
+    contours = iter_contours(mesh, levels)
+    if tolerance > 0:
+        contours = iter_simplified(contours, tolerance)
+    safe_z = safe_height(mesh, clearance)
+    moves = iter_spiral_moves(contours, safe_z, max_link) if max_link > 0 else iter_moves(contours, safe_z)
+    if file_format == "gcode":
+        return write_chunks(gcode_chunks(moves, feed_rate), path)
+    return write_chunks(csv_chunks(moves), path)
@@ -0,0 +1,101 @@
+import itertools
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+from contour_toolpath.contour import Contour, extract_contours
+from contour_toolpath.testing import distance_to_boundary, make_plate_with_hole
+from contour_toolpath.toolpath import gcode_chunks, iter_contours, iter_moves, iter_spiral_moves, write_toolpath
+
+
+def test_iter_contours_matches_extract_contours():
+    mesh = make_plate_with_hole(21)
+    mesh.distance[:] = distance_to_boundary(mesh)
+    levels = np.arange(0.01, 0.1, 0.01)
+
+    streamed = list(iter_contours(mesh, levels, levels_per_batch=2))
+    contours = extract_contours(mesh, levels)
+    assert len(streamed) == len(contours)
+    for a, b in zip(streamed, contours):
+        assert a.level == b.level and a.closed == b.closed
+        assert np.array_equal(a.points, b.points)
+
+
+def test_write_gcode_and_csv(tmp_path: Path):
+    mesh = make_plate_with_hole(21)
+    mesh.distance[:] = distance_to_boundary(mesh)
+    levels = [0.04, 0.09]
+    contours = extract_contours(mesh, levels)
+
+    gcode_path = str(tmp_path / "part.gcode")
+    stats = write_toolpath(mesh, levels, gcode_path, clearance=2.0)
+    lines = Path(gcode_path).read_text().splitlines()
+    assert stats.bytes_written == Path(gcode_path).stat().st_size
+    assert lines[:3] == ["G21", "G90", "G1 F1000"] and lines[-1] == "M2"
+    # A lift and a travel to each contour, then every point of it plus the return to its start
+    assert sum(line.startswith("G0") for line in lines) == 2 * len(contours)
+    assert sum(line.startswith("G1 X") for line in lines) == sum(len(c.points) + 1 for c in contours)
+    assert all(line.endswith("Z2.0000") for line in lines if line.startswith("G0"))
+
+    csv_path = str(tmp_path / "part.csv")
+    write_toolpath(mesh, levels, csv_path, file_format="csv")
+    rows = np.loadtxt(csv_path, delimiter=",", skiprows=1)
+    cuts = rows[rows[:, 0] == 0, 1:]
+    assert np.allclose(cuts[:len(contours[0].points)], contours[0].points, atol=1e-4)
+
+
+def test_spiral_linking_removes_retracts(tmp_path: Path):
+    mesh = make_plate_with_hole(21)
+    mesh.distance[:] = distance_to_boundary(mesh)
+    levels = np.arange(0.02, 0.13, 0.02)
+
+    path = str(tmp_path / "part.gcode")
+    write_toolpath(mesh, levels, path, max_link=0.03)
+    lines = Path(path).read_text().splitlines()
+    # One spiral in from the outside and one out from the hole, each cutting every level: a lift and a
+    # travel each
+    assert sum(line.startswith("G0") for line in lines) == 4
+    # Every point of every loop plus the return to its start, and the linking point added to 10 of the loops
+    contours = extract_contours(mesh, levels)
+    assert len(contours) == 12
+    assert sum(line.startswith("G1 X") for line in lines) == sum(len(c.points) + 1 for c in contours) + 10
+
+
+def test_spiral_is_cut_as_it_is_linked():
+    square = np.array([[-1.0, -1.0, 0.0], [1.0, -1.0, 0.0], [1.0, 1.0, 0.0], [-1.0, 1.0, 0.0]])
+    edges = np.zeros(4, dtype=np.int32)
+    read: list[float] = []
+
+    def contours() -> Iterator[Contour]:
+        for level in range(1, 6):
+            read.append(level)
+            yield Contour(float(level), square * level, edges, closed=True)
+
+    moves = iter_spiral_moves(contours(), safe_z=10.0, max_link=1.5)
+    # A lift and a travel, then each loop as soon as the level after it shows up
+    assert [move.rapid for move in itertools.islice(moves, 4)] == [True, True, False, False]
+    assert read == [1, 2, 3]
+    rest = list(moves)
+    assert not any(move.rapid for move in rest) and len(rest) == 3
+
+
+def test_retract_lifts_before_travelling():
+    square = np.array([[0.0, 0.0, -1.0], [1.0, 0.0, -1.0], [1.0, 1.0, -1.0]])
+    edges = np.zeros(3, dtype=np.int32)
+    contours = [Contour(1.0, square, edges, closed=False), Contour(2.0, square + 5.0, edges, closed=False)]
+    lines = "".join(gcode_chunks(iter_moves(contours, safe_z=10.0), feed_rate=100.0)).splitlines()
+    assert lines[3:] == [
+        # Straight up, over at the safe height, then down at the feed rate
+        "G0 Z10.0000",
+        "G0 X0.0000 Y0.0000 Z10.0000",
+        "G1 X0.0000 Y0.0000 Z-1.0000",
+        "G1 X1.0000 Y0.0000 Z-1.0000",
+        "G1 X1.0000 Y1.0000 Z-1.0000",
+        # Up from the end of the cut, never through the stock to the next one
+        "G0 Z10.0000",
+        "G0 X5.0000 Y5.0000 Z10.0000",
+        "G1 X5.0000 Y5.0000 Z4.0000",
+        "G1 X6.0000 Y5.0000 Z4.0000",
+        "G1 X6.0000 Y6.0000 Z4.0000",
+        "M2",
+    ]
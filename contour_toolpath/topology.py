@@ -0,0 +1,201 @@
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.mesh import IndexArray, Mesh
+
+
+OffsetArray = npt.NDArray[np.int64]
+
+
+class EdgeTopology(NamedTuple):
+    """
+    The edge tables of a triangle soup.
+
+    Edge ids are handed out in order of first appearance when walking the faces in order and each face's
+    edges as (v0, v1), (v1, v2), (v2, v0). This is the same numbering the original per-face dict loop in
+    `build_mesh_from_trimesh` produced, so ids are stable across the two implementations.
+    """
+
+    edge_vertices: IndexArray
+    """ (E, 2) the vertices of each edge as (min, max) """
+
+    face_edges: IndexArray
+    """ (F, 3) edge slot `i` joins face corner `i` and corner `i + 1` """
+
+    edge_face_offsets: OffsetArray
+    """ (E + 1,) CSR offsets into `edge_faces` """
+
+    edge_faces: IndexArray
+    """ The faces touching each edge, in face order. Faces of edge `e` are `edge_faces[offsets[e]:offsets[e + 1]]` """
+
+
+def build_edge_topology(faces: npt.ArrayLike, num_vertices: int | None = None) -> EdgeTopology:
+    """
+    Build the edge table, face->edge table and edge->face incidence for a (F, 3) face->vertex array.
+
+    Every half-edge is reduced to an integer key `min * N + max`, sorted once, and the sorted runs become
+    edges. No Python-level loop runs per face.
+    """
+    face_arr = np.ascontiguousarray(faces, dtype=np.int64).reshape(-1, 3)
+    num_faces = len(face_arr)
+    if num_vertices is None:
+        num_vertices = int(face_arr.max()) + 1 if num_faces else 0
+
+    # Half-edges in face-major order: (f, 0), (f, 1), (f, 2), (f + 1, 0), ...
+    a = face_arr.ravel()
+    b = face_arr[:, [1, 2, 0]].ravel()
+    lo = np.minimum(a, b)
+    hi = np.maximum(a, b)
+    keys = lo * max(num_vertices, 1) + hi
+
+    # A stable sort keeps the half-edges of each edge in face order, so the first of each run is the
+    # first appearance of that edge
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    is_run_start = np.empty(len(sorted_keys), dtype=bool)
+    is_run_start[:1] = True
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=is_run_start[1:])
+    run_starts = np.flatnonzero(is_run_start)
+    run_of_sorted = np.cumsum(is_run_start) - 1
+
+    # Renumber the runs by first appearance to match the loop-based numbering
+    first_half_edge = order[run_starts]
+    edge_order = np.argsort(first_half_edge, kind="stable")
+    edge_id_of_run = np.empty(len(run_starts), dtype=np.int64)
+    edge_id_of_run[edge_order] = np.arange(len(run_starts))
+
+    edge_of_sorted = edge_id_of_run[run_of_sorted]
+    face_edges = np.empty(len(keys), dtype=np.int32)
+    face_edges[order] = edge_of_sorted
+
+    first_keys = keys[first_half_edge[edge_order]]
+    edge_vertices = np.stack(
+        [first_keys // max(num_vertices, 1), first_keys % max(num_vertices, 1)], axis=1
+    ).astype(np.int32)
+
+    # Edge -> face CSR. Each run is already in face order, it only has to be moved to its edge's slot
+    run_lengths = np.diff(np.append(run_starts, len(sorted_keys)))
+    counts = np.empty(len(run_starts), dtype=np.int64)
+    counts[edge_id_of_run] = run_lengths
+    offsets = np.zeros(len(run_starts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    rank_in_run = np.arange(len(sorted_keys)) - run_starts[run_of_sorted]
+    edge_faces = np.empty(len(keys), dtype=np.int32)
+    edge_faces[offsets[edge_of_sorted] + rank_in_run] = order // 3
+
+    return EdgeTopology(
+        edge_vertices=edge_vertices,
+        face_edges=face_edges.reshape(num_faces, 3),
+        edge_face_offsets=offsets,
+        edge_faces=edge_faces,
+    )
+
+
+class MeshAdjacency(NamedTuple):
+    """
+    Adjacency index of a `Mesh`, built once by `build_adjacency` and cached on `Mesh.adjacency`.
+    All one-to-many relations are CSR pairs: the items of row `i` are `items[offsets[i]:offsets[i + 1]]`.
+    """
+
+    edge_face_offsets: OffsetArray
+    """ (E + 1,) """
+    edge_faces: IndexArray
+    """ The faces touching each edge """
+    edge_face_slots: IndexArray
+    """ Aligned with `edge_faces`: which of the face's three edge slots the edge is in """
+
+    vertex_edge_offsets: OffsetArray
+    """ (N + 1,) """
+    vertex_edges: IndexArray
+    """ The edges touching each vertex """
+
+    vertex_face_offsets: OffsetArray
+    """ (N + 1,) """
+    vertex_faces: IndexArray
+    """ The faces touching each vertex """
+
+    face_vertices: IndexArray
+    """ (F, 3) the corners of each face in winding order. Edge slot `i` joins corner `i` and `i + 1` """
+    face_opposite_vertex: IndexArray
+    """ (F, 3) the corner of the face opposite edge slot `i` """
+
+    def faces_of_edge(self, edge: int) -> IndexArray:
+        return self.edge_faces[self.edge_face_offsets[edge]:self.edge_face_offsets[edge + 1]]
+
+    def face_slots_of_edge(self, edge: int) -> IndexArray:
+        return self.edge_face_slots[self.edge_face_offsets[edge]:self.edge_face_offsets[edge + 1]]
+
+    def edge_face_index(self, edge: int, face: int) -> int:
+        """ The position of (edge, face) in `edge_faces`, for looking up per-(edge, face) tables """
+        start = int(self.edge_face_offsets[edge])
+        return start + self.faces_of_edge(edge).tolist().index(face)
+
+    def edges_of_vertex(self, vertex: int) -> IndexArray:
+        return self.vertex_edges[self.vertex_edge_offsets[vertex]:self.vertex_edge_offsets[vertex + 1]]
+
+    def faces_of_vertex(self, vertex: int) -> IndexArray:
+        return self.vertex_faces[self.vertex_face_offsets[vertex]:self.vertex_face_offsets[vertex + 1]]
+
+    def edge_face_counts(self) -> OffsetArray:
+        """ Number of faces touching each edge. 1 for boundary edges, 2 for interior manifold edges """
+        return np.diff(self.edge_face_offsets)
+
+    def boundary_edges(self) -> IndexArray:
+        return np.flatnonzero(self.edge_face_counts() == 1).astype(np.int32)
+
+
+def _group_by_key(keys: npt.NDArray[np.int64], num_keys: int) -> tuple[OffsetArray, npt.NDArray[np.int64]]:
+    """
+    Returns CSR offsets over `num_keys` rows and the order that groups the items by key.
+    Items with the same key keep their original relative order.
+    """
+    order = np.argsort(keys, kind="stable")
+    offsets = np.zeros(num_keys + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=num_keys), out=offsets[1:])
+    return offsets, order
+
+
+def build_adjacency(mesh: Mesh, edge_topology: EdgeTopology | None = None) -> MeshAdjacency:
+    """
+    Build the adjacency index of a mesh. `edge_topology` can be passed when it is already at hand from
+    `build_edge_topology`, so that the edge->face incidence is not recomputed.
+    """
+    num_vertices = len(mesh.positions)
+    num_edges = len(mesh.edge_vertices)
+    num_faces = len(mesh.face_edges)
+
+    half_edge_face = np.repeat(np.arange(num_faces, dtype=np.int64), 3)
+    half_edge_slot = np.tile(np.arange(3, dtype=np.int32), num_faces)
+    half_edges = mesh.face_edges.ravel().astype(np.int64)
+
+    if edge_topology is not None:
+        edge_face_offsets = edge_topology.edge_face_offsets
+        edge_faces = edge_topology.edge_faces
+        # Faces of each edge are in face order, so the slot can be found from the face's edge row
+        rows = mesh.face_edges[edge_faces]
+        edge_ids = np.repeat(np.arange(num_edges, dtype=np.int32), np.diff(edge_face_offsets))
+        edge_face_slots = np.argmax(rows == edge_ids[:, None], axis=1).astype(np.int32)
+    else:
+        edge_face_offsets, order = _group_by_key(half_edges, num_edges)
+        edge_faces = half_edge_face[order].astype(np.int32)
+        edge_face_slots = half_edge_slot[order]
+
+    vertex_edge_offsets, order = _group_by_key(mesh.edge_vertices.ravel().astype(np.int64), num_vertices)
+    vertex_edges = (order // 2).astype(np.int32)
+
+    vertex_face_offsets, order = _group_by_key(mesh.face_vertices.ravel().astype(np.int64), num_vertices)
+    vertex_faces = (order // 3).astype(np.int32)
+
+    return MeshAdjacency(
+        edge_face_offsets=edge_face_offsets,
+        edge_faces=edge_faces,
+        edge_face_slots=edge_face_slots,
+        vertex_edge_offsets=vertex_edge_offsets,
+        vertex_edges=vertex_edges,
+        vertex_face_offsets=vertex_face_offsets,
+        vertex_faces=vertex_faces,
+        face_vertices=mesh.face_vertices,
+        face_opposite_vertex=np.ascontiguousarray(mesh.face_vertices[:, [2, 0, 1]]),
+    )
@@ -0,0 +1,99 @@
+import numpy as np
+from contour_toolpath.importer import build_mesh_from_faces, build_mesh_from_trimesh
+from contour_toolpath.testing import box, icosphere
+from contour_toolpath.topology import build_adjacency, build_edge_topology
+
+
+def build_edge_topology_reference(faces: list[list[int]]) -> tuple[list[tuple[int, int]], list[list[int]], list[list[int]]]:
+    """ The per-face dict loop the importer used before it was vectorized """
+    edge_map: dict[tuple[int, int], int] = {}
+    edge_list: list[tuple[int, int]] = []
+    edge_faces: list[list[int]] = []
+    face_edges: list[list[int]] = []
+    for face_id, face in enumerate(faces):
+        tri_edges: list[int] = []
+        for i in range(3):
+            a, b = face[i], face[(i + 1) % 3]
+            key = (a, b) if a < b else (b, a)
+            if key not in edge_map:
+                edge_map[key] = len(edge_list)
+                edge_list.append(key)
+                edge_faces.append([])
+            edge_faces[edge_map[key]].append(face_id)
+            tri_edges.append(edge_map[key])
+        face_edges.append(tri_edges)
+    return edge_list, face_edges, edge_faces
+
+
+def test_edge_topology_matches_loop_numbering():
+    tm = icosphere(2)
+    # Shuffle faces so that first-appearance order is not the same as sorted order
+    faces = np.random.default_rng(1).permutation(np.asarray(tm.faces))
+
+    topology = build_edge_topology(faces)
+    edge_list, face_edges, edge_faces = build_edge_topology_reference(faces.tolist())
+
+    assert topology.edge_vertices.tolist() == [list(e) for e in edge_list]
+    assert topology.face_edges.tolist() == face_edges
+    for edge_id, expected in enumerate(edge_faces):
+        start, end = topology.edge_face_offsets[edge_id], topology.edge_face_offsets[edge_id + 1]
+        assert topology.edge_faces[start:end].tolist() == expected
+
+
+def test_edge_topology_open_and_non_manifold():
+    # Three triangles sharing the edge (0, 1)
+    faces = [[0, 1, 2], [1, 0, 3], [0, 1, 4]]
+    topology = build_edge_topology(faces)
+
+    counts = np.diff(topology.edge_face_offsets)
+    assert topology.edge_vertices[0].tolist() == [0, 1]
+    assert counts[0] == 3
+    assert counts[1:].tolist() == [1] * 6
+
+
+def test_build_mesh_from_trimesh_keeps_winding():
+    tm = box()
+    mesh = build_mesh_from_trimesh(tm)
+
+    assert np.array_equal(mesh.face_vertices, np.asarray(tm.faces))
+    assert len(mesh.edges) == 18
+
+
+def test_adjacency_matches_brute_force():
+    tm = icosphere(1)
+    mesh = build_mesh_from_trimesh(tm)
+    # The importer seeds the index from its edge topology. It must agree with a fresh build
+    seeded = mesh.adjacency
+    fresh = build_adjacency(mesh)
+
+    for edge_id in range(len(mesh.edges)):
+        expected = [f for f, face in enumerate(mesh.faces) if edge_id in face.edges]
+        assert seeded.faces_of_edge(edge_id).tolist() == expected
+        assert fresh.faces_of_edge(edge_id).tolist() == expected
+        for face_id, slot in zip(expected, seeded.face_slots_of_edge(edge_id).tolist()):
+            assert mesh.face_edges[face_id, slot] == edge_id
+        assert seeded.face_slots_of_edge(edge_id).tolist() == fresh.face_slots_of_edge(edge_id).tolist()
+
+    for vertex_id in range(len(mesh.vertices)):
+        expected_edges = [e for e, edge in enumerate(mesh.edges) if vertex_id in edge]
+        expected_faces = [f for f in range(len(mesh.faces)) if vertex_id in mesh.face_vertices[f]]
+        assert sorted(seeded.edges_of_vertex(vertex_id).tolist()) == expected_edges
+        assert sorted(seeded.faces_of_vertex(vertex_id).tolist()) == expected_faces
+
+    for face_id in range(len(mesh.faces)):
+        for slot in range(3):
+            start, end = mesh.edge_vertices[mesh.face_edges[face_id, slot]]
+            opposite = seeded.face_opposite_vertex[face_id, slot]
+            assert opposite not in (start, end)
+            assert opposite in mesh.face_vertices[face_id]
+
+
+def test_boundary_edges():
+    # An open strip of two triangles has four boundary edges and one interior edge
+    mesh = build_mesh_from_faces(
+        [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]],
+        [[0, 1, 2], [0, 2, 3]],
+    )
+    boundary = mesh.adjacency.boundary_edges().tolist()
+    assert len(boundary) == 4
+    assert mesh.edge_vertices[[e for e in range(5) if e not in boundary][0]].tolist() == [0, 2]
@@ -1,42 +1,110 @@
-from contour_toolpath.mesh import Mesh
-import plotly.graph_objects as go  # type: ignore
+import importlib.util
+import os
+from typing import TYPE_CHECKING, Sequence
+from contour_toolpath.contour import Contour
+from contour_toolpath.mesh import FloatArray, IndexArray, Mesh
 import numpy as np
 
+if TYPE_CHECKING:
+    import plotly.graph_objects as go  # type: ignore
 
 
-def visualize_mesh(mesh: Mesh, show_edges: bool=True):
+MAX_DISPLAY_FACES = 200_000
+""" Meshes with more faces are decimated (`decimate_for_display`) before plotting, so browsers stay responsive """
 
-    # Vertex positions
-    verts = np.array([v.position for v in mesh.vertices])
-    
-    # Treat None as -1.0 for visualization
-    d_values = np.array([
-        v.d if v.d is not None else -1.0
-        for v in mesh.vertices
-    ])
+MAX_DISPLAY_EDGES = 300_000
+""" Edges are left out above this many, after decimation, as they would hide the surface anyway """
 
-    # Normalize to [0, 1] using full range
-    d_max = np.max(d_values)
 
-    # Faces (as sets of 3 vertex indices)
-    faces: list[list[int]] = []
-    for tri in mesh.faces:
-        e1, e2, e3 = mesh.edges[tri.edges[0]], mesh.edges[tri.edges[1]], mesh.edges[tri.edges[2]]
-        v_ids = set([e1.start, e1.end, e2.start, e2.end, e3.start, e3.end])
-        if len(v_ids) != 3:
-            raise ValueError(f"Face has incorrect number of unique vertices: {v_ids}")
-        faces.append(list(v_ids))
+def visualize_mesh(mesh: Mesh, show_edges: bool=True, contours: Sequence[Contour]=()):
+    mesh_figure(mesh, show_edges, contours).show()  # type: ignore
 
-    x, y, z = verts[:, 0], verts[:, 1], verts[:, 2]
-    i, j, k = zip(*faces)
+
+def decimate_for_display(
+    positions: FloatArray, faces: IndexArray, values: FloatArray, max_faces: int
+) -> tuple[FloatArray, IndexArray, FloatArray]:
+    """
+    Vertex clustering: snap the vertices to a grid coarse enough that at most about `max_faces` faces
+    survive, merge the vertices in each cell (averaging positions and values) and drop the faces that
+    collapse or fold over. Winding is kept. Only for display: the result need not be manifold.
+    """
+    lo = positions.min(axis=0)
+    extent = np.maximum(positions.max(axis=0) - lo, 1e-12)
+    # A surface through an r x r x r grid touches about r^2 cells, with twice as many faces
+    cells = max(np.sqrt(max_faces / 2.0), 1.0)
+    while True:
+        cell_size = extent.max() / cells
+        cell = np.floor((positions - lo) / cell_size).astype(np.int64)
+        side = int(cell.max()) + 1
+        _, cluster = np.unique((cell[:, 0] * side + cell[:, 1]) * side + cell[:, 2], return_inverse=True)
+        clustered = cluster[faces].astype(np.int32)
+        keep = (clustered[:, 0] != clustered[:, 1]) & (clustered[:, 1] != clustered[:, 2]) & (clustered[:, 2] != clustered[:, 0])
+        if np.count_nonzero(keep) <= max_faces or cells <= 1.0:
+            break
+        cells *= 0.8
+
+    num_clusters = int(cluster.max()) + 1
+    counts = np.bincount(cluster, minlength=num_clusters)
+    new_positions = np.stack(
+        [np.bincount(cluster, weights=positions[:, axis], minlength=num_clusters) for axis in range(3)], axis=1
+    ) / counts[:, None]
+    # Averaging can fold slivers over: drop faces that now face the other way from the face they came from
+    keep[keep] = np.einsum(
+        "ij,ij->i", _face_normals(new_positions, clustered[keep]), _face_normals(positions, faces[keep])
+    ) > 0
+    clustered = clustered[keep]
+    new_values = np.bincount(cluster, weights=values, minlength=num_clusters) / counts
+    # Faces that collapsed onto the same three clusters are drawn once
+    _, first = np.unique(np.sort(clustered, axis=1), axis=0, return_index=True)
+    return new_positions, clustered[np.sort(first)], new_values
+
+
+def _face_normals(positions: FloatArray, faces: IndexArray) -> FloatArray:
+    corners = positions[faces]
+    return np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+
+
+def _edge_polyline(positions: FloatArray, edges: IndexArray) -> FloatArray:
+    """ All edges as one polyline, each followed by a NaN row that breaks the line """
+    points = np.full((len(edges), 3, 3), np.nan)
+    points[:, :2] = positions[edges]
+    return points.reshape(-1, 3)
+
+
+def mesh_figure(
+    mesh: Mesh,
+    show_edges: bool=True,
+    contours: Sequence[Contour]=(),
+    max_faces: int=MAX_DISPLAY_FACES,
+    max_edges: int=MAX_DISPLAY_EDGES,
+) -> "go.Figure":
+    """
+    The figure `visualize_mesh` shows, built without displaying it. plotly is imported on the first call.
+
+    The surface is one `Mesh3d` coloured by distance, with unreached vertices at -1. Edges are one
+    `Scatter3d` trace, as are contours. Above `max_faces` the surface is decimated first, and above
+    `max_edges` edges are left out.
+    """
+    import plotly.graph_objects as go  # type: ignore
+
+    positions = mesh.positions
+    faces = mesh.face_vertices
+    d_values = np.where(np.isnan(mesh.distance), -1.0, mesh.distance)
+    edges = mesh.edge_vertices
+    title = "3D Mesh Visualization (Distance Field)"
+    if len(faces) > max_faces:
+        positions, faces, d_values = decimate_for_display(positions, faces, d_values, max_faces)
+        # The edges of the decimated faces, each once
+        edges = np.unique(np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1), axis=0)
+        title += f", decimated to {len(faces)} of {len(mesh.face_vertices)} faces"
 
     mesh3d = go.Mesh3d(
-        x=x, y=y, z=z,
-        i=i, j=j, k=k,
+        x=positions[:, 0], y=positions[:, 1], z=positions[:, 2],
+        i=faces[:, 0], j=faces[:, 1], k=faces[:, 2],
         intensity=d_values,  # original values, not normalized
         colorscale='Viridis',
         cmin=-1.0,
-        cmax=d_max,
+        cmax=float(np.max(d_values, initial=0.0)),
         showscale=True,
         colorbar=dict(title="Distance (d)"),
         opacity=1.0,
@@ -45,23 +113,53 @@ def visualize_mesh(mesh: Mesh, show_edges: bool=True):
 
     fig = go.Figure(data=[mesh3d])
 
-    if show_edges:
-        edge_lines: list[go.Scatter3d] = []
-        for edge in mesh.edges:
-            v0 = mesh.vertices[edge.start].position
-            v1 = mesh.vertices[edge.end].position
-            edge_lines.append(go.Scatter3d(
-                x=[v0[0], v1[0]],
-                y=[v0[1], v1[1]],
-                z=[v0[2], v1[2]],
-                mode='lines',
-                line=dict(color='black', width=1),
-                showlegend=False
-            ))
-        fig.add_traces(edge_lines)  # type: ignore
+    if show_edges and len(edges) <= max_edges:
+        edge_points = _edge_polyline(positions, edges)
+        fig.add_trace(go.Scatter3d(  # type: ignore
+            x=edge_points[:, 0],
+            y=edge_points[:, 1],
+            z=edge_points[:, 2],
+            mode='lines',
+            line=dict(color='black', width=1),
+            hoverinfo='skip',
+            name="edges",
+            showlegend=False
+        ))
+
+    if contours:
+        # One trace for all the contours, broken apart by NaN rows
+        pieces: list[np.ndarray] = []
+        for contour in contours:
+            points = np.vstack([contour.points, contour.points[:1]]) if contour.closed else contour.points
+            pieces += [points, np.full((1, 3), np.nan)]
+        contour_points = np.vstack(pieces)
+        fig.add_trace(go.Scatter3d(  # type: ignore
+            x=contour_points[:, 0],
+            y=contour_points[:, 1],
+            z=contour_points[:, 2],
+            mode='lines',
+            line=dict(color='red', width=3),
+            name="contours"
+        ))
 
     fig.update_layout(  # type: ignore
         scene=dict(aspectmode='data'),
-        title="3D Mesh Visualization (Distance Field)",
+        title=title,
     )
-    fig.show()  # type: ignore
\ No newline at end of file
+    return fig
+
+
+def export_mesh_figure(mesh: Mesh, path: str, show_edges: bool=True, contours: Sequence[Contour]=()) -> None:
+    """
+    Write the figure of `visualize_mesh` to a file instead of opening a browser, for CI and batch jobs.
+    ".html" files are self-contained, with plotly.js inside, so they open offline. ".png" and the other
+    image formats plotly knows need the `kaleido` package (the "export" extra).
+    """
+    is_html = os.path.splitext(path)[1].lower() in (".html", ".htm")
+    if not is_html and importlib.util.find_spec("kaleido") is None:
+        raise ImportError(f"Writing {path} needs the kaleido package: install contour-toolpath[export], or export to .html")
+    fig = mesh_figure(mesh, show_edges, contours)
+    if is_html:
+        fig.write_html(path, include_plotlyjs=True)  # type: ignore
+    else:
+        fig.write_image(path)  # type: ignore
@@ -0,0 +1,74 @@
+import importlib.util
+import os
+from pathlib import Path
+from typing import cast
+
+import numpy as np
+import plotly.graph_objects as go  # type: ignore
+import pytest
+
+from contour_toolpath.testing import make_jittered_square, make_plate_with_hole
+from contour_toolpath.visualization import decimate_for_display, export_mesh_figure, mesh_figure
+
+
+def face_normals_z(positions: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    corners = positions[faces]
+    return np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])[:, 2]
+
+
+def traces(figure: go.Figure) -> tuple[go.Mesh3d | go.Scatter3d, ...]:
+    """ Plotly annotates `Figure.data` and the trace properties too loosely for strict checking """
+    return tuple(getattr(figure, "data"))
+
+
+def trace_array(trace: go.Mesh3d | go.Scatter3d, name: str) -> np.ndarray:
+    return np.array(getattr(trace, name), dtype=np.float64)
+
+
+def test_mesh_figure_traces():
+    mesh = make_plate_with_hole(9)
+    mesh.distance[:] = np.linspace(0.0, 1.0, len(mesh.positions))
+    figure = mesh_figure(mesh)
+
+    surface, edges = traces(figure)
+    surface, edges = cast(go.Mesh3d, surface), cast(go.Scatter3d, edges)
+    corners = np.stack([trace_array(surface, axis) for axis in "ijk"], axis=1)
+    assert np.array_equal(corners, mesh.face_vertices)
+    # Every edge as two points and a NaN break, in one trace
+    edge_x = trace_array(edges, "x")
+    assert len(edge_x) == 3 * len(mesh.edge_vertices)
+    assert np.isnan(edge_x[2::3]).all()
+
+    decimated = traces(mesh_figure(mesh, max_faces=40, max_edges=0))
+    assert len(decimated) == 1
+    assert len(trace_array(cast(go.Mesh3d, decimated[0]), "i")) <= 40
+
+
+def test_decimate_for_display_keeps_winding():
+    mesh = make_jittered_square(41)
+    assert np.all(face_normals_z(mesh.positions, mesh.face_vertices) > 0)
+    values = mesh.positions[:, 0].copy()
+
+    positions, faces, decimated_values = decimate_for_display(mesh.positions, mesh.face_vertices, values, 500)
+    assert 100 < len(faces) <= 500
+    assert np.all(face_normals_z(positions, faces) > 0)
+    assert np.allclose(decimated_values, positions[:, 0])
+
+
+def test_export_mesh_figure_html(tmp_path: Path):
+    mesh = make_plate_with_hole(5)
+    path = os.path.join(tmp_path, "mesh.html")
+    export_mesh_figure(mesh, path)
+    with open(path) as file:
+        html = file.read()
+    # plotly.js is inside, so the page works offline
+    assert "<script" in html and "cdn.plot.ly" not in html.split("</head>")[0]
+
+
+def test_export_mesh_figure_image_without_kaleido(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def find_nothing(name: str) -> None:
+        return None
+
+    monkeypatch.setattr(importlib.util, "find_spec", find_nothing)
+    with pytest.raises(ImportError, match="kaleido"):
+        export_mesh_figure(make_plate_with_hole(5), os.path.join(tmp_path, "mesh.png"))
@@ -2,7 +2,7 @@
 import math
 from typing import NamedTuple
 
-from contour_toolpath.mesh import EdgeId, Mesh, get_edge_length
+from contour_toolpath.mesh import EdgeId, Mesh
 from mathutil.vector import Vec2D
 
 
@@ -72,33 +72,63 @@ class WindowLinear(NamedTuple):
 
 Window = WindowCircular | WindowLinear
 
+WINDOW_EPSILON = 1e-9
+""" Windows narrower than this (in edge parameter space) are dropped """
 
 
 
 
-def evaluate_distance_field_at_window_start(window: Window, mesh: Mesh) -> float:
+
+def evaluate_distance_field(window: Window, t: float, mesh: Mesh) -> float:
     """
-    Get the distance from the edge start to the start of the window
+    Get the distance field of the window at `t` along its edge
     """
+    return distance_along_edge(window, t * float(mesh.geometry.edge_lengths[window.edge_id]))
+
+
+def distance_along_edge(window: Window, x: float) -> float:
+    """ The distance field of the window at `x` (in edge length units rather than `t`) along its edge """
     if isinstance(window, WindowCircular):
-        edge_length = get_edge_length(window.edge_id, mesh)
-        start_point = Vec2D(window.start_t * edge_length, 0)
-        source_to_start = start_point - window.source_point
-        return window.cumulative_distance + source_to_start.length()
+        source_x, source_y = window.source_point
+        return circular_distance(window.cumulative_distance, source_x, source_y, x)
     assert isinstance(window, WindowLinear)
-    edge_to_start_t = get_edge_length(window.edge_id, mesh) * window.start_t
-    return window.start_distance + edge_to_start_t * math.cos(window.source_direction)   
+    return linear_distance(window.start_distance, math.cos(window.source_direction), x)
+
+
+def circular_distance(cumulative_distance: float, source_x: float, source_y: float, x: float) -> float:
+    """ The distance field at `x` along an edge, of a circular window with its source at (source_x, source_y) """
+    return cumulative_distance + math.hypot(x - source_x, source_y)
+
+
+def linear_distance(start_distance: float, cos_direction: float, x: float) -> float:
+    """ The distance field at `x` along an edge, of a linear window """
+    return start_distance + x * cos_direction
+
+
+def evaluate_distance_field_at_window_start(window: Window, mesh: Mesh) -> float:
+    """
+    Get the distance from the edge start to the start of the window
+    """
+    return evaluate_distance_field(window, window.start_t, mesh)
 
 
 def evaluate_distance_field_at_window_end(window: Window, mesh: Mesh) -> float:
     """
     Get the distance from the edge start to the end of the window
     """
+    return evaluate_distance_field(window, window.end_t, mesh)
+
+
+def window_min_distance(window: Window, mesh: Mesh) -> float:
+    """
+    Get the smallest distance the window reaches anywhere along its interval
+    """
+    start = evaluate_distance_field_at_window_start(window, mesh)
+    end = evaluate_distance_field_at_window_end(window, mesh)
     if isinstance(window, WindowCircular):
-        edge_length = get_edge_length(window.edge_id, mesh)
-        end_point = Vec2D(window.end_t * edge_length, 0)
-        source_to_end = end_point - window.source_point
-        return window.cumulative_distance + source_to_end.length()
-    assert isinstance(window, WindowLinear)
-    edge_to_end_t = get_edge_length(window.edge_id, mesh) * window.end_t
-    return window.start_distance + edge_to_end_t * math.cos(window.source_direction)   
\ No newline at end of file
+        edge_length = float(mesh.geometry.edge_lengths[window.edge_id])
+        source_x, source_y = window.source_point
+        if window.start_t * edge_length < source_x < window.end_t * edge_length:
+            # The foot of the source is inside the window
+            return window.cumulative_distance + abs(source_y)
+    return min(start, end)
@@ -0,0 +1,208 @@
+import math
+from typing import NamedTuple, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.mesh import EdgeId, FaceId, FloatArray, IndexArray, Mesh
+from contour_toolpath.window import WINDOW_EPSILON, Window, WindowCircular, WindowLinear
+from contour_toolpath.window_propagation import unfold_face
+from mathutil.vector import Vec2D
+
+
+KindArray = npt.NDArray[np.int8]
+
+KIND_CIRCULAR = 0
+KIND_LINEAR = 1
+
+
+class WindowBatch(NamedTuple):
+    """
+    Windows as columns, one row per window.
+
+    Circular windows store their source point in `source_x`/`source_y` and sigma in `distance`.
+    Linear windows store the unit vector of their direction in `source_x`/`source_y` and their start
+    distance in `distance`.
+    """
+
+    edge_id: IndexArray
+    start_t: FloatArray
+    end_t: FloatArray
+    kind: KindArray
+    distance: FloatArray
+    source_x: FloatArray
+    source_y: FloatArray
+
+
+def empty_batch() -> WindowBatch:
+    return WindowBatch(
+        edge_id=np.zeros(0, dtype=np.int32),
+        start_t=np.zeros(0),
+        end_t=np.zeros(0),
+        kind=np.zeros(0, dtype=np.int8),
+        distance=np.zeros(0),
+        source_x=np.zeros(0),
+        source_y=np.zeros(0),
+    )
+
+
+def concatenate_batches(batches: Sequence[WindowBatch]) -> WindowBatch:
+    if not batches:
+        return empty_batch()
+    return WindowBatch(*(np.concatenate(columns) for columns in zip(*batches)))
+
+
+def take_batch(batch: WindowBatch, rows: npt.NDArray[np.integer]) -> WindowBatch:
+    """ The given rows of a batch (a copy) """
+    return WindowBatch(
+        edge_id=batch.edge_id[rows],
+        start_t=batch.start_t[rows],
+        end_t=batch.end_t[rows],
+        kind=batch.kind[rows],
+        distance=batch.distance[rows],
+        source_x=batch.source_x[rows],
+        source_y=batch.source_y[rows],
+    )
+
+
+WindowRow = tuple[int, float, float, int, float, float, float]
+""" One window as the values of its `WindowBatch` columns """
+
+
+def window_to_row(window: Window) -> WindowRow:
+    if isinstance(window, WindowCircular):
+        return (
+            window.edge_id, window.start_t, window.end_t, KIND_CIRCULAR,
+            window.cumulative_distance, window.source_point.x, window.source_point.y,
+        )
+    return (
+        window.edge_id, window.start_t, window.end_t, KIND_LINEAR,
+        window.start_distance, math.cos(window.source_direction), math.sin(window.source_direction),
+    )
+
+
+def window_from_row(
+    edge_id: int, start_t: float, end_t: float, kind: int, distance: float, source_x: float, source_y: float
+) -> Window:
+    if kind == KIND_CIRCULAR:
+        return WindowCircular(
+            edge_id=EdgeId(edge_id),
+            start_t=start_t,
+            end_t=end_t,
+            cumulative_distance=distance,
+            source_point=Vec2D(source_x, source_y),
+        )
+    return WindowLinear(
+        edge_id=EdgeId(edge_id),
+        start_t=start_t,
+        end_t=end_t,
+        source_direction=math.atan2(source_y, source_x),
+        start_distance=distance,
+    )
+
+
+def windows_to_batch(windows: Sequence[Window]) -> WindowBatch:
+    rows = [window_to_row(w) for w in windows]
+    if not rows:
+        return empty_batch()
+    edge_id, start_t, end_t, kind, distance, source_x, source_y = zip(*rows)
+    return WindowBatch(
+        edge_id=np.array(edge_id, dtype=np.int32),
+        start_t=np.array(start_t, dtype=np.float64),
+        end_t=np.array(end_t, dtype=np.float64),
+        kind=np.array(kind, dtype=np.int8),
+        distance=np.array(distance, dtype=np.float64),
+        source_x=np.array(source_x, dtype=np.float64),
+        source_y=np.array(source_y, dtype=np.float64),
+    )
+
+
+def batch_to_windows(batch: WindowBatch) -> list[Window]:
+    return [
+        window_from_row(*row)
+        for row in zip(
+            batch.edge_id.tolist(), batch.start_t.tolist(), batch.end_t.tolist(), batch.kind.tolist(),
+            batch.distance.tolist(), batch.source_x.tolist(), batch.source_y.tolist(),
+        )
+    ]
+
+
+def propagate_batch_through_face(batch: WindowBatch, edge: EdgeId, face_id: FaceId, mesh: Mesh) -> WindowBatch:
+    """
+    Propagate every window of `batch` (all on `edge`) into the face, in one pass of array operations.
+    The math is the same as `window_propagation.propagate_window_through_face`, which is the reference:
+    the shadow of each child edge's endpoints is computed for all windows at once, and the lit intervals,
+    child sources and child directions come out as columns.
+
+    Returns the child windows on both other edges of the face. Rows are grouped by child edge, and keep
+    the order of `batch` within each group.
+    """
+    unfolding = unfold_face(edge, face_id, mesh)
+    flip = unfolding.flip
+    edge_length = unfolding.edge_length
+
+    is_circular = batch.kind == KIND_CIRCULAR
+    source_x = batch.source_x
+    source_y = batch.source_y * flip
+    # Circular windows need their source on the far side, linear ones have to be heading into the face
+    enters = np.where(is_circular, source_y < 0, source_y > 0)
+    window_x0 = batch.start_t * edge_length
+    window_x1 = batch.end_t * edge_length
+
+    # Both child edges at once: the per-edge values are columns that broadcast against the window rows
+    frames = np.array([child[1:] for child in unfolding.children], dtype=np.float64)
+    p0x, p0y, p1x, p1y, ex, ey, nx, ny = (frames[:, i:i + 1] for i in range(8))
+    dx, dy = p1x - p0x, p1y - p0y
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Where the ray through each child edge endpoint crosses the window edge
+        linear_slope = source_x / np.where(is_circular | ~enters, 1.0, source_y)
+
+        def shadow(px: FloatArray, py: FloatArray) -> FloatArray:
+            circular = source_x + (px - source_x) * -source_y / (py - source_y)
+            return np.where(is_circular, circular, px - py * linear_slope)
+
+        x0 = shadow(p0x, p0y)
+        x1 = shadow(p1x, p1y)
+
+        def t_at(x: FloatArray) -> FloatArray:
+            """ The parameter along each child edge whose shadow is `x` """
+            numerator = -source_y * (p0x - source_x) - (x - source_x) * (p0y - source_y)
+            circular = numerator / ((x - source_x) * dy + source_y * dx)
+            return np.where(is_circular, circular, (x - x0) / (x1 - x0))
+
+        increasing = x0 < x1
+        lit = enters & (x0 != x1) & np.where(
+            increasing,
+            (x1 > window_x0) & (x0 < window_x1),
+            (x0 > window_x0) & (x1 < window_x1),
+        )
+        t_lo = np.where(
+            increasing,
+            np.where(x0 >= window_x0, 0.0, t_at(window_x0)),
+            np.where(x0 <= window_x1, 0.0, t_at(window_x1)),
+        )
+        t_hi = np.where(
+            increasing,
+            np.where(x1 <= window_x1, 1.0, t_at(window_x1)),
+            np.where(x1 >= window_x0, 1.0, t_at(window_x0)),
+        )
+    t_lo = np.maximum(t_lo, 0.0)
+    t_hi = np.minimum(t_hi, 1.0)
+    keep = lit & (t_hi - t_lo > WINDOW_EPSILON)
+
+    # Circular: the source in the child frame. Linear: the direction in the child frame
+    vx = np.where(is_circular, source_x - p0x, source_x)
+    vy = np.where(is_circular, source_y - p0y, source_y)
+    distance = np.where(is_circular, batch.distance, batch.distance + p0x * source_x + p0y * source_y)
+    child_edges = np.array([child.edge_id for child in unfolding.children], dtype=np.int32)
+
+    return WindowBatch(
+        edge_id=np.broadcast_to(child_edges[:, None], keep.shape)[keep],
+        start_t=t_lo[keep],
+        end_t=t_hi[keep],
+        kind=np.broadcast_to(batch.kind, keep.shape)[keep],
+        distance=distance[keep],
+        source_x=(vx * ex + vy * ey)[keep],
+        source_y=(vx * nx + vy * ny)[keep],
+    )
@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+from contour_toolpath.importer import build_mesh_from_trimesh
+from contour_toolpath.mesh import EdgeId, FaceId
+from contour_toolpath.testing import icosphere
+from contour_toolpath.window import Window, WindowCircular, WindowLinear
+from contour_toolpath.window_batch import batch_to_windows, propagate_batch_through_face, windows_to_batch
+from contour_toolpath.window_propagation import propagate_window_through_face
+from mathutil.vector import Vec2D
+
+
+def random_windows(edge: EdgeId, edge_length: float, count: int, rng: np.random.Generator) -> list[Window]:
+    windows: list[Window] = []
+    for _ in range(count):
+        a, b = sorted(rng.uniform(0.0, 1.0, 2).tolist())
+        if rng.random() < 0.5:
+            windows.append(WindowCircular(
+                edge_id=edge,
+                start_t=a,
+                end_t=b,
+                cumulative_distance=float(rng.uniform(0.0, 1.0)),
+                # Sources on both sides of the edge, so some windows don't enter the face
+                source_point=Vec2D(float(rng.uniform(-1.0, 2.0)) * edge_length, float(rng.uniform(-2.0, 2.0)) * edge_length),
+            ))
+        else:
+            windows.append(WindowLinear(
+                edge_id=edge,
+                start_t=a,
+                end_t=b,
+                source_direction=float(rng.uniform(-math.pi, math.pi)),
+                start_distance=float(rng.uniform(0.0, 1.0)),
+            ))
+    return windows
+
+
+def sort_key(w: Window) -> tuple[int, float, float]:
+    return (w.edge_id, w.start_t, w.end_t)
+
+
+def test_batch_matches_scalar_reference():
+    mesh = build_mesh_from_trimesh(icosphere(1))
+    rng = np.random.default_rng(3)
+
+    total = 0
+    for edge in range(0, len(mesh.edges), 7):
+        edge_id = EdgeId(edge)
+        windows = random_windows(edge_id, float(mesh.geometry.edge_lengths[edge]), 40, rng)
+        for face_id in mesh.adjacency.faces_of_edge(edge).tolist():
+            expected = [
+                child for w in windows for child in propagate_window_through_face(w, FaceId(face_id), mesh)
+            ]
+            batch = propagate_batch_through_face(windows_to_batch(windows), edge_id, FaceId(face_id), mesh)
+            actual = batch_to_windows(batch)
+
+            assert len(actual) == len(expected)
+            for a, e in zip(sorted(actual, key=sort_key), sorted(expected, key=sort_key)):
+                assert type(a) is type(e)
+                assert a.edge_id == e.edge_id
+                assert np.allclose(a[1:3], e[1:3], rtol=1e-9, atol=1e-12)
+                if isinstance(a, WindowCircular):
+                    assert isinstance(e, WindowCircular)
+                    assert math.isclose(a.cumulative_distance, e.cumulative_distance)
+                    assert np.allclose(a.source_point, e.source_point, rtol=1e-9, atol=1e-12)
+                else:
+                    assert isinstance(e, WindowLinear)
+                    assert math.isclose(a.source_direction, e.source_direction, rel_tol=1e-9, abs_tol=1e-12)
+                    assert math.isclose(a.start_distance, e.start_distance, rel_tol=1e-9, abs_tol=1e-12)
+            total += len(actual)
+
+    assert total > 100
+
+
+def test_batch_round_trip():
+    windows = random_windows(EdgeId(4), 2.0, 10, np.random.default_rng(0))
+    round_trip = batch_to_windows(windows_to_batch(windows))
+    for a, b in zip(round_trip, windows):
+        assert type(a) is type(b)
+        assert np.allclose(np.array(a[1:3]), np.array(b[1:3]))
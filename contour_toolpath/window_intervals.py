@@ -0,0 +1,296 @@
+import bisect
+import math
+from typing import Iterator, NamedTuple
+
+import numpy as np
+
+from contour_toolpath.mesh import EdgeId, IndexArray, Mesh
+from contour_toolpath.window import WINDOW_EPSILON, Window, circular_distance, linear_distance
+from contour_toolpath.window_batch import KIND_CIRCULAR
+from contour_toolpath.window_store import NO_ORIGIN, WindowHandle, WindowParams, WindowStore, params_of
+
+
+DISTANCE_EPSILON = 1e-9
+""" A new window has to beat an existing one by this much (relative) to replace it """
+
+
+class MergeResult(NamedTuple):
+    inserted: list[WindowHandle]
+    """ Pieces of the new windows that were kept """
+
+    trimmed: list[tuple[WindowHandle, list[WindowHandle]]]
+    """ Existing windows that lost part of their interval (now dead), with the pieces that replace them """
+
+    discarded: int = 0
+    """ New windows that were closer nowhere, so nothing of them was kept. Only counted by `merge_windows` """
+
+
+def _distance(params: WindowParams, x: float) -> float:
+    kind, distance, source_x, source_y = params
+    if kind == KIND_CIRCULAR:
+        return circular_distance(distance, source_x, source_y, x)
+    # Linear windows store the unit direction, so source_x is cos(direction)
+    return linear_distance(distance, source_x, x)
+
+
+def _solve_quadratic(a: float, b: float, c: float) -> list[float]:
+    scale = max(abs(a), abs(b), abs(c))
+    if scale == 0:
+        return []
+    if abs(a) <= 1e-12 * scale:
+        return [] if b == 0 else [-c / b]
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        # Tangent crossings come out slightly negative
+        if discriminant < -1e-12 * b * b:
+            return []
+        discriminant = 0.0
+    root = math.sqrt(discriminant)
+    # Avoid cancellation between b and the root
+    q = -0.5 * (b + math.copysign(root, b))
+    if q == 0:
+        return [0.0]
+    return [q / a, c / q]
+
+
+def _crossing_candidates(w1: WindowParams, w2: WindowParams) -> list[float]:
+    """
+    Positions along the edge where the distance fields of two windows may be equal.
+    Squaring the equations can add spurious roots. They are harmless: the caller only uses these to split
+    the overlap and then compares the two windows on each piece.
+    """
+    if w1[0] != KIND_CIRCULAR and w2[0] == KIND_CIRCULAR:
+        w1, w2 = w2, w1
+
+    if w1[0] == KIND_CIRCULAR and w2[0] == KIND_CIRCULAR:
+        _, sigma1, a1, b1 = w1
+        _, sigma2, a2, b2 = w2
+        k = sigma2 - sigma1
+        # sqrt(Q1) - sqrt(Q2) = k, with Q1 - Q2 linear in x
+        p = -2 * (a1 - a2)
+        q = a1 * a1 + b1 * b1 - a2 * a2 - b2 * b2 - k * k
+        return _solve_quadratic(
+            p * p - 4 * k * k,
+            2 * p * q + 8 * k * k * a2,
+            q * q - 4 * k * k * (a2 * a2 + b2 * b2),
+        )
+
+    if w1[0] == KIND_CIRCULAR:
+        # sigma + sqrt(Q) = s + c x
+        _, sigma, a, b = w1
+        _, start_distance, c, _ = w2
+        m = start_distance - sigma
+        return _solve_quadratic(1 - c * c, -2 * a - 2 * m * c, a * a + b * b - m * m)
+
+    slope = w1[2] - w2[2]
+    if slope == 0:
+        return []
+    return [(w2[1] - w1[1]) / slope]
+
+
+class EdgeWindowList:
+    """
+    The windows on one edge, as handles into a `WindowStore`, kept non-overlapping and sorted by `start_t`.
+
+    Finding the windows that overlap an interval is a bisection over the start parameters, so it costs
+    O(log k) plus the number of overlapping windows.
+    """
+
+    def __init__(self, edge_length: float, store: WindowStore | None = None):
+        self.edge_length = edge_length
+        self.store = store if store is not None else WindowStore()
+        self.handles: list[WindowHandle] = []
+
+    def __len__(self) -> int:
+        return len(self.handles)
+
+    def __iter__(self) -> Iterator[Window]:
+        for handle in self.handles:
+            yield self.store[handle]
+
+    def __contains__(self, handle: WindowHandle) -> bool:
+        return self.index(handle) is not None
+
+    def _start(self, handle: WindowHandle) -> float:
+        return self.store.start_t.item(handle)
+
+    def _end(self, handle: WindowHandle) -> float:
+        return self.store.end_t.item(handle)
+
+    def index(self, handle: WindowHandle) -> int | None:
+        start_t = self._start(handle)
+        i = bisect.bisect_left(self.handles, start_t, key=self._start)
+        while i < len(self.handles) and self._start(self.handles[i]) == start_t:
+            if self.handles[i] == handle:
+                return i
+            i += 1
+        return None
+
+    def overlapping(self, start_t: float, end_t: float) -> range:
+        """ Indices of the windows that overlap (start_t, end_t) """
+        # Windows don't overlap, so at most one window starting before `start_t` can reach into the interval
+        first = bisect.bisect_right(self.handles, start_t, key=self._start)
+        if first > 0 and self._end(self.handles[first - 1]) > start_t:
+            first -= 1
+        last = bisect.bisect_left(self.handles, end_t, lo=first, key=self._start)
+        return range(first, last)
+
+    def distance_at(self, t: float) -> float | None:
+        """ The distance field at `t` along the edge, or None if no window covers it """
+        i = bisect.bisect_right(self.handles, t, key=self._start) - 1
+        if i >= 0 and self._end(self.handles[i]) >= t:
+            return _distance(self.store.params(self.handles[i]), t * self.edge_length)
+        return None
+
+    def remove(self, handle: WindowHandle) -> bool:
+        """ Take a window off the edge and mark it dead in the store """
+        i = self.index(handle)
+        if i is None:
+            return False
+        del self.handles[i]
+        self.store.kill(handle)
+        return True
+
+    def _add(self, handle: WindowHandle) -> None:
+        i = bisect.bisect_right(self.handles, self._start(handle), key=self._start)
+        self.handles.insert(i, handle)
+
+    def _winning_spans(self, new: WindowParams, old: WindowParams, lo: float, hi: float) -> list[tuple[float, float]]:
+        """ The parts of (lo, hi) where `new` is closer than `old` """
+        length = self.edge_length
+        cuts = sorted(
+            x / length for x in _crossing_candidates(new, old) if lo * length < x < hi * length
+        )
+        points = [lo, *cuts, hi]
+        spans: list[tuple[float, float]] = []
+        for a, b in zip(points, points[1:]):
+            if b - a <= 0:
+                continue
+            mid = 0.5 * (a + b) * length
+            d_new = _distance(new, mid)
+            d_old = _distance(old, mid)
+            if d_new < d_old - DISTANCE_EPSILON * max(1.0, abs(d_old)):
+                if spans and spans[-1][1] == a:
+                    spans[-1] = (spans[-1][0], b)
+                else:
+                    spans.append((a, b))
+        return spans
+
+    def insert(self, window: Window, origin: int = NO_ORIGIN) -> MergeResult:
+        """
+        Insert a window, keeping only the parts of it that are closer than the windows already on the edge
+        and trimming those windows where the new one is closer. Only the kept parts are added to the store,
+        with `origin` (see `WindowStore.origin`). Pieces of trimmed windows keep their own origin.
+        """
+        if window.end_t - window.start_t <= WINDOW_EPSILON:
+            return MergeResult(inserted=[], trimmed=[])
+
+        store = self.store
+        params = params_of(window)
+        kept: list[tuple[float, float]] = []
+        cursor = window.start_t
+        trimmed: list[tuple[WindowHandle, list[tuple[float, float]]]] = []
+        for i in self.overlapping(window.start_t, window.end_t):
+            old = self.handles[i]
+            old_start_t, old_end_t = self._start(old), self._end(old)
+            lo, hi = max(window.start_t, old_start_t), min(window.end_t, old_end_t)
+            if lo > cursor:
+                # Uncovered gap before this window
+                kept.append((cursor, lo))
+            cursor = max(cursor, hi)
+            spans = self._winning_spans(params, store.params(old), lo, hi)
+            if not spans:
+                continue
+            kept.extend(spans)
+
+            pieces: list[tuple[float, float]] = []
+            old_start = old_start_t
+            for a, b in spans:
+                if a - old_start > WINDOW_EPSILON:
+                    pieces.append((old_start, a))
+                old_start = b
+            if old_end_t - old_start > WINDOW_EPSILON:
+                pieces.append((old_start, old_end_t))
+            trimmed.append((old, pieces))
+        if window.end_t > cursor:
+            kept.append((cursor, window.end_t))
+
+        trimmed_handles: list[tuple[WindowHandle, list[WindowHandle]]] = []
+        for old, pieces in trimmed:
+            piece_handles = [store.with_interval(old, a, b) for a, b in pieces]
+            self.remove(old)
+            for piece in piece_handles:
+                self._add(piece)
+            trimmed_handles.append((old, piece_handles))
+
+        inserted: list[WindowHandle] = []
+        for a, b in _coalesce(kept):
+            if b - a > WINDOW_EPSILON:
+                piece = window if (a, b) == (window.start_t, window.end_t) else window._replace(start_t=a, end_t=b)
+                handle = store.add(piece, origin)
+                self._add(handle)
+                inserted.append(handle)
+        return MergeResult(inserted=inserted, trimmed=trimmed_handles)
+
+
+def _coalesce(spans: list[tuple[float, float]]) -> list[tuple[float, float]]:
+    merged: list[tuple[float, float]] = []
+    for a, b in sorted(spans):
+        if merged and a <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+        else:
+            merged.append((a, b))
+    return merged
+
+
+class WindowMap:
+    """ An `EdgeWindowList` for every edge of a mesh, created on first use, all sharing one `WindowStore` """
+
+    def __init__(self, mesh: Mesh, store: WindowStore | None = None):
+        self.edge_lengths = mesh.geometry.edge_lengths
+        self.store = store if store is not None else WindowStore()
+        self.edges: dict[EdgeId, EdgeWindowList] = {}
+
+    def __getitem__(self, edge: EdgeId) -> EdgeWindowList:
+        edge_windows = self.edges.get(edge)
+        if edge_windows is None:
+            edge_windows = EdgeWindowList(float(self.edge_lengths[edge]), self.store)
+            self.edges[edge] = edge_windows
+        return edge_windows
+
+    def __contains__(self, handle: WindowHandle) -> bool:
+        edge_windows = self.edges.get(EdgeId(self.store.edge_id.item(handle)))
+        return edge_windows is not None and handle in edge_windows
+
+    def __iter__(self) -> Iterator[Window]:
+        for edge_windows in self.edges.values():
+            yield from edge_windows
+
+    def __len__(self) -> int:
+        return sum(len(edge_windows) for edge_windows in self.edges.values())
+
+    def insert(self, window: Window, origin: int = NO_ORIGIN) -> MergeResult:
+        return self[window.edge_id].insert(window, origin)
+
+    def remove(self, handle: WindowHandle) -> bool:
+        """ Take a window off its edge and mark it dead in the store """
+        edge_windows = self.edges.get(EdgeId(self.store.edge_id.item(handle)))
+        return edge_windows is not None and edge_windows.remove(handle)
+
+    def add_live_windows(self) -> None:
+        """ Put the live windows of the store on their edges, for picking up a finished propagation again """
+        self.add_handles(self.store.live_handles())
+
+    def add_handles(self, handles: IndexArray) -> None:
+        """ Put windows that are already in the store on their edges, without merging them """
+        store = self.store
+        order = np.lexsort((store.start_t[handles], store.edge_id[handles]))
+        handles = handles[order]
+        edges = store.edge_id[handles]
+        bounds = np.flatnonzero(np.diff(edges)) + 1
+        for group in np.split(handles, bounds):
+            if len(group):
+                edge_windows = self[EdgeId(int(store.edge_id[group[0]]))]
+                edge_windows.handles = sorted(
+                    edge_windows.handles + [WindowHandle(h) for h in group.tolist()], key=store.start_t.item
+                )
@@ -0,0 +1,97 @@
+import math
+from contour_toolpath.mesh import EdgeId
+from contour_toolpath.window import Window, WindowCircular, WindowLinear, distance_along_edge
+from contour_toolpath.window_intervals import EdgeWindowList
+from contour_toolpath.window_store import WindowHandle
+from mathutil.vector import Vec2D
+
+
+def circular(start_t: float, end_t: float, source_x: float, source_y: float, sigma: float = 0.0) -> WindowCircular:
+    return WindowCircular(
+        edge_id=EdgeId(0),
+        start_t=start_t,
+        end_t=end_t,
+        cumulative_distance=sigma,
+        source_point=Vec2D(source_x, source_y),
+    )
+
+
+def views(edge: EdgeWindowList, handles: list[WindowHandle]) -> list[Window]:
+    return [edge.store[handle] for handle in handles]
+
+
+def test_insert_into_gaps():
+    edge = EdgeWindowList(edge_length=1.0)
+    a = circular(0.0, 0.25, 0.0, -1.0)
+    b = circular(0.5, 0.75, 0.0, -1.0)
+    assert views(edge, edge.insert(a).inserted) == [a]
+    assert views(edge, edge.insert(b).inserted) == [b]
+
+    # Further away everywhere: only the gaps between the existing windows are kept
+    far = circular(0.0, 1.0, 0.5, -10.0)
+    result = edge.insert(far)
+    assert [(w.start_t, w.end_t) for w in views(edge, result.inserted)] == [(0.25, 0.5), (0.75, 1.0)]
+    assert result.trimmed == []
+    assert [(w.start_t, w.end_t) for w in edge] == [(0.0, 0.25), (0.25, 0.5), (0.5, 0.75), (0.75, 1.0)]
+
+
+def test_insert_trims_at_crossing():
+    edge = EdgeWindowList(edge_length=2.0)
+    left = circular(0.0, 1.0, 0.0, -1.0)
+    right = circular(0.0, 1.0, 2.0, -1.0)
+    (left_handle,) = edge.insert(left).inserted
+    result = edge.insert(right)
+
+    # Two equal sources below either end meet in the middle of the edge
+    (inserted,) = views(edge, result.inserted)
+    assert math.isclose(inserted.start_t, 0.5)
+    assert inserted.end_t == 1.0
+    (old, pieces), = result.trimmed
+    assert old == left_handle
+    assert len(pieces) == 1 and math.isclose(edge.store[pieces[0]].end_t, 0.5)
+    # The trimmed window is dead in the store, its piece took its place
+    assert left_handle not in edge and not edge.store.live[left_handle]
+    assert pieces[0] in edge
+    assert len(edge.store) == 2
+
+
+def test_insert_splits_existing_window():
+    edge = EdgeWindowList(edge_length=1.0)
+    far = circular(0.0, 1.0, 0.5, -10.0)
+    (far_handle,) = edge.insert(far).inserted
+    # A close source in the middle wins around its foot point only
+    near = circular(0.0, 1.0, 0.5, -0.1, sigma=9.7)
+    result = edge.insert(near)
+
+    (piece,) = views(edge, result.inserted)
+    assert 0.0 < piece.start_t < 0.5 < piece.end_t < 1.0
+    (old, pieces), = result.trimmed
+    assert old == far_handle
+    assert [(w.start_t, w.end_t) for w in views(edge, pieces)] == [(0.0, piece.start_t), (piece.end_t, 1.0)]
+    for t in (piece.start_t, piece.end_t):
+        assert math.isclose(distance_along_edge(near, t), distance_along_edge(far, t), rel_tol=1e-9)
+
+
+def test_dominated_window_is_dropped():
+    edge = EdgeWindowList(edge_length=1.0)
+    boundary = WindowLinear(edge_id=EdgeId(0), start_t=0.0, end_t=1.0, source_direction=math.pi / 2, start_distance=0.0)
+    edge.insert(boundary)
+
+    result = edge.insert(circular(0.2, 0.8, 0.5, -1.0))
+    assert result.inserted == []
+    assert result.trimmed == []
+    # Inserting the same window again changes nothing either
+    assert edge.insert(boundary).inserted == []
+    assert list(edge) == [boundary]
+    assert math.isclose(edge.distance_at(0.5) or 0.0, 0.0, abs_tol=1e-12)
+    assert edge.distance_at(1.5) is None
+
+
+def test_overlapping_lookup():
+    edge = EdgeWindowList(edge_length=1.0)
+    for i in range(10):
+        edge.insert(circular(i / 10, (i + 1) / 10, 0.0, -1.0))
+
+    assert list(edge.overlapping(0.25, 0.45)) == [2, 3, 4]
+    assert list(edge.overlapping(0.3, 0.4)) == [3]
+    assert list(edge.overlapping(0.0, 1.0)) == list(range(10))
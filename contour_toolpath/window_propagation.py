@@ -1,11 +1,13 @@
 import math
 from typing import NamedTuple, Tuple
 
-from matplotlib.collections import PolyCollection
-from matplotlib.tri import Triangulation
-from contour_toolpath.mesh import Edge, EdgeId, Mesh, Triangle, get_edge_length
-from contour_toolpath.window import Window, WindowCircular, WindowLinear
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.mesh import Edge, EdgeId, FaceId, Mesh, Triangle
+from contour_toolpath.window import WINDOW_EPSILON, Window, WindowCircular, WindowLinear
 from mathutil.vector import Vec2D, Vec3D
+from mathutil.vector_array import Vec3DArray
 
 
 
@@ -64,6 +66,29 @@ def intersection_from_edge_direction_and_angle(
 
 
 
+def intersections_from_edge_directions_and_angles(
+    edges: Vec3DArray,
+    other_edge_directions: Vec3DArray,
+    angles: npt.NDArray[np.float64],
+    out: npt.NDArray[np.float64] | None = None,
+) -> npt.NDArray[np.float64]:
+    """
+    `intersection_from_edge_direction_and_angle` for many edges at once, with NaN where it returns None.
+    `out` receives the lengths instead of a new array.
+    """
+    edge_lengths = edges.length(out=out)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cos_between = edges.dot(other_edge_directions)
+        cos_between /= edge_lengths * other_edge_directions.length()
+        opposite_angles = math.pi - angles - np.arccos(np.clip(cos_between, -1.0, 1.0))
+        # Sine rule, in place over the edge lengths
+        edge_lengths *= np.sin(angles) / np.sin(opposite_angles)
+    edge_lengths[opposite_angles == 0] = np.nan
+    # Zero length edges: it's in the corner
+    edge_lengths[edges.dot(edges) == 0] = 0.0
+    return edge_lengths
+
+
 def calculate_intersection_on_triangle(
     vcorner: Vec3D,
     vfree: Vec3D,
@@ -98,9 +123,6 @@ def calculate_intersection_on_triangle(
 
 
 
-import matplotlib.pyplot as plt
-
-
 def flip_edges(edge1: Edge, edge2: Edge, distance_along_edge1: float, angle_relative_to_edge_1: float) -> Tuple[Edge, Edge, float, float]:
     """ Flip the edges to that both edges share a start vertex""" 
     flipped_edge1 = Edge(start=edge1.end, end=edge1.start)
@@ -121,240 +143,218 @@ def flip_edges(edge1: Edge, edge2: Edge, distance_along_edge1: float, angle_rela
 
 
 
-class Intercept(NamedTuple):
-    distance_t: float
-    angle: float
-    
-
-
 def plot_window_in_triangle(window: Window, triangle: Triangle, mesh: Mesh) -> None:
-    ax = plt.figure().add_subplot(projection='3d')
-    edge_obj = mesh.edges[window.edge_id]
-    start_vertex = mesh.vertices[edge_obj.start]
-    end_vertex = mesh.vertices[edge_obj.end]
-    edge_vec = end_vertex.position - start_vertex.position
-
-    verts: set[Vec3D] = set()
-
-    # plot all edges in the triangle
-    positions: list[Vec3D] = []
-    directions: list[Vec3D] = []
-    for edge_id in triangle.edges:
-        edge_obj2 = mesh.edges[edge_id]
-        start = mesh.vertices[edge_obj2.start].position
-        end = mesh.vertices[edge_obj2.end].position
-        other_edge_vec = end - start
-
-        verts.add(start)
-        verts.add(end)
-        positions.append(start)
-        directions.append(other_edge_vec)
-
-    xs = [v.x for v in verts]
-    ys = [v.y for v in verts]
-    zs = [v.z for v in verts]
-    ax.scatter(xs, ys, zs, color='black')  # Plot the vertices of the triangle
-
-    ps = [p.x for p in positions]
-    qs = [p.y for p in positions]
-    rs = [p.z for p in positions]
-
-    us = [d.x for d in directions]
-    vs = [d.y for d in directions]
-    ws = [d.z for d in directions]
-    ax.quiver(
-        ps, qs, rs,  # Starting points of the arrows
-        us, vs, ws,  # Direction vectors of the arrows
-        color='blue',  # Color of the arrows
-        arrow_length_ratio=0.03  # Ratio of arrow head length to arrow length
-    )
-    assert len(verts) == 3, "Triangle must have exactly 3 vertices"
-
-    # Plot the window
-    start_t = window.start_t
-    end_t = window.end_t
-    start_position = start_vertex.position + edge_vec * start_t
-    end_position = start_vertex.position + edge_vec * end_t
-    plt.plot(
-        [start_position.x, end_position.x],
-        [start_position.y, end_position.y],
-        [start_position.z, end_position.z],
-        color='red',
-        linewidth=5
-    )
-
-    angle_start, angle_end = get_start_and_end_angle(window, mesh)
-
-
-    windows: list[Window] = []
-
-
-    for other_edge in triangle.edges:
-        intercepts: list[Intercept] = []
-        for angle, window_edge_t in [(angle_start, start_t), (angle_end, end_t)]:
-            if other_edge == window.edge_id:
-                continue
-
-            common_edge1, common_edge2, distance_along_edge1, angle_corrected = flip_edges(
-                edge_obj,
-                mesh.edges[other_edge],
-                window_edge_t,
-                angle,
-            )
-            vcorner = mesh.vertices[common_edge1.start].position
-            vfree = mesh.vertices[common_edge2.end].position
-            vedge = mesh.vertices[common_edge1.end].position
-
-            dist = (vcorner - vedge).length() * distance_along_edge1
-            intersect_dist_1 = calculate_intersection_on_triangle(
-                vcorner=vcorner,
-                vfree=vfree,
-                vedge=vedge,
-                angle=angle_corrected,
-                dist=dist
-            )
-            assert intersect_dist_1 is not None, "Intersection distance should not be None"
-
-            intersect_position = vcorner + (vfree - vcorner).normalized() * intersect_dist_1
-
-
-            origin_position = start_vertex.position + edge_vec * window_edge_t
-
-            # Plot a line from start_position to intersect_position
-            plt.plot(
-                [origin_position.x, intersect_position.x],
-                [origin_position.y, intersect_position.y],
-                [origin_position.z, intersect_position.z],
-                color='green',
-                linewidth=2
-            )
-            # Plot a dot at each intercept
-            ax.scatter(intersect_position.x, intersect_position.y, intersect_position.z, color='black', marker='x')  # Plot the vertices of the triangle
-
-
-
-            intercepts.append(Intercept(
-                distance_t=intersect_dist_1, # TODO: divide by edge length to get in edge-space
-                angle=angle_corrected  # TODO: adjust for edge flipping I think
-            ))
-
-        # From 0 -> first intercept = circular window from window start angle
-        # From first intercept to second intercept = propagate linear/circular window
-        # From second intercept -> infinity = circular window from windw end angle
-        # windows_untrimmed = [
-        #     WindowCircular(
-        #         edge_id=other_edge,
-        #         start_t=0,
-        #         end_t=intercepts[0].distance_t,
-        #         cumulative_distance=window.cumulative_distance, # TODO: Sum this somehow
-        #         source_point=Vec2D(0,0)  # TODO: start point in `other_edge`` space
-        #     ),
-        #     WindowCircular(
-        #         edge_id=other_edge,
-        #         start_t=intercepts[0].distance_t,
-        #         end_t=intercepts[1].distance_t,
-        #     ) if isinstance(window, WindowCircular) else WindowLinear(
-        #         edge_id=other_edge,
-        #         start_t=intercepts[0].distance_t,
-        #         end_t=intercepts[1].distance_t,
-
-        #     ),
-        #     WindowCircular(
-        #         edge_id=other_edge,
-        #         start_t = intercepts[1].distance_t,
-        #         end_t=float('inf'),
-        #         cumulative_distance=window.cumulative_distance, # TODO: Sum this somehow
-        #         source_point=Vec2D(0,0)  # TODO: end point in `other_edge` space
-        #     )
-        # ]
-
-
-        
-        
-
-    # plot the window
-    plt.show()
-
-
+    """ Debug plot of a window in a triangle. matplotlib is only imported when this is called """
+    from contour_toolpath.plot_window import plot_window_in_triangle as plot
+    plot(window, triangle, mesh)
 
 
 def get_start_and_end_angle(window: Window, mesh: Mesh) -> tuple[float, float]:
-    edge_obj = mesh.edges[window.edge_id]
-    start_vertex = mesh.vertices[edge_obj.start]
-    end_vertex = mesh.vertices[edge_obj.end]
-
-    edge_vec = end_vertex.position - start_vertex.position
-    edge_length = edge_vec.length()
-
     if isinstance(window, WindowLinear):
-        # Check if the window is inside the triangle
-        assert isinstance(window, WindowLinear)
         angle_start = window.source_direction
         angle_end = window.source_direction
     else:
         assert isinstance(window, WindowCircular)
-        local_position_start = Vec2D(window.start_t * edge_length, 0)
-        local_position_end = Vec2D(window.end_t * edge_length, 0)
-        dir_start = window.source_point - local_position_start
-        dir_end = window.source_point - local_position_end
-        angle_start = math.atan2(dir_start.y, dir_start.x)
-        angle_end = math.atan2(dir_end.y, dir_end.x)
-    
+        edge_length = float(mesh.geometry.edge_lengths[window.edge_id])
+        source_x, source_y = window.source_point
+        angle_start = math.atan2(source_y, source_x - window.start_t * edge_length)
+        angle_end = math.atan2(source_y, source_x - window.end_t * edge_length)
+
     return angle_start, angle_end
 
 
+def find_face_id(triangle: Triangle, edge: EdgeId, mesh: Mesh) -> FaceId:
+    """ Find the id of a triangle that touches `edge` """
+    for face_id in mesh.adjacency.faces_of_edge(edge).tolist():
+        if tuple(mesh.face_edges[face_id].tolist()) == triangle.edges:
+            return FaceId(face_id)
+    raise ValueError(f"Triangle {triangle} does not touch edge {edge}")
+
+
 def propagate_window_through_triangle(window: Window, triangle: Triangle, mesh: Mesh) -> list[Window]:
-    edge_obj = mesh.edges[window.edge_id]
-    start_vertex = mesh.vertices[edge_obj.start]
-    end_vertex = mesh.vertices[edge_obj.end]
+    """
+    Propagate a window across its edge into `triangle`, returning the windows it casts onto the
+    triangle's two other edges.
+    No windows are returned if the triangle is on the same side of the edge as the window's source.
+    """
+    return propagate_window_through_face(window, find_face_id(triangle, window.edge_id, mesh), mesh)
+
+
+class ChildEdgeFrame(NamedTuple):
+    """
+    One of the two other edges of an unfolded face, in the (mirrored) frame of the window edge
+    """
+    edge_id: EdgeId
+    p0x: float
+    p0y: float
+    """ Start vertex of the edge """
+    p1x: float
+    p1y: float
+    """ End vertex of the edge """
+    ex: float
+    ey: float
+    """ Unit vector along the edge: the X axis of the edge's own frame """
+    nx: float
+    ny: float
+    """ Y axis of the edge's own frame, pointing to the side `MeshGeometry` unfolds this face to """
+
+
+class FaceUnfolding(NamedTuple):
+    flip: float
+    """ -1 if the face is unfolded to -Y of the window edge and the frame has to be mirrored """
+    edge_length: float
+    children: tuple[ChildEdgeFrame, ChildEdgeFrame]
+
+
+def unfold_face(edge: EdgeId, face_id: FaceId, mesh: Mesh) -> FaceUnfolding:
+    """
+    Lay a face out in the frame of one of its edges, mirrored if needed so that the face is on +Y
+    """
+    adjacency = mesh.adjacency
+    geometry = mesh.geometry
+
+    k = adjacency.edge_face_index(edge, face_id)
+    slot = int(adjacency.edge_face_slots[k])
+    opposite_x, opposite_y = geometry.edge_face_opposite[k].tolist()
+    edge_length = float(geometry.edge_lengths[edge])
+    flip = -1.0 if opposite_y < 0 else 1.0
+
+    edge_start, edge_end = mesh.edge_vertices[edge].tolist()
+    opposite_vertex = int(adjacency.face_opposite_vertex[face_id, slot])
+    local = {
+        edge_start: (0.0, 0.0),
+        edge_end: (edge_length, 0.0),
+        opposite_vertex: (opposite_x, opposite_y * flip),
+    }
+
+    children: list[ChildEdgeFrame] = []
+    for other_slot in ((slot + 1) % 3, (slot + 2) % 3):
+        other_edge = EdgeId(int(mesh.face_edges[face_id, other_slot]))
+        other_start, other_end = mesh.edge_vertices[other_edge].tolist()
+        remaining = ({edge_start, edge_end, opposite_vertex} - {other_start, other_end}).pop()
+        p0x, p0y = local[other_start]
+        p1x, p1y = local[other_end]
+
+        other_length = math.hypot(p1x - p0x, p1y - p0y)
+        ex, ey = (p1x - p0x) / other_length, (p1y - p0y) / other_length
+        nx, ny = -ey, ex
+        rx, ry = local[remaining]
+        face_side = 1.0 if int(adjacency.faces_of_edge(other_edge)[0]) == face_id else -1.0
+        if ((rx - p0x) * nx + (ry - p0y) * ny) * face_side < 0:
+            nx, ny = -nx, -ny
+        children.append(ChildEdgeFrame(other_edge, p0x, p0y, p1x, p1y, ex, ey, nx, ny))
+
+    return FaceUnfolding(flip=flip, edge_length=edge_length, children=(children[0], children[1]))
+
+
+def propagate_window_through_face(window: Window, face_id: FaceId, mesh: Mesh) -> list[Window]:
+    """
+    Works in the unfolded frame of the window's edge (see `MeshGeometry`), mirrored if needed so that
+    the face is on +Y and the source on -Y:
 
-    edge_vec = end_vertex.position - start_vertex.position
-    edge_length = edge_vec.length()
+```
+                    * opposite
+                   / \\
+    child edge -> /   \\ <- child edge
+                 /     \\
+       (0,0)    *===*===*    (length, 0)
+                  \\   /
+                   \\ /  rays from the source through the window
+                    * source
+```
+    Each child edge is lit where the rays through the window cross it. The shadow of a point on the
+    child edge back onto the window edge is monotonic along the child edge, so the lit part is a single
+    interval found from the shadows of the child edge's endpoints.
+
+    This is the reference implementation for `window_batch.propagate_batch_through_face`.
+    """
+    unfolding = unfold_face(window.edge_id, face_id, mesh)
+    flip = unfolding.flip
+    edge_length = unfolding.edge_length
+
+    if isinstance(window, WindowCircular):
+        source_x, source_y = window.source_point
+        source_y *= flip
+        if source_y >= 0:
+            # Source is on this face's side of the edge (or on the edge itself)
+            return []
+        direction_x = direction_y = 0.0
+    else:
+        direction_x = math.cos(window.source_direction)
+        direction_y = math.sin(window.source_direction) * flip
+        if direction_y <= 0:
+            return []
+        source_x = source_y = 0.0
+
+    def shadow(px: float, py: float) -> float:
+        """ Where the ray through (px, py) crosses the window edge """
+        if isinstance(window, WindowCircular):
+            return source_x + (px - source_x) * -source_y / (py - source_y)
+        return px - py * direction_x / direction_y
 
-    vec_to_start = edge_vec * window.start_t
-    vec_to_end = edge_vec * window.end_t
-    angle_start, angle_end = get_start_and_end_angle(window, mesh)
+    window_x0 = window.start_t * edge_length
+    window_x1 = window.end_t * edge_length
 
     windows: list[Window] = []
-    for other_edge in triangle.edges:
-        if other_edge == window.edge_id:
+    for child in unfolding.children:
+        p0x, p0y, p1x, p1y = child.p0x, child.p0y, child.p1x, child.p1y
+        x0 = shadow(p0x, p0y)
+        x1 = shadow(p1x, p1y)
+        if x0 == x1:
             continue
-        other_edge_obj = mesh.edges[other_edge]
-        other_start_vertex = mesh.vertices[other_edge_obj.start]
-        other_end_vertex = mesh.vertices[other_edge_obj.end]
-        other_edge_vec = other_end_vertex.position - other_start_vertex.position
 
-        intersect1 = intersection_from_edge_direction_and_angle(
-            edge=vec_to_start,
-            other_edge_direction=other_edge_vec,
-            angle=angle_start
-        )
-        intersect2 = intersection_from_edge_direction_and_angle(
-            edge=vec_to_end,
-            other_edge_direction=other_edge_vec,
-            angle=angle_end
-        )
-        # print(edge_vec, other_edge_vec, angle_start, intersect1)
-        # print(edge_vec, other_edge_vec, angle_end, intersect2)
+        def t_at(x: float) -> float:
+            """ The parameter along the other edge whose shadow is `x` """
+            if isinstance(window, WindowCircular):
+                dx, dy = p1x - p0x, p1y - p0y
+                numerator = -source_y * (p0x - source_x) - (x - source_x) * (p0y - source_y)
+                return numerator / ((x - source_x) * dy + source_y * dx)
+            return (x - x0) / (x1 - x0)
 
-    return windows    
-    
+        if x0 < x1:
+            if x1 <= window_x0 or x0 >= window_x1:
+                continue
+            t_lo = 0.0 if x0 >= window_x0 else t_at(window_x0)
+            t_hi = 1.0 if x1 <= window_x1 else t_at(window_x1)
+        else:
+            if x0 <= window_x0 or x1 >= window_x1:
+                continue
+            t_lo = 0.0 if x0 <= window_x1 else t_at(window_x1)
+            t_hi = 1.0 if x1 >= window_x0 else t_at(window_x0)
+        t_lo, t_hi = max(t_lo, 0.0), min(t_hi, 1.0)
+        if t_hi - t_lo <= WINDOW_EPSILON:
+            continue
 
+        ex, ey, nx, ny = child.ex, child.ey, child.nx, child.ny
+        if isinstance(window, WindowCircular):
+            windows.append(WindowCircular(
+                edge_id=child.edge_id,
+                start_t=t_lo,
+                end_t=t_hi,
+                cumulative_distance=window.cumulative_distance,
+                source_point=Vec2D(
+                    (source_x - p0x) * ex + (source_y - p0y) * ey,
+                    (source_x - p0x) * nx + (source_y - p0y) * ny,
+                ),
+            ))
+        else:
+            windows.append(WindowLinear(
+                edge_id=child.edge_id,
+                start_t=t_lo,
+                end_t=t_hi,
+                source_direction=math.atan2(direction_x * nx + direction_y * ny, direction_x * ex + direction_y * ey),
+                start_distance=window.start_distance + p0x * direction_x + p0y * direction_y,
+            ))
 
-    
+    return windows
 
 
 def propagate_window(window: Window, mesh: Mesh) -> list[Window]:
     """
-    Propagate the window through the triangle.
+    Propagate the window through the triangles on either side of its edge.
     """
-    edge = window.edge_id
-    triangles = [f for f in mesh.faces if edge in f.edges]
-
     new_windows: list[Window] = []
-    for triangle in triangles:
-        # Check if the window is inside the triangle
-        new_windows.extend(propagate_window_through_triangle(window, triangle, mesh))
+    for face_id in mesh.adjacency.faces_of_edge(window.edge_id).tolist():
+        new_windows.extend(propagate_window_through_face(window, FaceId(face_id), mesh))
 
     return new_windows
-    
@@ -1,9 +1,11 @@
 import math
-from contour_toolpath.window import WindowLinear
+from contour_toolpath.window import WindowCircular, WindowLinear, evaluate_distance_field_at_window_end, evaluate_distance_field_at_window_start
 from contour_toolpath.window_propagation import plot_window_in_triangle, propagate_window, propagate_window_through_triangle
 from contour_toolpath.mesh import Edge, EdgeId, Mesh, Triangle, Vertex, VertexId
-from mathutil.vector import Vec3D
-from contour_toolpath.window_propagation import intersection_from_edge_direction_and_angle
+from mathutil.vector import Vec2D, Vec3D
+from contour_toolpath.window_propagation import intersection_from_edge_direction_and_angle, intersections_from_edge_directions_and_angles
+from mathutil.vector_array import Vec3DArray
+import numpy as np
 
 
 
@@ -41,6 +43,21 @@ def test_intersection_from_edge_direction_and_angle():
 
 
 
+def test_intersections_from_edge_directions_and_angles():
+    rng = np.random.default_rng(0)
+    edges = Vec3DArray(rng.normal(size=(50, 3)))
+    directions = Vec3DArray(rng.normal(size=(50, 3)))
+    angles = rng.uniform(0.1, 1.0, 50)
+    out = np.empty(50)
+    lengths = intersections_from_edge_directions_and_angles(edges, directions, angles, out=out)
+    assert lengths is out
+    for i in range(50):
+        expected = intersection_from_edge_direction_and_angle(edges[i], directions[i], float(angles[i]))
+        assert expected is not None
+        assert math.isclose(lengths[i], expected, rel_tol=1e-9)
+
+
+
 def test_intersection_from_edge_direction_and_angle_no_solution():
     # This should return None, as the angle is too small to form a triangle
     intersection_distance = intersection_from_edge_direction_and_angle(
@@ -85,6 +102,55 @@ def test_propagate_window():
         mesh=mesh
     )
 
-    assert len(windows) == 3, f"Expected 2 windows, got {len(windows)}"
+    # The beam is perpendicular to edge 0 and wider than the foot of the opposite vertex, so it lights
+    # all of edge 2 and the part of edge 1 nearest the opposite vertex
+    assert len(windows) == 2, f"Expected 2 windows, got {len(windows)}"
     windows_edge_1 = windows[0]
-    windows_edge_2 = windows[1]
\ No newline at end of file
+    windows_edge_2 = windows[1]
+    assert windows_edge_1.edge_id == EdgeId(1)
+    assert windows_edge_2.edge_id == EdgeId(2)
+
+    # Foot of the opposite vertex is at 0.6 along edge 0, so the window end at 0.75 lands 0.625 along edge 1
+    assert math.isclose(windows_edge_1.start_t, 0.625, rel_tol=1e-9)
+    assert windows_edge_1.end_t == 1.0
+    assert (windows_edge_2.start_t, windows_edge_2.end_t) == (0.0, 1.0)
+
+    # Height of the opposite vertex above edge 0
+    height = math.sqrt(6 / 5)
+    assert math.isclose(evaluate_distance_field_at_window_start(windows_edge_1, mesh), 0.625 * height, rel_tol=1e-9)
+    assert math.isclose(evaluate_distance_field_at_window_end(windows_edge_1, mesh), height, rel_tol=1e-9)
+    assert math.isclose(evaluate_distance_field_at_window_start(windows_edge_2, mesh), height, rel_tol=1e-9)
+    assert math.isclose(evaluate_distance_field_at_window_end(windows_edge_2, mesh), 0.0, abs_tol=1e-9)
+
+
+def test_propagate_circular_window():
+    mesh = Mesh(
+        vertices=[Vertex(position=Vec3D(0, 0, 0), d=None), Vertex(position=Vec3D(2, 0, 0), d=None), Vertex(position=Vec3D(1, 1, 0), d=None)],
+        edges=[
+            Edge(start=VertexId(0), end=VertexId(1)),
+            Edge(start=VertexId(1), end=VertexId(2)),
+            Edge(start=VertexId(2), end=VertexId(0)),
+        ],
+        faces=[
+            Triangle(edges=(EdgeId(0), EdgeId(1), EdgeId(2))),
+        ],
+    )
+    # A point source below the middle of edge 0 sees the whole triangle through it
+    window = WindowCircular(
+        edge_id=EdgeId(0),
+        start_t=0.0,
+        end_t=1.0,
+        cumulative_distance=0.5,
+        source_point=Vec2D(1.0, -1.0),
+    )
+    windows = propagate_window(window, mesh)
+
+    assert [(w.edge_id, w.start_t, w.end_t) for w in windows] == [(EdgeId(1), 0.0, 1.0), (EdgeId(2), 0.0, 1.0)]
+    # Straight-line distances from (1, -1) plus the offset
+    assert math.isclose(evaluate_distance_field_at_window_start(windows[0], mesh), 0.5 + 2**0.5, rel_tol=1e-9)
+    assert math.isclose(evaluate_distance_field_at_window_start(windows[1], mesh), 0.5 + 2.0, rel_tol=1e-9)
+    assert math.isclose(evaluate_distance_field_at_window_end(windows[1], mesh), 0.5 + 2**0.5, rel_tol=1e-9)
+
+    # A source on the triangle's own side does not propagate into it
+    window = window._replace(source_point=Vec2D(1.0, 1.0))
+    assert propagate_window(window, mesh) == []
@@ -0,0 +1,173 @@
+from typing import Iterator, NewType
+
+import numpy as np
+import numpy.typing as npt
+
+from contour_toolpath.mesh import FloatArray, IndexArray
+from contour_toolpath.window import Window
+from contour_toolpath.window_batch import KindArray, WindowBatch, WindowRow, window_from_row, window_to_row
+
+
+WindowHandle = NewType("WindowHandle", int)
+""" The row of a window in a `WindowStore` """
+
+NO_ORIGIN = -1
+""" `WindowStore.origin` of windows whose source is not known, such as those passed between parallel patches """
+
+WindowParams = tuple[int, float, float, float]
+""" What the distance field of a window depends on: kind, distance, source_x, source_y (see `WindowBatch`) """
+
+
+class WindowStore:
+    """
+    Every window of a propagation, stored as growable columns instead of one NamedTuple per window.
+
+    The columns are the ones of `WindowBatch`, plus a `live` flag and the `origin` of each window: the
+    source it descends from, which is what lets sources be removed again (see `update_distance_field`).
+    A window is addressed by its
+    `WindowHandle`, which is its row. Rows are only ever appended: a window that gets trimmed is marked
+    dead and its pieces are added as new rows, so handles stay valid for the life of the store.
+
+    About 50 bytes per window, against roughly 300 for a `WindowCircular` with its `Vec2D` and floats.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        """ Number of rows in use, dead or alive """
+        self.live_count = 0
+
+        self.edge_id: IndexArray = np.empty(capacity, dtype=np.int32)
+        self.start_t: FloatArray = np.empty(capacity)
+        self.end_t: FloatArray = np.empty(capacity)
+        self.kind: KindArray = np.empty(capacity, dtype=np.int8)
+        self.distance: FloatArray = np.empty(capacity)
+        self.source_x: FloatArray = np.empty(capacity)
+        self.source_y: FloatArray = np.empty(capacity)
+        self.live = np.empty(capacity, dtype=np.bool_)
+        self.origin: IndexArray = np.empty(capacity, dtype=np.int32)
+        """ The edge of the initial window each window descends from, or `NO_ORIGIN` """
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def __iter__(self) -> Iterator[Window]:
+        """ Views of the live windows, in row order """
+        for handle in self.live_handles().tolist():
+            yield self[WindowHandle(handle)]
+
+    def __getitem__(self, handle: WindowHandle) -> Window:
+        """ A NamedTuple copy of the window, for code that works on single windows """
+        return window_from_row(
+            self.edge_id.item(handle), self.start_t.item(handle), self.end_t.item(handle), self.kind.item(handle),
+            self.distance.item(handle), self.source_x.item(handle), self.source_y.item(handle),
+        )
+
+    @property
+    def capacity(self) -> int:
+        return len(self.live)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns())
+
+    def _columns(self) -> tuple[
+        IndexArray, FloatArray, FloatArray, KindArray, FloatArray, FloatArray, FloatArray, npt.NDArray[np.bool_], IndexArray
+    ]:
+        return (
+            self.edge_id, self.start_t, self.end_t, self.kind, self.distance, self.source_x, self.source_y,
+            self.live, self.origin,
+        )
+
+    def reserve(self, count: int) -> None:
+        """ Make room for `count` more rows, growing the columns geometrically """
+        needed = self.size + count
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, 2 * self.capacity, 16)
+        for name in ("edge_id", "start_t", "end_t", "kind", "distance", "source_x", "source_y", "live", "origin"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def add_row(self, row: WindowRow, origin: int = NO_ORIGIN) -> WindowHandle:
+        self.reserve(1)
+        handle = self.size
+        (
+            self.edge_id[handle], self.start_t[handle], self.end_t[handle], self.kind[handle],
+            self.distance[handle], self.source_x[handle], self.source_y[handle],
+        ) = row
+        self.live[handle] = True
+        self.origin[handle] = origin
+        self.size += 1
+        self.live_count += 1
+        return WindowHandle(handle)
+
+    def add(self, window: Window, origin: int = NO_ORIGIN) -> WindowHandle:
+        return self.add_row(window_to_row(window), origin)
+
+    def add_batch(self, batch: WindowBatch, origin: IndexArray | int = NO_ORIGIN) -> IndexArray:
+        """ Append every row of the batch. Returns their handles """
+        count = len(batch.edge_id)
+        self.reserve(count)
+        rows = slice(self.size, self.size + count)
+        for column, values in zip(self._columns(), batch):
+            column[rows] = values
+        self.live[rows] = True
+        self.origin[rows] = origin
+        self.size += count
+        self.live_count += count
+        return np.arange(rows.start, rows.stop, dtype=np.int32)
+
+    def with_interval(self, handle: WindowHandle, start_t: float, end_t: float) -> WindowHandle:
+        """ Add a copy of a window covering a different part of its edge """
+        return self.add_row((
+            self.edge_id.item(handle), start_t, end_t, self.kind.item(handle),
+            self.distance.item(handle), self.source_x.item(handle), self.source_y.item(handle),
+        ), self.origin.item(handle))
+
+    def kill(self, handle: WindowHandle) -> None:
+        if self.live[handle]:
+            self.live[handle] = False
+            self.live_count -= 1
+
+    def params(self, handle: WindowHandle) -> WindowParams:
+        return (
+            self.kind.item(handle), self.distance.item(handle), self.source_x.item(handle), self.source_y.item(handle)
+        )
+
+    def live_handles(self) -> IndexArray:
+        return np.flatnonzero(self.live[:self.size]).astype(np.int32)
+
+    def view(self) -> WindowBatch:
+        """
+        All rows, dead or alive, as a batch of views into the columns: nothing is copied.
+        The views go stale if more rows are added and the columns have to grow.
+        """
+        rows = slice(0, self.size)
+        return WindowBatch(
+            edge_id=self.edge_id[rows],
+            start_t=self.start_t[rows],
+            end_t=self.end_t[rows],
+            kind=self.kind[rows],
+            distance=self.distance[rows],
+            source_x=self.source_x[rows],
+            source_y=self.source_y[rows],
+        )
+
+    def gather(self, handles: IndexArray) -> WindowBatch:
+        """ A batch of the given rows (a copy) """
+        return WindowBatch(
+            edge_id=self.edge_id[handles],
+            start_t=self.start_t[handles],
+            end_t=self.end_t[handles],
+            kind=self.kind[handles],
+            distance=self.distance[handles],
+            source_x=self.source_x[handles],
+            source_y=self.source_y[handles],
+        )
+
+
+def params_of(window: Window) -> WindowParams:
+    _edge_id, _start_t, _end_t, kind, distance, source_x, source_y = window_to_row(window)
+    return kind, distance, source_x, source_y
@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+from contour_toolpath.mesh import EdgeId
+from contour_toolpath.window import Window, WindowCircular, WindowLinear
+from contour_toolpath.window_batch import windows_to_batch
+from contour_toolpath.window_store import WindowHandle, WindowStore
+from mathutil.vector import Vec2D
+
+
+def make_windows(count: int) -> list[Window]:
+    windows: list[Window] = []
+    for i in range(count):
+        if i % 2:
+            windows.append(WindowCircular(
+                edge_id=EdgeId(i), start_t=0.1, end_t=0.9, cumulative_distance=float(i), source_point=Vec2D(0.5, -i),
+            ))
+        else:
+            windows.append(WindowLinear(
+                edge_id=EdgeId(i), start_t=0.0, end_t=1.0, source_direction=math.pi / 3, start_distance=float(i),
+            ))
+    return windows
+
+
+def test_store_grows_and_keeps_handles():
+    store = WindowStore(capacity=2)
+    windows = make_windows(50)
+    handles = [store.add(w) for w in windows]
+
+    assert handles == list(range(50))
+    assert store.capacity >= 50
+    for handle, window in zip(handles, windows):
+        view = store[handle]
+        assert type(view) is type(window)
+        assert view.edge_id == window.edge_id and view.start_t == window.start_t
+        if isinstance(view, WindowLinear) and isinstance(window, WindowLinear):
+            # The direction is stored as a source point, so it comes back rounded
+            assert view.end_t == window.end_t and view.start_distance == window.start_distance
+            assert math.isclose(view.source_direction, window.source_direction)
+        else:
+            assert view == window
+
+    piece = store.with_interval(handles[1], 0.2, 0.4)
+    store.kill(handles[1])
+    store.kill(handles[1])
+    assert len(store) == 50
+    assert store[piece] == windows[1]._replace(start_t=0.2, end_t=0.4)
+    assert WindowHandle(1) not in store.live_handles().tolist()
+
+
+def test_store_batches():
+    store = WindowStore()
+    batch = windows_to_batch(make_windows(10))
+    handles = store.add_batch(batch)
+    assert handles.tolist() == list(range(10))
+
+    # The view shares memory with the columns, so a batch kernel can read the store directly
+    view = store.view()
+    assert np.shares_memory(view.start_t, store.start_t)
+    for column, expected in zip(view, batch):
+        assert np.array_equal(column, expected)
+
+    store.kill(WindowHandle(3))
+    live = store.gather(store.live_handles())
+    assert len(live.edge_id) == 9 and 3 not in live.edge_id.tolist()
@@ -1,25 +1,58 @@
-from contour_toolpath.algorithm import create_windows_at_boundaries, propagate_distance_field, refine_mesh
-from contour_toolpath.importer import build_mesh_from_trimesh
-from contour_toolpath.mesh import Window
-from contour_toolpath.visualization import visualize_mesh
-import trimesh
-
-
+from contour_toolpath.algorithm import DistanceEngine, compute_distance_field, refine_mesh
+from contour_toolpath.cache import ArrayCache, cache_key, cached_mesh, file_digest
+from contour_toolpath.contour import contour_levels
+from contour_toolpath.mesh import Mesh
+from contour_toolpath.importer import build_mesh_from_file
+from contour_toolpath.refine import ERROR_TOLERANCE, LENGTH_TOLERANCE, MAX_ROUNDS, MIN_LENGTH
+from contour_toolpath.toolpath import ToolpathFormat, write_toolpath
+
+
+PART = "test_objects/Simple.stl"
+ENGINE: DistanceEngine = "exact"
+""" "fast_marching" and "heat" trade accuracy for speed on big meshes """
+WORKERS = 1
+""" Processes for the exact engine """
+STEP_OVER = 1.0
+""" Distance between neighbouring contours """
+TOLERANCE = 0.01
+""" How far simplified contours may stray from the cut ones """
+SPIRAL = True
+""" Step straight over between levels instead of retracting where the next contour is close """
+OUTPUT = "toolpath.gcode"
+OUTPUT_FORMAT: ToolpathFormat = "gcode"
+CACHE_DIRECTORY = ".cache"
+""" Imported meshes and refined distance fields, reused while the part, engine and step-over are unchanged """
+CACHE_MAX_BYTES = 2 * 1024**3
 
 
 def main():
-    mesh_in = trimesh.load_mesh("test_objects/Simple.stl")  # type: ignore
-    mesh = build_mesh_from_trimesh(mesh_in)
-
-    windows: set[Window] = create_windows_at_boundaries(mesh)
-
-    windows = propagate_distance_field(mesh, windows)
-    refine_mesh(mesh, windows)
-
-    
-
-    visualize_mesh(mesh)
-    
+    cache = ArrayCache(CACHE_DIRECTORY, CACHE_MAX_BYTES)
+    digest = file_digest(PART)
+
+    def import_part() -> Mesh:
+        return build_mesh_from_file(PART)
+
+    def compute_distance() -> Mesh:
+        mesh = cached_mesh(cache, cache_key(digest), import_part)
+        windows = compute_distance_field(mesh, ENGINE, WORKERS)
+        if windows is not None:
+            refine_mesh(mesh, windows, STEP_OVER)
+        return mesh
+
+    # The mesh is refined for the step-over, so it and the refinement settings are part of the key. The
+    # worker count doesn't change the result, so it isn't
+    refinement = (STEP_OVER, ERROR_TOLERANCE, LENGTH_TOLERANCE, MIN_LENGTH, MAX_ROUNDS)
+    mesh = cached_mesh(cache, cache_key(digest, ENGINE, refinement), compute_distance)
+
+    stats = write_toolpath(
+        mesh,
+        contour_levels(mesh, STEP_OVER),
+        OUTPUT,
+        OUTPUT_FORMAT,
+        tolerance=TOLERANCE,
+        max_link=2 * STEP_OVER if SPIRAL else 0.0,
+    )
+    print(f"Wrote {stats.bytes_written / 1e6:.1f} MB to {OUTPUT} at {stats.mb_per_second:.1f} MB/s")
 
 
 if __name__ == "__main__":
@@ -8,28 +8,19 @@ class Vec2D(NamedTuple):
     y: float
 
     def __add__(self, other: "float | Vec2D") -> "Vec2D":  # type: ignore
-        if isinstance(other, float):
-            return Vec2D(self.x + other, self.y + other)
-        elif isinstance(other, Vec2D):  
+        if isinstance(other, Vec2D):
             return Vec2D(self.x + other.x, self.y + other.y)
-        else:
-            raise TypeError(f"Unsupported type for addition: {type(other)}")
+        return Vec2D(self.x + other, self.y + other)
     
     def __sub__(self, other: "float | Vec2D") -> "Vec2D":
-        if isinstance(other, float):
-            return Vec2D(self.x - other, self.y - other)
-        elif isinstance(other, Vec2D):  
+        if isinstance(other, Vec2D):
             return Vec2D(self.x - other.x, self.y - other.y)
-        else:
-            raise TypeError(f"Unsupported type for subtraction: {type(other)}")
+        return Vec2D(self.x - other, self.y - other)
         
     def __mul__(self, scalar: "float | Vec2D") -> "Vec2D":  # type: ignore
-        if isinstance(scalar, float):
-            return Vec2D(self.x * scalar, self.y * scalar)
-        elif isinstance(scalar, Vec2D):  
+        if isinstance(scalar, Vec2D):
             return Vec2D(self.x * scalar.x, self.y * scalar.y)
-        else:
-            raise TypeError(f"Unsupported type for multiplication: {type(scalar)}")
+        return Vec2D(self.x * scalar, self.y * scalar)
         
     def __truediv__(self, scalar: float) -> "Vec2D":
         if scalar == 0:
@@ -67,32 +58,23 @@ class Vec3D(NamedTuple):
     z: float
 
     def __add__(self, other: "float | Vec3D") -> "Vec3D":  # type: ignore
-        if isinstance(other, float):
-            return Vec3D(self.x + other, self.y + other, self.z + other)
-        elif isinstance(other, Vec3D):  
+        if isinstance(other, Vec3D):
             return Vec3D(self.x + other.x, self.y + other.y, self.z + other.z)
-        else:
-            raise TypeError(f"Unsupported type for addition: {type(other)}")
+        return Vec3D(self.x + other, self.y + other, self.z + other)
     
     def __sub__(self, other: "float | Vec3D") -> "Vec3D":
-        if isinstance(other, float):
-            return Vec3D(self.x - other, self.y - other, self.z - other)
-        elif isinstance(other, Vec3D):  
+        if isinstance(other, Vec3D):
             return Vec3D(self.x - other.x, self.y - other.y, self.z - other.z)
-        else:
-            raise TypeError(f"Unsupported type for subtraction: {type(other)}")
+        return Vec3D(self.x - other, self.y - other, self.z - other)
         
     def __neg__(self) -> "Vec3D":
         """Return the negation of the vector."""
         return Vec3D(-self.x, -self.y, -self.z)
 
     def __mul__(self, scalar: "float | Vec3D") -> "Vec3D":  # type: ignore
-        if isinstance(scalar, float):
-            return Vec3D(self.x * scalar, self.y * scalar, self.z * scalar)
-        elif isinstance(scalar, Vec3D):  
+        if isinstance(scalar, Vec3D):
             return Vec3D(self.x * scalar.x, self.y * scalar.y, self.z * scalar.z)
-        else:
-            raise TypeError(f"Unsupported type for multiplication: {type(scalar)}")
+        return Vec3D(self.x * scalar, self.y * scalar, self.z * scalar)
 
     def __truediv__(self, scalar: float) -> "Vec3D":
         if scalar == 0:
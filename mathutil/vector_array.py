@@ -0,0 +1,203 @@
+from typing import Any, Self, Sequence, overload
+
+import numpy as np
+import numpy.typing as npt
+
+from mathutil.vector import Vec2D, Vec3D
+
+
+FloatArray = npt.NDArray[np.float64]
+
+
+class _VecArray:
+    """
+    N vectors as the rows of an (N, D) float array, with the methods of `Vec2D` / `Vec3D` applied to every
+    row at once.
+
+    Operators and methods take a scalar, one `Vec2D` / `Vec3D` for every row, a scalar per row (an (N,)
+    array) or another array of N vectors. Operators return new arrays, and the in-place operators (`+=`
+    ...) write into this one. The methods that make vectors or scalars take an `out` buffer to write into
+    instead of allocating, which can be this array itself (`v.normalized(out=v)`).
+    """
+
+    dimension = 0
+
+    def __init__(self, data: npt.ArrayLike):
+        self.data: FloatArray = np.asarray(data, dtype=np.float64)
+        if self.data.ndim != 2 or self.data.shape[1] != self.dimension:
+            raise ValueError(f"Expected an (N, {self.dimension}) array, got {self.data.shape}")
+
+    @classmethod
+    def zeros(cls, count: int) -> Self:
+        return cls(np.zeros((count, cls.dimension)))
+
+    @classmethod
+    def empty(cls, count: int) -> Self:
+        return cls(np.empty((count, cls.dimension)))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.data!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, type(self)) and np.array_equal(self.data, other.data)
+
+    __hash__ = None  # type: ignore
+
+    def _operand(self, other: Any) -> FloatArray | float:
+        if isinstance(other, _VecArray):
+            return other.data
+        if isinstance(other, (int, float)):
+            return float(other)
+        if isinstance(other, np.ndarray) and other.ndim == 1:
+            # A scalar per row
+            return np.asarray(other[:, None], dtype=np.float64)
+        # One Vec2D / Vec3D for every row, or an (N, D) array
+        return np.asarray(other, dtype=np.float64)
+
+    def __add__(self, other: Any) -> Self:
+        return type(self)(self.data + self._operand(other))
+
+    def __sub__(self, other: Any) -> Self:
+        return type(self)(self.data - self._operand(other))
+
+    def __mul__(self, other: Any) -> Self:
+        return type(self)(self.data * self._operand(other))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: Any) -> Self:
+        return type(self)(self.data / self._operand(other))
+
+    def __neg__(self) -> Self:
+        return type(self)(-self.data)
+
+    def __iadd__(self, other: Any) -> Self:
+        self.data += self._operand(other)
+        return self
+
+    def __isub__(self, other: Any) -> Self:
+        self.data -= self._operand(other)
+        return self
+
+    def __imul__(self, other: Any) -> Self:
+        self.data *= self._operand(other)
+        return self
+
+    def __itruediv__(self, other: Any) -> Self:
+        self.data /= self._operand(other)
+        return self
+
+    def dot(self, other: Any, out: FloatArray | None = None) -> FloatArray:
+        """ Dot product of each row with the matching row of `other`, or with one vector """
+        return np.einsum("ij,ij->i", self.data, np.broadcast_to(self._operand(other), self.data.shape), out=out)
+
+    def length(self, out: FloatArray | None = None) -> FloatArray:
+        """ Length of each vector """
+        lengths = self.dot(self, out=out)
+        return np.sqrt(lengths, out=lengths)
+
+    def normalized(self, out: Self | None = None) -> Self:
+        """ Each vector scaled to unit length """
+        lengths = self.length()
+        if np.any(lengths == 0):
+            raise ValueError("Cannot normalize a zero-length vector")
+        result = out if out is not None else type(self).empty(len(self))
+        np.divide(self.data, lengths[:, None], out=result.data)
+        return result
+
+    def project(self, other: Any, out: Self | None = None) -> Self:
+        """ Each vector projected onto the matching row of `other`, or onto one vector """
+        onto = np.broadcast_to(self._operand(other), self.data.shape)
+        squared = np.einsum("ij,ij->i", onto, onto)
+        if np.any(squared == 0):
+            raise ValueError("Cannot project onto a zero-length vector")
+        scale = np.einsum("ij,ij->i", self.data, onto)
+        scale /= squared
+        result = out if out is not None else type(self).empty(len(self))
+        np.multiply(onto, scale[:, None], out=result.data)
+        return result
+
+
+class Vec2DArray(_VecArray):
+    """ Batch version of `Vec2D`: the rows of an (N, 2) array """
+
+    dimension = 2
+
+    @classmethod
+    def from_vectors(cls, vectors: Sequence[Vec2D]) -> Self:
+        return cls(np.array(vectors, dtype=np.float64).reshape(-1, 2))
+
+    @property
+    def x(self) -> FloatArray:
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> FloatArray:
+        return self.data[:, 1]
+
+    @overload
+    def __getitem__(self, index: int) -> Vec2D: ...
+    @overload
+    def __getitem__(self, index: slice | npt.NDArray[Any]) -> "Vec2DArray": ...
+    def __getitem__(self, index: int | slice | npt.NDArray[Any]) -> "Vec2D | Vec2DArray":
+        if isinstance(index, (int, np.integer)):
+            x, y = self.data[index].tolist()
+            return Vec2D(x, y)
+        return Vec2DArray(self.data[index])
+
+    def cross(self, other: Any, out: FloatArray | None = None) -> FloatArray:
+        """ The z component of the cross product of each row with `other`, as the vectors lie in the plane """
+        operand = np.broadcast_to(self._operand(other), self.data.shape)
+        result = np.multiply(self.data[:, 0], operand[:, 1], out=out)
+        result -= self.data[:, 1] * operand[:, 0]
+        return result
+
+
+class Vec3DArray(_VecArray):
+    """ Batch version of `Vec3D`: the rows of an (N, 3) array """
+
+    dimension = 3
+
+    @classmethod
+    def from_vectors(cls, vectors: Sequence[Vec3D]) -> Self:
+        return cls(np.array(vectors, dtype=np.float64).reshape(-1, 3))
+
+    @property
+    def x(self) -> FloatArray:
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> FloatArray:
+        return self.data[:, 1]
+
+    @property
+    def z(self) -> FloatArray:
+        return self.data[:, 2]
+
+    @overload
+    def __getitem__(self, index: int) -> Vec3D: ...
+    @overload
+    def __getitem__(self, index: slice | npt.NDArray[Any]) -> "Vec3DArray": ...
+    def __getitem__(self, index: int | slice | npt.NDArray[Any]) -> "Vec3D | Vec3DArray":
+        if isinstance(index, (int, np.integer)):
+            x, y, z = self.data[index].tolist()
+            return Vec3D(x, y, z)
+        return Vec3DArray(self.data[index])
+
+    def cross(self, other: Any, out: "Vec3DArray | None" = None) -> "Vec3DArray":
+        """ Cross product of each row with the matching row of `other`, or with one vector """
+        operand = np.broadcast_to(self._operand(other), self.data.shape)
+        if out is None:
+            return Vec3DArray(np.cross(self.data, operand))
+        # np.cross has no `out`: write the components, through a copy if `out` is one of the inputs
+        a, b = self.data, operand
+        if np.shares_memory(out.data, a) or np.shares_memory(out.data, b):
+            a, b = a.copy(), b.copy()
+        for i in range(3):
+            j, k = (i + 1) % 3, (i + 2) % 3
+            np.multiply(a[:, j], b[:, k], out=out.data[:, i])
+            out.data[:, i] -= a[:, k] * b[:, j]
+        return out
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from mathutil.vector import Vec2D, Vec3D
+from mathutil.vector_array import Vec2DArray, Vec3DArray
+
+
+def test_matches_scalar_vectors():
+    rng = np.random.default_rng(0)
+    a = Vec3DArray(rng.normal(size=(20, 3)))
+    b = Vec3DArray(rng.normal(size=(20, 3)))
+    for i in range(len(a)):
+        u, v = a[i], b[i]
+        assert np.allclose((a + b)[i], u + v)
+        assert np.allclose((a - b)[i], u - v)
+        assert np.allclose((a * 2)[i], u * 2)
+        assert np.allclose((a / 2.0)[i], u / 2.0)
+        assert np.allclose((-a)[i], -u)
+        assert np.isclose(a.dot(b)[i], u.dot(v))
+        assert np.isclose(a.length()[i], u.length())
+        assert np.allclose(a.normalized()[i], u.normalized())
+        assert np.allclose(a.cross(b)[i], u.cross(v))
+        assert np.allclose(a.project(b)[i], u.project(v))
+
+    p = Vec2DArray.from_vectors([Vec2D(1.0, 2.0), Vec2D(-3.0, 0.5)])
+    assert np.allclose(p.project(Vec2D(1.0, 0.0)).data, [[1.0, 0.0], [-3.0, 0.0]])
+    assert np.allclose(p.cross(Vec2D(0.0, 1.0)), [1.0, -3.0])
+    # Ints work like floats, for the scalar vectors too
+    assert Vec3D(1.0, 2.0, 3.0) * 2 == Vec3D(2.0, 4.0, 6.0)
+
+
+def test_in_place_and_out_buffers():
+    rng = np.random.default_rng(1)
+    a = Vec3DArray(rng.normal(size=(10, 3)))
+    b = Vec3DArray(rng.normal(size=(10, 3)))
+    expected_normalized = a.data / np.linalg.norm(a.data, axis=1)[:, None]
+
+    lengths = np.empty(10)
+    assert a.length(out=lengths) is lengths
+    data = a.data
+    a.normalized(out=a)
+    assert a.data is data
+    assert np.allclose(a.data, expected_normalized)
+
+    a = Vec3DArray(rng.normal(size=(10, 3)))
+    before = a.data.copy()
+    a.cross(b, out=a)
+    assert np.allclose(a.data, np.cross(before, b.data))
+    a = Vec3DArray(before)
+    buffer = Vec3DArray.empty(10)
+    assert a.cross(b, out=buffer) is buffer
+    assert np.allclose(buffer.data, np.cross(before, b.data))
+
+    expected = (before + b.data) * lengths[:, None] / [1.0, 2.0, 4.0]
+    a += b
+    a *= lengths
+    a /= Vec3D(1.0, 2.0, 4.0)
+    assert a.data is before
+    assert np.allclose(a.data, expected)
+
+    with pytest.raises(ValueError):
+        Vec2DArray.zeros(3).normalized()
+    with pytest.raises(ValueError):
+        Vec2DArray(np.zeros((3, 3)))